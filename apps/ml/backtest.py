@@ -0,0 +1,267 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from sklearn.ensemble import RandomForestRegressor
+import logging
+from fpl_predictor import FPLPredictor, MODEL_PARAMS, future_points
+from model_search import shared_matrices, open_shared, shared_arrays
+from squad_optimizer import SquadOptimizer
+
+# configure logging for backtest runs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# a smaller forest that considers half the features per split keeps one
+# refit per gameweek cheap; the served settings can be passed explicitly
+BACKTEST_MODEL_PARAMS = {**MODEL_PARAMS, 'n_estimators': 50, 'max_features': 0.5}
+
+BACKTEST_WORKERS = int(os.getenv("ML_BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+
+# squads picked every gameweek: by the model's predictions and, as a baseline, by 5-gameweek form
+STRATEGIES = ['model', 'form']
+
+# columns shared with the workers next to the feature matrix, all row-aligned
+SQUAD_COLUMNS = ['player_id', 'position', 'team', 'price', 'points']
+
+
+def prepare_backtest(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """feature matrix, next-gameweek targets and squad columns for every player-gameweek
+
+    time features only look backwards, so the row for gameweek g is what was
+    known once g finished. rows are sorted by gameweek so 'everything known
+    before g' is a prefix of every array
+    """
+    predictor = FPLPredictor()
+    frame = predictor.create_time_features(df).sort_values(['player_id', 'gameweek'])
+    X, _ = predictor.prepare_features(frame)
+    order = np.argsort(frame['gameweek'].to_numpy(), kind='stable')
+
+    arrays = {
+        'X': X.to_numpy(dtype=np.float32)[order],
+        'y': future_points(frame, 1).to_numpy(dtype=np.float64)[order],
+        'gameweek': frame['gameweek'].to_numpy(dtype=np.int64)[order],
+        'form': X['form_5gw'].to_numpy(dtype=np.float64)[order] if 'form_5gw' in X else np.zeros(len(X)),
+    }
+    for column in SQUAD_COLUMNS:
+        arrays[column] = frame[column].to_numpy()[order]
+    return arrays
+
+
+def score_squad(solution: Dict[str, Any], predicted: pd.Series, realised: pd.Series) -> Dict[str, Any]:
+    """realised points of a squad's starting XI, with the highest-predicted starter as double-points captain"""
+    starting_xi = solution['starting_xi']
+    captain = max(starting_xi, key=lambda player_id: predicted[player_id])
+    points = float(realised.reindex(starting_xi, fill_value=0).sum() + realised.get(captain, 0))
+    return {
+        'points': points,
+        'predicted': float(predicted[starting_xi].sum() + predicted[captain]),
+        'captain': int(captain),
+        'cost': solution['total_cost'],
+    }
+
+
+def _run_block(gameweeks: List[int], params: Dict[str, Any],
+               squads: List[Tuple[float, str]]) -> List[Dict[str, Any]]:
+    """fit on everything known before the block's first gameweek, then predict and pick squads for each gameweek in it
+
+    the gameweeks are decision points: after gameweek g, predict g + 1 and
+    score against what g + 1 actually produced
+    """
+    shared = shared_arrays()
+    X, y, rows_gw = shared['X'], shared['y'], shared['gameweek']
+
+    # targets are only known for rows whose next gameweek has already been played
+    train_end = int(np.searchsorted(rows_gw, gameweeks[0], side='left'))
+    known = ~np.isnan(y[:train_end])
+    start = time.perf_counter()
+    model = RandomForestRegressor(**params, n_jobs=1)
+    model.fit(X[:train_end][known], y[:train_end][known])
+    fit_seconds = time.perf_counter() - start
+
+    records = []
+    for gameweek in gameweeks:
+        rows = slice(int(np.searchsorted(rows_gw, gameweek, side='left')),
+                     int(np.searchsorted(rows_gw, gameweek, side='right')))
+        upcoming = slice(rows.stop, int(np.searchsorted(rows_gw, gameweek + 1, side='right')))
+
+        candidates = pd.DataFrame({column: shared[column][rows] for column in SQUAD_COLUMNS[:-1]})
+        candidates['predicted_points'] = model.predict(X[rows])
+        realised = pd.Series(shared['points'][upcoming], index=shared['player_id'][upcoming]).groupby(level=0).sum()
+        actual = realised.reindex(candidates['player_id'], fill_value=0).to_numpy(dtype=np.float64)
+        error = candidates['predicted_points'].to_numpy() - actual
+
+        record = {
+            'gameweek': gameweek + 1,
+            'players': len(candidates),
+            'train_rows': int(known.sum()),
+            'fit_seconds': fit_seconds if gameweek == gameweeks[0] else 0.0,
+            'mae': float(np.abs(error).mean()),
+            'rmse': float(np.sqrt((error ** 2).mean())),
+            'squads': [],
+        }
+        for strategy in STRATEGIES:
+            scores = candidates['predicted_points'] if strategy == 'model' else pd.Series(shared['form'][rows])
+            pool = candidates.assign(predicted_points=scores.to_numpy())
+            predicted = pd.Series(pool['predicted_points'].to_numpy(), index=pool['player_id'])
+            for budget, formation in squads:
+                solution = SquadOptimizer(pool, budget, formation).solve()
+                entry = {'strategy': strategy, 'formation': formation, 'budget': budget}
+                entry.update(score_squad(solution, predicted, realised) if solution is not None
+                             else {'points': None, 'predicted': None, 'captain': None, 'cost': None})
+                record['squads'].append(entry)
+        records.append(record)
+    return records
+
+
+def summarise(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """running totals per (strategy, formation, budget) and overall prediction error"""
+    totals: Dict[Tuple, Dict[str, Any]] = {}
+    for record in records:
+        for squad in record['squads']:
+            key = (squad['strategy'], squad['formation'], squad['budget'])
+            total = totals.setdefault(key, {'strategy': key[0], 'formation': key[1], 'budget': key[2],
+                                            'points': 0.0, 'predicted': 0.0, 'gameweeks': 0})
+            if squad['points'] is not None:
+                total['points'] += squad['points']
+                total['predicted'] += squad['predicted']
+                total['gameweeks'] += 1
+            squad['cumulative_points'] = total['points']
+
+    cumulative = sorted(totals.values(), key=lambda total: -total['points'])
+    for total in cumulative:
+        total['points_per_gameweek'] = total['points'] / total['gameweeks'] if total['gameweeks'] else None
+    return {
+        'mae': float(np.mean([r['mae'] for r in records])) if records else None,
+        'rmse': float(np.mean([r['rmse'] for r in records])) if records else None,
+        'cumulative': cumulative,
+    }
+
+
+def run_backtest(df: pd.DataFrame, budgets: List[float], formations: List[str],
+                 start_gameweek: Optional[int] = None, end_gameweek: Optional[int] = None,
+                 refit_every: int = 1, params: Optional[Dict[str, Any]] = None,
+                 workers: int = BACKTEST_WORKERS) -> Dict[str, Any]:
+    """replay the history gameweek by gameweek using only data available at each point
+
+    gameweeks are split into blocks of refit_every decision points; each
+    block refits the model on everything known at its start and runs in its
+    own process against the shared, memory-mapped feature matrix
+    """
+    started = time.perf_counter()
+    arrays = prepare_backtest(df)
+    gameweeks = np.unique(arrays['gameweek']).tolist()
+
+    # a decision point needs at least one finished gameweek to learn from and a next gameweek to score
+    first = max(gameweeks[1], (start_gameweek or 0) - 1)
+    last = min(gameweeks[-2], (end_gameweek or gameweeks[-1]) - 1)
+    decisions = [g for g in gameweeks if first <= g <= last]
+    if not decisions:
+        raise ValueError("Not enough gameweeks to backtest")
+
+    refit_every = max(1, refit_every)
+    blocks = [decisions[i:i + refit_every] for i in range(0, len(decisions), refit_every)]
+    squads = [(budget, formation) for formation in formations for budget in budgets]
+    params = params or BACKTEST_MODEL_PARAMS
+    logger.info(f"Backtesting gameweeks {decisions[0] + 1}-{decisions[-1] + 1} in {len(blocks)} blocks "
+                f"on {workers} workers")
+
+    with shared_matrices(arrays) as matrix_dir:
+        if workers <= 1:
+            open_shared(matrix_dir)
+            results = [_run_block(block, params, squads) for block in blocks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(blocks)), initializer=open_shared,
+                                     initargs=(matrix_dir,)) as pool:
+                # the longest training prefixes go first so they don't finish last
+                futures = {i: pool.submit(_run_block, blocks[i], params, squads)
+                           for i in reversed(range(len(blocks)))}
+                results = [futures[i].result() for i in range(len(blocks))]
+
+    records = [record for block in results for record in block]
+    return {
+        'gameweeks': records,
+        **summarise(records),
+        'params': params,
+        'refit_every': refit_every,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """per-gameweek points (with running totals) and the cumulative table"""
+    keys = [(t['strategy'], t['formation'], t['budget']) for t in report['cumulative']]
+    header = f"{'gw':>4} {'mae':>6} {'rmse':>6}  " + "  ".join(f"{s}/{f}/{b:g}".rjust(20) for s, f, b in keys)
+    lines = [header]
+    for record in report['gameweeks']:
+        squads = {(s['strategy'], s['formation'], s['budget']): s for s in record['squads']}
+        cells = []
+        for key in keys:
+            squad = squads.get(key)
+            cells.append("-".rjust(20) if squad is None or squad['points'] is None
+                         else f"{squad['points']:.0f} ({squad['cumulative_points']:.0f})".rjust(20))
+        lines.append(f"{record['gameweek']:>4} {record['mae']:>6.3f} {record['rmse']:>6.3f}  " + "  ".join(cells))
+
+    lines.append("")
+    lines.append(f"{'strategy':>10} {'formation':>9} {'budget':>6} {'points':>8} {'per gw':>7} {'predicted':>9}")
+    for total in report['cumulative']:
+        per_gw = total['points_per_gameweek']
+        lines.append(f"{total['strategy']:>10} {total['formation']:>9} {total['budget']:>6g} {total['points']:>8.0f} "
+                     f"{per_gw if per_gw is not None else float('nan'):>7.1f} {total['predicted']:>9.0f}")
+    lines.append(f"prediction mae {report['mae']:.3f}, rmse {report['rmse']:.3f}; "
+                 f"{len(report['gameweeks'])} gameweeks in {report['seconds']:.1f}s")
+    return "\n".join(lines)
+
+
+def main():
+    """walk-forward backtest of the model and squad selection on stored history"""
+    from data_collector import FPLDataCollector
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of predictions and squad selection")
+    parser.add_argument("--data", help="data file in data/ (default: newest)")
+    parser.add_argument("--season", help="season of the partitioned dataset to replay (default: newest)")
+    parser.add_argument("--budgets", default="100", help="comma separated squad budgets")
+    parser.add_argument("--formations", default="3-4-3,4-4-2", help="comma separated formations")
+    parser.add_argument("--start", type=int, help="first gameweek to predict")
+    parser.add_argument("--end", type=int, help="last gameweek to predict")
+    parser.add_argument("--refit-every", type=int, default=1, help="gameweeks between model refits")
+    parser.add_argument("--trees", type=int, default=BACKTEST_MODEL_PARAMS['n_estimators'],
+                        help="trees per refit")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--output", help="write the full report as json")
+    args = parser.parse_args()
+
+    collector = FPLDataCollector()
+    if args.data is None and collector.has_dataset():
+        # gameweeks restart every season, so one season is replayed at a time
+        season = args.season or collector.dataset_seasons()[-1]
+        df = collector.load_dataset(seasons=[season])
+    else:
+        filename = args.data or collector.latest_data_file()
+        if filename is None:
+            raise SystemExit("No historical data found. Please collect data first.")
+        df = collector.load_data(filename)
+
+    report = run_backtest(
+        df,
+        budgets=[float(b) for b in args.budgets.split(",")],
+        formations=args.formations.split(","),
+        start_gameweek=args.start,
+        end_gameweek=args.end,
+        refit_every=args.refit_every,
+        params={**BACKTEST_MODEL_PARAMS, 'n_estimators': args.trees},
+        workers=args.workers,
+    )
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+import logging
+from benchmarks import time_call
+from forest_store import ForestArrays
+from fpl_predictor import FPLPredictor, MODEL_PARAMS
+from load_test import free_port, start_service
+from main import select_team_by_formation
+from mock_fpl_api import MockFPLData, MockFPLServer
+from process_stats import peak_memory
+from synthetic_data import synthetic_history
+
+# configure logging for benchmark runs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# baselines are recorded per machine with --update-baseline and kept out of version
+# control: timings from another machine, or from before the measured code changed,
+# are not comparable
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baselines.json")
+
+# data sizes as <seasons>x<players>; the generator goes up to 10x5000
+DEFAULT_SCALES = "1x700,3x2000"
+
+# a result is a regression when it is this much slower or larger than its baseline...
+REGRESSION_TOLERANCE = 0.25
+
+# ...and the absolute difference is above the noise floor
+MIN_SECONDS_DELTA = 0.005
+MIN_MEMORY_DELTA_MB = 2.0
+
+# requests per endpoint after one warm-up request
+ENDPOINT_REQUESTS = 20
+
+ENDPOINTS = [
+    ("GET", "/health", None),
+    ("GET", "/players/current", None),
+    ("GET", "/players/current?fields=id,name,position,team,price&shape=columnar", None),
+    ("GET", "/predict/top-players", None),
+    ("GET", "/predict/horizons", None),
+    ("POST", "/predict/ai-strategy", {'budget': 100.0, 'formation': '3-4-3'}),
+]
+
+
+def parse_scale(scale: str) -> Tuple[int, int]:
+    """'3x2000' -> (3 seasons, 2000 players)"""
+    seasons, _, players = scale.partition("x")
+    return int(seasons), int(players)
+
+
+def measure(func: Callable, items: int, unit: str, repeat: int = 3) -> Dict[str, Any]:
+    """best-of-n wall time, then one run under tracemalloc for the peak python/numpy allocation"""
+    seconds = time_call(func, repeat=repeat)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds': seconds,
+        'peak_mb': peak / 2 ** 20,
+        'items': items,
+        'throughput': items / seconds if seconds > 0 else float('inf'),
+        'unit': unit,
+    }
+
+
+def bench_pipeline(df: pd.DataFrame, trees: int, repeat: int) -> Dict[str, Dict[str, Any]]:
+    """feature engineering, training, prediction and squad selection on one dataset"""
+    results = {}
+    gameweek = int(df['gameweek'].max())
+    predictor = FPLPredictor()
+    predictor.model_params = {**MODEL_PARAMS, 'n_estimators': trees}
+
+    results['create_time_features'] = measure(lambda: predictor.create_time_features(df), len(df), "rows", repeat)
+    features = predictor.create_time_features(df)
+    results['prepare_features'] = measure(lambda: predictor.prepare_features(features), len(df), "rows", repeat)
+    results['train_model'] = measure(lambda: predictor.train_model(df, 1), len(df), "rows", repeat=1)
+
+    frame = predictor.predict_next_gameweek(df, gameweek)
+    results['predict_next_gameweek'] = measure(
+        lambda: predictor.predict_next_gameweek(df, gameweek), len(frame), "players", repeat)
+
+    compiled = FPLPredictor()
+    compiled.scaler, compiled.feature_state = predictor.scaler, predictor.feature_state
+    compiled.model = ForestArrays.from_model(predictor.model, predictor.scaler)
+    compiled.models = {1: compiled.model}
+    results['predict_next_gameweek[compiled]'] = measure(
+        lambda: compiled.predict_next_gameweek(df, gameweek), len(frame), "players", repeat)
+
+    candidates = frame.assign(team_name=frame['team'].astype(str))
+    results['select_team_by_formation'] = measure(
+        lambda: select_team_by_formation(candidates, "3-4-3", 100.0), len(candidates), "candidates", repeat)
+    return results
+
+
+def bench_endpoints(df: pd.DataFrame, trees: int, requests: int = ENDPOINT_REQUESTS) -> Dict[str, Dict[str, Any]]:
+    """latency of the service endpoints under uvicorn, against a mock fpl api built from df
+
+    the service runs from a temporary workspace holding df as its stored
+    history and a model trained on it, so nothing touches the real api or
+    the service's own data/ and models/
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="fpl_bench_") as workspace:
+        os.makedirs(os.path.join(workspace, "data"))
+        df.to_csv(os.path.join(workspace, "data", "fpl_historical_data_bench.csv"), index=False)
+        predictor = FPLPredictor()
+        predictor.model_params = {**MODEL_PARAMS, 'n_estimators': trees}
+        predictor.train_models(df)
+        predictor.save_model(os.path.join(workspace, "models"))
+
+        process = None
+        with MockFPLServer(MockFPLData(df)) as mock:
+            try:
+                port = free_port()
+                process = start_service(mock.base_url, port, {
+                    'ML_SCHEDULER': 'run',
+                    'ML_SNAPSHOT_DIR': os.path.join(workspace, "snapshots"),
+                    'ML_SCHEDULER_INTERVAL': '3600',
+                }, workdir=workspace)
+                url = f"http://127.0.0.1:{port}"
+                with httpx.Client(base_url=url, timeout=120.0) as client:
+                    # predictions are served once the scheduler has published its first snapshot
+                    for _ in range(600):
+                        if client.get("/scheduler/status").json().get('snapshot'):
+                            break
+                        time.sleep(0.1)
+
+                    for method, path, body in ENDPOINTS:
+                        client.request(method, path, json=body).raise_for_status()
+                        samples = []
+                        for _ in range(requests):
+                            start = time.perf_counter()
+                            client.request(method, path, json=body).raise_for_status()
+                            samples.append(time.perf_counter() - start)
+                        results[f"{method} {path}"] = {
+                            'seconds': float(np.median(samples)),
+                            'p95_seconds': float(np.percentile(samples, 95)),
+                            'peak_mb': peak_memory(process.pid),
+                            'items': requests,
+                            'throughput': requests / sum(samples),
+                            'unit': "requests",
+                        }
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+            tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """annotate results with their change against the baseline; returns the regressions"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get('results', {}).get(key)
+        if base is None:
+            continue
+        for metric, floor in (('seconds', MIN_SECONDS_DELTA), ('peak_mb', MIN_MEMORY_DELTA_MB)):
+            if not base.get(metric):
+                continue
+            change = result[metric] / base[metric] - 1
+            result[f'{metric}_change'] = change
+            if change > tolerance and result[metric] - base[metric] > floor:
+                regressions.append(f"{key}: {metric} {base[metric]:.4g} -> {result[metric]:.4g} ({change:+.0%})")
+    return regressions
+
+
+def machine_info() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def format_results(results: Dict[str, Dict[str, Any]]) -> str:
+    lines = [f"{'case':<48} {'seconds':>9} {'peak MB':>8} {'throughput':>18} {'vs baseline':>16}"]
+    for key, result in results.items():
+        change = ""
+        if 'seconds_change' in result:
+            change = f"{result['seconds_change']:+.0%} / {result.get('peak_mb_change', 0):+.0%}"
+        throughput = f"{result['throughput']:,.0f} {result['unit']}/s"
+        lines.append(f"{key:<48} {result['seconds']:>9.4f} {result['peak_mb']:>8.1f} {throughput:>18} {change:>16}")
+    return "\n".join(lines)
+
+
+def main():
+    """offline ml pipeline benchmarks on synthetic data, checked against stored baselines"""
+    parser = argparse.ArgumentParser(description="ML pipeline benchmark suite")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma separated <seasons>x<players>")
+    parser.add_argument("--endpoint-scales", help="scales to benchmark the http endpoints at "
+                                                  "(default: the first scale, 'none' to skip)")
+    parser.add_argument("--trees", type=int, default=20, help="forest size for the training benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument("--output", help="write the results as json")
+    args = parser.parse_args()
+
+    scales = args.scales.split(",")
+    endpoint_scales = (args.endpoint_scales or scales[0]).split(",")
+    settings = {'trees': args.trees, 'seed': args.seed, 'endpoint_requests': ENDPOINT_REQUESTS}
+
+    results = {}
+    for scale in dict.fromkeys(scales + [s for s in endpoint_scales if s != "none"]):
+        seasons, players = parse_scale(scale)
+        df = synthetic_history(seasons, players, seed=args.seed)
+        logger.info(f"Benchmarking {scale}: {len(df)} rows")
+        if scale in scales:
+            for case, result in bench_pipeline(df, args.trees, args.repeat).items():
+                results[f"{case}@{scale}"] = result
+        if scale in endpoint_scales:
+            for case, result in bench_endpoints(df, args.trees).items():
+                results[f"{case}@{scale}"] = result
+
+    baseline = load_baseline(args.baseline)
+    regressions = []
+    if baseline is not None:
+        if baseline.get('settings') != settings:
+            logger.warning(f"Baseline was recorded with {baseline.get('settings')}, not {settings}")
+        if baseline.get('machine', {}).get('cpus') != os.cpu_count():
+            logger.warning("Baseline was recorded on a different machine; timings may not be comparable")
+        regressions = compare(results, baseline, args.tolerance)
+
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'machine': machine_info(), 'settings': settings, 'results': results}, f, indent=2)
+
+    if args.update_baseline:
+        merged = (baseline or {}).get('results', {})
+        merged.update({key: {k: v for k, v in result.items() if not k.endswith('_change')}
+                       for key, result in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump({'created_at': datetime.now().isoformat(), 'machine': machine_info(),
+                       'settings': settings, 'results': merged}, f, indent=2, sort_keys=True)
+        logger.info(f"Baseline written to {args.baseline}")
+        return
+
+    if regressions:
+        print()
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    if baseline is None:
+        logger.info("No baseline yet; run with --update-baseline to record one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,635 @@
+import pandas as pd
+import numpy as np
+import argparse
+import joblib
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+import logging
+from feature_engine import compute_time_features, PlayerFeatureState
+from data_collector import FPLDataCollector, apply_schema
+from mock_fpl_api import MockFPLData, MockFPLServer
+from squad_optimizer import SquadOptimizer, FORMATIONS
+from transfer_planner import TransferPlanner
+from squad_simulator import SquadSimulator
+from forest_store import ForestArrays, export_forest
+from fpl_predictor import FPLPredictor
+from process_stats import process_memory
+from synthetic_data import synthetic_history
+from prediction_frame import build_prediction_frame, player_lookup, prediction_confidence, rank_top_players
+from main import (STREAM_COLUMNS, PlayerPrediction, arrow_chunks, dump_json, json_response, ndjson_chunks,
+                  negotiate_encoding, players_body, prediction_records, select_team_by_formation, stream_rows)
+
+# configure logging for benchmark runs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def legacy_time_features(df: pd.DataFrame) -> pd.DataFrame:
+    """original groupby/rolling implementation, kept as the parity reference"""
+    df = df.copy()
+    df = df.sort_values(['player_id', 'gameweek'])
+
+    for window in [3, 5, 10]:
+        df[f'points_avg_{window}'] = df.groupby('player_id')['points'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
+        df[f'minutes_avg_{window}'] = df.groupby('player_id')['minutes'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
+        df[f'goals_avg_{window}'] = df.groupby('player_id')['goals_scored'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
+        df[f'assists_avg_{window}'] = df.groupby('player_id')['assists'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
+        df[f'ict_avg_{window}'] = df.groupby('player_id')['ict_index'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
+        df[f'xg_avg_{window}'] = df.groupby('player_id')['expected_goals'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
+        df[f'xa_avg_{window}'] = df.groupby('player_id')['expected_assists'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
+
+    df['form_3gw'] = df.groupby('player_id')['points'].rolling(window=3, min_periods=1).mean().reset_index(0, drop=True)
+    df['form_5gw'] = df.groupby('player_id')['points'].rolling(window=5, min_periods=1).mean().reset_index(0, drop=True)
+
+    df['points_trend'] = df.groupby('player_id')['points'].rolling(window=3, min_periods=2).apply(lambda x: np.polyfit(range(len(x)), x, 1)[0] if len(x) >= 2 else 0).reset_index(0, drop=True)
+    df['minutes_trend'] = df.groupby('player_id')['minutes'].rolling(window=3, min_periods=2).apply(lambda x: np.polyfit(range(len(x)), x, 1)[0] if len(x) >= 2 else 0).reset_index(0, drop=True)
+
+    df['points_std_5'] = df.groupby('player_id')['points'].rolling(window=5, min_periods=2).std().reset_index(0, drop=True)
+    df['minutes_std_5'] = df.groupby('player_id')['minutes'].rolling(window=5, min_periods=2).std().reset_index(0, drop=True)
+
+    df['price_change_3gw'] = df.groupby('player_id')['price'].rolling(window=3, min_periods=1).apply(lambda x: x.iloc[-1] - x.iloc[0] if len(x) >= 2 else 0).reset_index(0, drop=True)
+    df['ownership_change_3gw'] = df.groupby('player_id')['selected_by_percent'].rolling(window=3, min_periods=1).apply(lambda x: x.iloc[-1] - x.iloc[0] if len(x) >= 2 else 0).reset_index(0, drop=True)
+
+    return df
+
+
+def load_shipped_data(data_dir: str = "data") -> pd.DataFrame:
+    """load the newest historical csv shipped with the service"""
+    files = sorted(glob.glob(os.path.join(data_dir, "fpl_historical_data_*.csv")))
+    if not files:
+        raise FileNotFoundError(f"No historical data found in {data_dir}/")
+    return pd.read_csv(files[-1])
+
+
+def scale_players(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """replicate the frame with shifted player ids to simulate a larger player pool"""
+    if factor <= 1:
+        return df.copy()
+    offset = int(df['player_id'].max()) + 1
+    copies = []
+    for i in range(factor):
+        copy = df.copy()
+        copy['player_id'] = copy['player_id'] + i * offset
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def scale_gameweeks(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """repeat the gameweek range end to end to simulate a longer history"""
+    if factor <= 1:
+        return df.copy()
+    span = int(df['gameweek'].max())
+    copies = []
+    for i in range(factor):
+        copy = df.copy()
+        copy['gameweek'] = copy['gameweek'] + i * span
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def time_call(func: Callable, *args, repeat: int = 3) -> float:
+    """best-of-n wall time in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_feature_state(df: pd.DataFrame, factors: List[int]) -> None:
+    """incremental update/read latency as the history grows"""
+    print(f"{'history':>8} {'rows':>8} {'recompute (s)':>14} {'update+read (ms)':>17}")
+    for factor in factors:
+        scaled = scale_gameweeks(df, factor)
+        gameweek = int(scaled['gameweek'].max())
+        latest = scaled[scaled['gameweek'] == gameweek]
+        state = PlayerFeatureState.from_history(scaled[scaled['gameweek'] < gameweek])
+        recompute = time_call(compute_time_features, scaled)
+
+        def update_and_read():
+            state.sync(latest)
+            state.feature_frame(gameweek)
+
+        incremental = time_call(update_and_read)
+        print(f"{gameweek:>6}gw {len(scaled):>8} {recompute:>14.4f} {incremental * 1000:>17.2f}")
+
+
+def bench_time_features(df: pd.DataFrame, factors: List[int]) -> None:
+    """legacy vs vectorized timings at several data sizes"""
+    print(f"{'scale':>6} {'rows':>8} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for factor in factors:
+        scaled = scale_players(df, factor)
+        legacy = time_call(legacy_time_features, scaled, repeat=1)
+        vectorized = time_call(compute_time_features, scaled)
+        print(f"{factor:>5}x {len(scaled):>8} {legacy:>12.3f} {vectorized:>15.4f} {legacy / vectorized:>7.0f}x")
+
+
+def bench_collection(df: pd.DataFrame, gameweek_factor: int, latency: float,
+                     workers: int, requests_per_second: float) -> None:
+    """serial vs concurrent collect_historical_data against a local mock api with latency"""
+    history = scale_gameweeks(df, gameweek_factor)
+    end_gameweek = int(history['gameweek'].max())
+
+    with MockFPLServer(MockFPLData(history), latency=latency) as server:
+        serial = FPLDataCollector(base_url=server.base_url, requests_per_second=requests_per_second)
+        concurrent = FPLDataCollector(base_url=server.base_url, max_workers=workers,
+                                      requests_per_second=requests_per_second)
+
+        start = time.perf_counter()
+        serial_df = serial.collect_historical_data(1, end_gameweek)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent_df = concurrent.collect_historical_data(1, end_gameweek)
+        concurrent_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(serial_df, concurrent_df)
+    logger.info(f"Concurrent frame identical to serial ({len(serial_df)} rows)")
+
+    print(f"{end_gameweek} gameweeks, {latency * 1000:.0f} ms injected latency, "
+          f"{requests_per_second:.0f} req/s limit")
+    print(f"  serial:              {serial_time:7.2f}s")
+    print(f"  {workers} workers:           {concurrent_time:7.2f}s  ({serial_time / concurrent_time:.1f}x)")
+
+
+def squad_candidates(df: pd.DataFrame) -> pd.DataFrame:
+    """latest row per player with recent form standing in for predicted points"""
+    features = compute_time_features(df)
+    latest = features.sort_values('gameweek').drop_duplicates('player_id', keep='last')
+    return latest.assign(predicted_points=latest['form_5gw'].astype(np.float64))
+
+
+def bench_squad_optimizer(df: pd.DataFrame, budgets: List[float]) -> None:
+    """solve time for every formation on the full player pool"""
+    candidates = squad_candidates(df)
+    print(f"{len(candidates)} candidates")
+    print(f"{'formation':>9} {'budget':>7} {'solve (ms)':>11} {'nodes':>6} {'cost':>6} {'xi points':>10}")
+    for formation in FORMATIONS:
+        for budget in budgets:
+            solution = None
+
+            def solve():
+                nonlocal solution
+                solution = SquadOptimizer(candidates, budget, formation).solve()
+
+            elapsed = time_call(solve)
+            print(f"{formation:>9} {budget:>7.1f} {elapsed * 1000:>11.1f} {solution['nodes_explored']:>6} "
+                  f"{solution['total_cost']:>6.1f} {solution['starting_points']:>10.2f}")
+
+
+def planner_league(players: int, gameweeks: int, seed: int = 0):
+    """candidates, realized points as perfect per-gameweek predictions, and a squad picked on the week before"""
+    history = synthetic_history(players=players, gameweeks=gameweeks + 1, seed=seed)
+    points = history.pivot(index='player_id', columns='gameweek', values='points').sort_index()
+    first = history[history['gameweek'] == 1].set_index('player_id').loc[points.index].reset_index()
+    candidates = first[['player_id', 'position', 'team', 'price']].assign(
+        predicted_points=first['points'].astype(np.float64))
+    squad = SquadOptimizer(candidates, 100.0, "4-4-2").solve()
+    return candidates, points.to_numpy(dtype=np.float64)[:, 1:], squad['starting_xi'] + squad['bench']
+
+
+def bench_transfer_planner(sizes: List[int], horizons: List[int]) -> None:
+    """plan latency, search size and gain over holding the squad, per pool size and horizon"""
+    print(f"{'players':>8} {'horizon':>8} {'plan (ms)':>10} {'states':>7} {'hold':>7} {'plan':>7} "
+          f"{'transfers':>10} {'hits':>5} {'truncated':>10}")
+    for players in sizes:
+        candidates, points, squad = planner_league(players, max(horizons))
+        for horizon in horizons:
+            planner = TransferPlanner(candidates, points[:, :horizon])
+            plan = None
+
+            def solve():
+                nonlocal plan
+                plan = planner.plan(squad, bank=0.5, free_transfers=1)
+
+            elapsed = time_call(solve)
+            transfers = sum(len(step['transfers']) for step in plan['gameweeks'])
+            hits = sum(step['hits'] for step in plan['gameweeks'])
+            print(f"{players:>8} {horizon:>8} {elapsed * 1000:>10.1f} {plan['states_explored']:>7} "
+                  f"{plan['hold_expected_points']:>7.1f} {plan['expected_points']:>7.1f} {transfers:>10} {hits:>5} "
+                  f"{str(plan['truncated']):>10}")
+
+
+def simulation_squads(squads: int, seed: int = 0) -> List[pd.DataFrame]:
+    """squads picked on recent form, with the minutes and points spread features the simulator reads"""
+    history = compute_time_features(synthetic_history(players=700, gameweeks=6, seed=seed))
+    last = history[history['gameweek'] == history['gameweek'].max()]
+    candidates = last[['player_id', 'position', 'team', 'price', 'minutes_avg_5', 'points_std_5']].assign(
+        predicted_points=last['points_avg_5'].clip(lower=0).astype(np.float64) + 1.0).reset_index(drop=True)
+    result = []
+    for trial in range(squads):
+        # different budgets and formations give different squads from one league
+        squad = SquadOptimizer(candidates, 80.0 + 5 * trial, list(FORMATIONS)[trial % len(FORMATIONS)]).solve()
+        ids = squad['starting_xi'] + squad['bench']
+        result.append(candidates.set_index('player_id', drop=False).loc[ids].reset_index(drop=True))
+    return result
+
+
+def bench_squad_simulation(draws: List[int]) -> None:
+    """sampling and full summary latency per draw count, with the squad distribution and captain pick"""
+    players = simulation_squads(1)[0]
+    print(f"{'draws':>8} {'sample (ms)':>12} {'summary (ms)':>13} {'mean':>6} {'std':>5} {'p95':>6} "
+          f"{'captain':>8} {'upside':>8}")
+    for count in draws:
+        result = None
+
+        def simulate():
+            nonlocal result
+            result = SquadSimulator(players, draws=count).summary()
+
+        sample = time_call(lambda: SquadSimulator(players, draws=count))
+        elapsed = time_call(simulate)
+        captaincy = result['captaincy']
+        print(f"{count:>8} {sample * 1000:>12.1f} {elapsed * 1000:>13.1f} {result['squad_points']['mean']:>6.1f} "
+              f"{result['squad_points']['std']:>5.1f} {result['squad_points']['quantiles']['0.95']:>6.1f} "
+              f"{captaincy['best_expected']['captain']:>8} {captaincy['best_upside']['captain']:>8}")
+
+
+def model_inputs(predictor: FPLPredictor, df: pd.DataFrame) -> pd.DataFrame:
+    """raw model features for every player-gameweek row"""
+    X, _ = predictor.prepare_features(compute_time_features(df))
+    return X
+
+
+def bench_forest_inference(model_dir: str, df: pd.DataFrame, batch_sizes: List[int]) -> None:
+    """compiled forest vs scaler + RandomForestRegressor.predict: load time, size, throughput"""
+    model_path = os.path.join(model_dir, "fpl_model.pkl")
+    scaler_path = os.path.join(model_dir, "fpl_scaler.pkl")
+    model, scaler = joblib.load(model_path), joblib.load(scaler_path)
+    X = model_inputs(FPLPredictor(), df)
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        export_forest(model, export_dir, scaler=scaler)
+        forest_dir = os.path.join(export_dir, "fpl_forest")
+        forest_bytes = sum(os.path.getsize(os.path.join(forest_dir, f)) for f in os.listdir(forest_dir))
+        pickle_bytes = os.path.getsize(model_path) + os.path.getsize(scaler_path)
+        tree_bytes = sum(t.tree_.__getstate__()['nodes'].nbytes + t.tree_.__getstate__()['values'].nbytes
+                         for t in model.estimators_)
+
+        pickle_load = time_call(lambda: (joblib.load(model_path), joblib.load(scaler_path)))
+        array_load = time_call(lambda: ForestArrays.load(export_dir, mmap_mode=None))
+        mmap_load = time_call(lambda: ForestArrays.load(export_dir))
+        forest = ForestArrays.load(export_dir, mmap_mode=None)
+
+        print(f"{'':>18} {'sklearn':>10} {'compiled':>10}")
+        print(f"{'disk (MB)':>18} {pickle_bytes / 1e6:>10.2f} {forest_bytes / 1e6:>10.2f}")
+        print(f"{'tree memory (MB)':>18} {tree_bytes / 1e6:>10.2f} {forest.nbytes() / 1e6:>10.2f}")
+        print(f"{'load (ms)':>18} {pickle_load * 1000:>10.1f} {array_load * 1000:>10.1f}  (mmap {mmap_load * 1000:.2f})")
+        print()
+        print(f"{'rows':>8} {'sklearn (ms)':>13} {'compiled (ms)':>14} {'speedup':>8} {'rows/s compiled':>16}")
+        for size in batch_sizes:
+            batch = pd.concat([X] * (size // len(X) + 1), ignore_index=True).iloc[:size]
+            raw = batch.to_numpy(dtype=np.float64)
+            reference = time_call(lambda: model.predict(scaler.transform(batch)), repeat=5)
+            compiled = time_call(lambda: forest.predict(raw), repeat=5)
+            print(f"{size:>8} {reference * 1000:>13.2f} {compiled * 1000:>14.2f} "
+                  f"{reference / compiled:>7.1f}x {size / compiled:>16.0f}")
+
+
+def _serve_worker(model_dir: str, data_dir: str, mmap: bool, barrier, results) -> None:
+    """load the model like a service worker, predict once, report memory while every worker is alive"""
+    df = load_shipped_data(data_dir)
+    predictor = FPLPredictor()
+    before = process_memory()
+    predictor.load_model(model_dir, mmap=mmap)
+    predictor.predict_next_gameweek(df, int(df['gameweek'].max()))
+    barrier.wait()
+    after = process_memory()
+    after['model_private_mb'] = after.get('private_mb', after['rss_mb']) - before.get('private_mb', before['rss_mb'])
+    results.put(after)
+    barrier.wait()
+
+
+def bench_worker_memory(model_dir: str, data_dir: str, workers: int) -> None:
+    """resident memory per worker with pickled vs memory-mapped model artifacts"""
+    context = multiprocessing.get_context("spawn")
+    print(f"{workers} workers, model {os.path.getsize(os.path.join(model_dir, 'fpl_model.pkl')) / 1e6:.1f} MB pickled")
+    print(f"{'artifacts':>10} {'rss/worker':>11} {'pss/worker':>11} {'private/worker':>15} "
+          f"{'model private/worker':>21} {'total pss':>10}")
+    for mmap in (False, True):
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        processes = [context.Process(target=_serve_worker, args=(model_dir, data_dir, mmap, barrier, results))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        rss = np.mean([r['rss_mb'] for r in reports])
+        pss = [r.get('pss_mb', r['rss_mb']) for r in reports]
+        private = np.mean([r.get('private_mb', r['rss_mb']) for r in reports])
+        label = "mmap" if mmap else "pickle"
+        model_private = np.mean([r['model_private_mb'] for r in reports])
+        print(f"{label:>10} {rss:>9.1f}MB {np.mean(pss):>9.1f}MB {private:>13.1f}MB "
+              f"{model_private:>19.1f}MB {sum(pss):>8.1f}MB")
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """memory held by a frame, including string and category payloads"""
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def pipeline_frames(df: pd.DataFrame, compact: bool) -> Dict[str, pd.DataFrame]:
+    """history, history with time features and model inputs, in compact or default dtypes"""
+    predictor = FPLPredictor()
+    if compact:
+        history = apply_schema(df)
+    else:
+        history = df
+        predictor.feature_dtype = np.float64
+    features = predictor.create_time_features(history)
+    X, _ = predictor.prepare_features(features)
+    return {'history': history, 'time features': features, 'model inputs': X}
+
+
+def bench_dtype_memory(df: pd.DataFrame, factors: List[int]) -> None:
+    """memory of each pipeline frame with default dtypes (plain read_csv, float64 features) vs the compact schema"""
+    print(f"{'rows':>8} {'frame':>14} {'default':>10} {'compact':>10} {'saved':>7}")
+    for factor in factors:
+        scaled = scale_players(df, factor)
+        default = {name: frame_memory_mb(frame) for name, frame in pipeline_frames(scaled, compact=False).items()}
+        compact = {name: frame_memory_mb(frame) for name, frame in pipeline_frames(scaled, compact=True).items()}
+        for name in default:
+            print(f"{len(scaled):>8} {name:>14} {default[name]:>8.1f}MB {compact[name]:>8.1f}MB "
+                  f"{1 - compact[name] / default[name]:>6.0%}")
+
+
+def legacy_player_lookup(bootstrap: Dict) -> Dict[int, Dict]:
+    """the per-player dict lookup the service used before the indexed join, kept for parity checks"""
+    team_map = {team["id"]: team["name"] for team in bootstrap["teams"]}
+    return {
+        player["id"]: {
+            "name": f"{player['first_name']} {player['second_name']}",
+            "team_name": team_map.get(player["team"], "Unknown"),
+            "position": player["element_type"],
+        }
+        for player in bootstrap["elements"]
+    }
+
+
+def legacy_enrich(predictions_df: pd.DataFrame, players: Dict[int, Dict]) -> pd.DataFrame:
+    predictions_df = predictions_df.copy()
+    predictions_df['name'] = predictions_df['player_id'].map(lambda pid: players.get(pid, {}).get('name', f'Player {pid}'))
+    predictions_df['team_name'] = predictions_df['player_id'].map(lambda pid: players.get(pid, {}).get('team_name', 'Unknown'))
+    predictions_df['current_position'] = [players.get(pid, {}).get('position', position) for pid, position
+                                          in zip(predictions_df['player_id'], predictions_df['position'])]
+    # squad rules use the current position
+    predictions_df['position'] = predictions_df['current_position']
+    predictions_df['confidence'] = prediction_confidence(predictions_df)
+    return predictions_df
+
+
+def legacy_top_players(predictions_df: pd.DataFrame) -> Dict[int, List[Dict]]:
+    top_players_by_position = {}
+    for position in [1, 2, 3, 4]:
+        position_players = predictions_df[predictions_df['position'] == position]
+        position_players = position_players.sort_values('predicted_points', ascending=False, kind='stable').head(5)
+        top_players_by_position[position] = []
+        for _, row in position_players.iterrows():
+            top_players_by_position[position].append({
+                'player_id': int(row['player_id']),
+                'name': str(row['name']),
+                'position': int(row['position']),
+                'price': float(row['price']),
+                'team': int(row['team']),
+                'predicted_points': float(row['predicted_points']),
+                'confidence': float(row['confidence']),
+            })
+    return top_players_by_position
+
+
+def legacy_records(frame: pd.DataFrame) -> List[PlayerPrediction]:
+    """iterrows into validated response models, as the endpoints did before"""
+    predictions = []
+    for _, row in frame.iterrows():
+        predictions.append(PlayerPrediction(
+            player_id=int(row['player_id']),
+            predicted_points=float(row['predicted_points']),
+            confidence=float(row['confidence']),
+            features={
+                'name': str(row['name']),
+                'position': int(row['position']),
+                'price': float(row['price']),
+                'team': int(row['team']),
+                'team_name': str(row['team_name'])
+            }
+        ))
+    return predictions
+
+
+def legacy_select_team(frame: pd.DataFrame, formation: str, budget: float) -> List[PlayerPrediction]:
+    """models for every candidate, a python sort, then the squad looked up by id"""
+    predictions = legacy_records(frame)
+    predictions.sort(key=lambda x: x.predicted_points, reverse=True)
+    candidates = pd.DataFrame({
+        'player_id': [p.player_id for p in predictions],
+        'position': [int(p.features.get('position', 3)) for p in predictions],
+        'team': [int(p.features.get('team', 0)) for p in predictions],
+        'price': [float(p.features.get('price', 0)) for p in predictions],
+        'predicted_points': [p.predicted_points for p in predictions],
+    })
+    solution = SquadOptimizer(candidates, budget, formation).solve()
+    by_id = {p.player_id: p for p in predictions}
+    return [by_id[player_id] for player_id in solution['starting_xi'] + solution['bench']]
+
+
+class _FramePredictor:
+    """stands in for a trained model so assembly is timed without inference"""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    def predict_next_gameweek(self, df: pd.DataFrame, current_gameweek: int,
+                              include_features: bool = False) -> pd.DataFrame:
+        return self.frame.copy()
+
+
+def assembly_inputs(players: int, seed: int = 0):
+    """a prediction frame and matching bootstrap payload for a synthetic league of the given size"""
+    history = synthetic_history(players=players, gameweeks=2, seed=seed)
+    bootstrap = MockFPLData(history).bootstrap_static()
+    latest = history[history['gameweek'] == history['gameweek'].max()]
+    frame = latest[['player_id', 'position', 'team', 'price']].reset_index(drop=True)
+    # rounded like model output, so ties occur and ordering is exercised
+    frame['predicted_points'] = np.round(np.random.default_rng(seed).gamma(2.0, 1.5, len(frame)), 2)
+    # a few players missing from bootstrap exercise the placeholder path
+    bootstrap['elements'] = bootstrap['elements'][:-3]
+    # and a few reclassified players the current position path
+    for element in bootstrap['elements'][::50]:
+        element['element_type'] = element['element_type'] % 4 + 1
+    return frame, bootstrap
+
+
+def bench_response_assembly(sizes: List[int]) -> None:
+    """enrichment, top-player ranking and ai-strategy assembly, legacy vs vectorized, per league size"""
+    print(f"{'players':>8} {'step':>12} {'legacy (ms)':>12} {'vectorized (ms)':>16} {'speedup':>8}")
+    for players in sizes:
+        frame, bootstrap = assembly_inputs(players)
+        predictor = _FramePredictor(frame)
+        legacy = legacy_enrich(frame, legacy_player_lookup(bootstrap))
+        enriched = build_prediction_frame(predictor, None, 0, player_lookup(bootstrap))
+        steps = {
+            'enrich': (lambda: legacy_enrich(frame, legacy_player_lookup(bootstrap)),
+                       lambda: build_prediction_frame(predictor, None, 0, player_lookup(bootstrap))),
+            'top players': (lambda: json_response(legacy_top_players(legacy)),
+                            lambda: json_response(rank_top_players(enriched, 0))),
+            'records': (lambda: json_response([p.model_dump() for p in legacy_records(legacy)]),
+                        lambda: json_response(prediction_records(enriched))),
+            'ai strategy': (lambda: legacy_select_team(legacy, "3-4-3", 100.0),
+                            lambda: prediction_records(select_team_by_formation(enriched, "3-4-3", 100.0))),
+        }
+        for name, (before, after) in steps.items():
+            before_time = time_call(before)
+            after_time = time_call(after)
+            print(f"{players:>8} {name:>12} {before_time * 1000:>12.1f} {after_time * 1000:>16.1f} "
+                  f"{before_time / after_time:>7.1f}x")
+
+
+def bench_players_payload(sizes: List[int]) -> None:
+    """/players/current body size and build time per shape and content coding"""
+    variants = {
+        'all fields': (None, False),
+        '5 fields': (['id', 'name', 'position', 'team', 'price'], False),
+        '5 columnar': (['id', 'name', 'position', 'team', 'price'], True),
+    }
+    # br only when brotli is installed
+    encodings = ["identity", "gzip"] + (["br"] if negotiate_encoding("br") == "br" else [])
+    print(f"{'players':>8} {'variant':>11} {'encoding':>9} {'bytes':>10} {'build (ms)':>11}")
+    for players in sizes:
+        _, bootstrap = assembly_inputs(players)
+        for name, (fields, columnar) in variants.items():
+            for encoding in encodings:
+                body = players_body(bootstrap, fields, columnar, encoding)
+                seconds = time_call(players_body, bootstrap, fields, columnar, encoding)
+                print(f"{players:>8} {name:>11} {encoding:>9} {len(body):>10} {seconds * 1000:>11.1f}")
+
+
+def streamed_frame(players: int, features: List[str], seed: int = 0) -> pd.DataFrame:
+    """an enriched prediction frame carrying float32 model inputs, as build_prediction_frame returns it"""
+    frame, bootstrap = assembly_inputs(players, seed)
+    frame = build_prediction_frame(_FramePredictor(frame), None, 0, player_lookup(bootstrap))
+    frame['gameweek'] = 1
+    rng = np.random.default_rng(seed)
+    for feature in features:
+        frame[feature] = rng.gamma(2.0, 1.5, len(frame)).astype(np.float32)
+    return frame
+
+
+def peak_allocation_mb(func: Callable) -> float:
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def bench_prediction_stream(sizes: List[int], features: int = 20) -> None:
+    """peak allocation of streaming every prediction vs one json body of the same rows"""
+    names = [f"feature_{i}" for i in range(features)]
+    print(f"{'players':>8} {'body (MB)':>10} {'one body peak':>14} {'ndjson peak':>12} {'arrow peak':>11} {'ndjson (ms)':>12}")
+    for players in sizes:
+        frame = streamed_frame(players, names)
+        rows = stream_rows(frame, None, None, None, None)
+        columns = STREAM_COLUMNS + names
+
+        def one_body():
+            chunk = frame.iloc[rows][columns]
+            return dump_json(chunk.astype({name: np.float64 for name in names}).to_dict('records'))
+
+        def drain(chunks):
+            return lambda: sum(len(chunk) for chunk in chunks(frame, rows, columns))
+
+        size = len(one_body())
+        print(f"{players:>8} {size / 2 ** 20:>10.1f} {peak_allocation_mb(one_body):>12.1f}MB "
+              f"{peak_allocation_mb(drain(ndjson_chunks)):>10.1f}MB {peak_allocation_mb(drain(arrow_chunks)):>9.1f}MB "
+              f"{time_call(drain(ndjson_chunks)) * 1000:>12.1f}")
+
+
+def main():
+    """run the ml pipeline benchmarks"""
+    parser = argparse.ArgumentParser(description="FPL ML pipeline benchmarks")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--scales", default="1,10", help="comma separated data size multipliers")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock api latency in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent collection workers")
+    parser.add_argument("--rps", type=float, default=50.0, help="collection rate limit")
+    parser.add_argument("--model-dir", default="models", help="trained model for the serving benchmarks")
+    parser.add_argument("--serve-workers", type=int, default=4, help="worker processes in the memory report")
+    args = parser.parse_args()
+
+    df = load_shipped_data(args.data_dir)
+    factors = [int(f) for f in args.scales.split(",")]
+
+    print("create_time_features")
+    print("=" * 60)
+    bench_time_features(df, factors)
+
+    print()
+    print("PlayerFeatureState")
+    print("=" * 60)
+    bench_feature_state(df, factors)
+
+    print()
+    print("Compact dtype schema")
+    print("=" * 60)
+    bench_dtype_memory(df, factors)
+
+    print()
+    print("Response assembly")
+    print("=" * 60)
+    bench_response_assembly(sizes=[700, 5000])
+    print()
+    bench_players_payload(sizes=[700, 5000])
+    print()
+    bench_prediction_stream(sizes=[700, 5000, 50000])
+
+    print()
+    print("collect_historical_data")
+    print("=" * 60)
+    bench_collection(df, gameweek_factor=8, latency=args.latency,
+                     workers=args.workers, requests_per_second=args.rps)
+
+    print()
+    print("SquadOptimizer")
+    print("=" * 60)
+    bench_squad_optimizer(df, budgets=[80.0, 100.0])
+
+    print()
+    print("TransferPlanner")
+    print("=" * 60)
+    bench_transfer_planner(sizes=[700, 5000], horizons=[1, 2, 3, 5, 8])
+
+    print()
+    print("SquadSimulator")
+    print("=" * 60)
+    bench_squad_simulation(draws=[10000, 50000, 200000])
+
+    print()
+    print("Model memory per worker")
+    print("=" * 60)
+    if os.path.exists(os.path.join(args.model_dir, "fpl_model.pkl")):
+        bench_worker_memory(args.model_dir, args.data_dir, args.serve_workers)
+    else:
+        logger.info(f"No trained model in {args.model_dir}/, skipping (run training first)")
+
+    print()
+    print("Compiled forest inference")
+    print("=" * 60)
+    if os.path.exists(os.path.join(args.model_dir, "fpl_model.pkl")):
+        bench_forest_inference(args.model_dir, df, batch_sizes=[1, 15, 741, 10000])
+    else:
+        logger.info(f"No trained model in {args.model_dir}/, skipping (run training first)")
+
+
+if __name__ == "__main__":
+    main()
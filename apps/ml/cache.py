@@ -0,0 +1,122 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cache entry names
+CACHE_KEYS = {
+    'DATASET': 'dataset',
+    'CURRENT_GW': 'current_gameweek',
+    'PREDICTIONS': 'predictions',
+    'PLAYERS': 'players',
+    'SIMULATIONS': 'simulations',
+}
+
+
+class ServiceCache:
+    """process-level cache for the ML service
+
+    each named entry holds a single value tagged with the key it was computed
+    for (e.g. data file mtime, model version, gameweek); a lookup with a
+    different key invalidates the entry and recomputes it. computing an entry
+    holds only that entry's lock, so lookups of other entries (including from
+    the event loop) never wait on a slow computation
+    """
+
+    def __init__(self):
+        # guards the entry and stats dicts only; never held while computing
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        # one lock per entry name, so concurrent misses of an entry compute it once
+        self._entry_locks: Dict[str, threading.RLock] = {}
+
+    def _record(self, name: str, outcome: str) -> None:
+        stats = self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'invalidations': 0})
+        stats[outcome] += 1
+
+    def _entry_lock(self, name: str) -> threading.RLock:
+        with self._lock:
+            return self._entry_locks.setdefault(name, threading.RLock())
+
+    def _lookup(self, name: str, fresh: Callable[[Dict[str, Any]], bool]) -> Tuple[bool, Any]:
+        """(True, value) when name holds a value fresh() accepts, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and fresh(entry):
+                self._record(name, 'hits')
+                return True, entry['value']
+            return False, None
+
+    def _store(self, name: str, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[name] = {'key': key, 'value': value, 'stored_at': time.time()}
+
+    def get_or_compute(self, name: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """return the cached value for name if it was computed for key, else compute and store it"""
+        fresh = lambda entry: entry['key'] == key
+        hit, value = self._lookup(name, fresh)
+        if hit:
+            return value
+
+        with self._entry_lock(name):
+            # another caller may have computed it while we waited for the entry lock
+            hit, value = self._lookup(name, fresh)
+            if hit:
+                return value
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    logger.info(f"Cache key changed for {name}: {entry['key']} -> {key}")
+                    self._record(name, 'invalidations')
+                self._record(name, 'misses')
+
+            value = compute()
+            self._store(name, key, value)
+            return value
+
+    def get_with_ttl(self, name: str, ttl: float, compute: Callable[[], Any]) -> Any:
+        """return the cached value for name while it is younger than ttl seconds"""
+        fresh = lambda entry: time.time() - entry['stored_at'] < ttl
+        hit, value = self._lookup(name, fresh)
+        if hit:
+            return value
+
+        with self._entry_lock(name):
+            hit, value = self._lookup(name, fresh)
+            if hit:
+                return value
+            with self._lock:
+                self._record(name, 'misses')
+
+            value = compute()
+            self._store(name, None, value)
+            return value
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """drop one entry, or every entry when name is None"""
+        with self._lock:
+            names = [name] if name is not None else list(self._entries)
+            for entry_name in names:
+                if self._entries.pop(entry_name, None) is not None:
+                    self._record(entry_name, 'invalidations')
+
+    def get_stats(self) -> Dict[str, Any]:
+        """hit/miss counters and current key for every entry"""
+        with self._lock:
+            entries = {}
+            for name, stats in self._stats.items():
+                entry = self._entries.get(name)
+                entries[name] = {
+                    **stats,
+                    'cached': entry is not None,
+                    'key': repr(entry['key']) if entry is not None and entry['key'] is not None else None,
+                    'age_seconds': round(time.time() - entry['stored_at'], 3) if entry is not None else None,
+                }
+            return {
+                'hits': sum(s['hits'] for s in self._stats.values()),
+                'misses': sum(s['misses'] for s in self._stats.values()),
+                'entries': entries,
+            }
@@ -0,0 +1,28 @@
+import os
+import pytest
+from benchmarks import load_shipped_data
+from fpl_predictor import FPLPredictor, MODEL_PARAMS
+from synthetic_data import synthetic_history
+
+
+@pytest.fixture(scope="session")
+def history():
+    """one synthetic season of player-gameweek rows, shared by the data and model tests"""
+    return synthetic_history(players=300, gameweeks=8, seed=0)
+
+
+@pytest.fixture(scope="session")
+def shipped_history():
+    """the historical csv shipped in data/, read with default dtypes"""
+    return load_shipped_data(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+
+@pytest.fixture(scope="session")
+def model_dir(history, tmp_path_factory):
+    """a small forest trained on the synthetic season and saved like the service's models/"""
+    directory = tmp_path_factory.mktemp("models")
+    predictor = FPLPredictor()
+    predictor.model_params = {**MODEL_PARAMS, 'n_estimators': 20}
+    predictor.train_model(history, 1)
+    predictor.save_model(str(directory))
+    return str(directory)
@@ -5,27 +5,224 @@ import time
 import json
 import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import glob
+import argparse
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from functools import partial
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from fpl_client import FPL_API_BASE, DEFAULT_HEADERS, TokenBucket, get_bootstrap_client
+from metrics import observe_http, timed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Explicit storage schema for the historical player-gameweek frame
+HISTORICAL_SCHEMA: Dict[str, str] = {
+    'player_id': 'int32',
+    'gameweek': 'int16',
+    'points': 'int8',
+    'minutes': 'int16',
+    'goals_scored': 'int8',
+    'assists': 'int8',
+    'clean_sheets': 'int8',
+    'goals_conceded': 'int8',
+    'own_goals': 'int8',
+    'penalties_saved': 'int8',
+    'penalties_missed': 'int8',
+    'yellow_cards': 'int8',
+    'red_cards': 'int8',
+    'saves': 'int8',
+    'bonus': 'int8',
+    'bps': 'int16',
+    'influence': 'float32',
+    'creativity': 'float32',
+    'threat': 'float32',
+    'ict_index': 'float32',
+    'starts': 'int8',
+    'expected_goals': 'float32',
+    'expected_assists': 'float32',
+    'expected_goal_involvements': 'float32',
+    'expected_goals_conceded': 'float32',
+    'name': 'category',
+    'position': 'int8',
+    'team': 'int8',
+    'price': 'float64',  # kept exact: surfaces in API responses and budget sums
+    'selected_by_percent': 'float32',
+    'transfers_in': 'int32',
+    'transfers_out': 'int32',
+    'value_form': 'float32',
+    'value_season': 'float32',
+    'fixture_difficulty': 'int8',
+    'is_home': 'bool',
+}
+
+# Per-file record of when each stored gameweek was captured and whether it was final
+MANIFEST_FILE = "ingest_manifest.json"
+
+# File extension for each supported storage format
+STORAGE_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+# Multi-season dataset, one file per gameweek: dataset/season=2024-25/gameweek=05/part.parquet
+DATASET_DIR = os.path.join("data", "dataset")
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast known columns to the storage schema; unknown columns are left untouched
+
+    Columns already in their schema dtype are not copied, so applying the
+    schema to a frame read back from parquet/feather is close to free
+    """
+    casts = {}
+    for col, dtype in HISTORICAL_SCHEMA.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype == 'category':
+            casts[col] = df[col].astype('category')
+        elif dtype == 'bool':
+            casts[col] = df[col].astype(bool)
+        else:
+            # API stats arrive as strings ("49.2"); ints with gaps stay float
+            values = pd.to_numeric(df[col], errors='coerce')
+            if dtype.startswith('int') and values.isna().any():
+                dtype = 'float32'
+            casts[col] = values.astype(dtype)
+    return df.assign(**casts) if casts else df
+
+
+def storage_format_for(filename: str) -> str:
+    """Infer the storage format from a data file name"""
+    for storage_format, extension in STORAGE_EXTENSIONS.items():
+        if filename.endswith(extension):
+            return storage_format
+    raise ValueError(f"Unsupported data file: {filename}")
+
+def write_frame(df: pd.DataFrame, filepath: str) -> None:
+    """Write a frame in the format given by its extension, swapped in atomically"""
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    
+    # Write to a temporary file and swap it in, so readers never see a partial file
+    tmp_path = f"{filepath}.tmp"
+    storage_format = storage_format_for(filepath)
+    if storage_format == 'csv':
+        df.to_csv(tmp_path, index=False)
+    else:
+        import pyarrow as pa
+        table = pa.Table.from_pandas(apply_schema(df), preserve_index=False)
+        if storage_format == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp_path)
+        else:
+            import pyarrow.feather as feather
+            # Uncompressed IPC so readers can memory-map it without a decode step
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, filepath)
+
+
+def read_frame(filepath: str, columns: Optional[List[str]] = None, memory_map: bool = True) -> pd.DataFrame:
+    """Read a data file in the storage schema, optionally only the requested columns"""
+    storage_format = storage_format_for(filepath)
+    if storage_format == 'csv':
+        usecols = (lambda col: col in columns) if columns is not None else None
+        return apply_schema(pd.read_csv(filepath, usecols=usecols))
+    if storage_format == 'parquet':
+        import pyarrow.parquet as pq
+        if columns is not None:
+            available = pq.read_schema(filepath, memory_map=memory_map).names
+            columns = [col for col in columns if col in available]
+        return apply_schema(pq.read_table(filepath, columns=columns, memory_map=memory_map).to_pandas())
+    
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    if columns is not None:
+        with pa.memory_map(filepath) as source:
+            available = pa.ipc.open_file(source).schema.names
+        columns = [col for col in columns if col in available]
+    return apply_schema(feather.read_table(filepath, columns=columns, memory_map=memory_map).to_pandas())
+
+
+def season_label(when: datetime) -> str:
+    """'2024-25' for any date from July 2024 to June 2025"""
+    start = when.year if when.month >= 7 else when.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def previous_season(season: str) -> str:
+    """'2023-24' for '2024-25'"""
+    start = int(season[:4]) - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def partition_value(name: str, key: str) -> Optional[str]:
+    """'gameweek=05' -> '05' for key 'gameweek'; None for anything else"""
+    prefix = f"{key}="
+    return name[len(prefix):] if name.startswith(prefix) else None
+
+
+def dataset_manifest_key(season: str) -> str:
+    """Capture-manifest entry of one season of the partitioned dataset"""
+    return f"dataset/season={season}"
+
+
+def recent_gameweeks(df: pd.DataFrame, last_gameweeks: Optional[int]) -> pd.DataFrame:
+    """Rows of the newest last_gameweeks gameweeks of df (all rows when None)"""
+    if last_gameweeks is None:
+        return df
+    newest = np.sort(df['gameweek'].unique())[-last_gameweeks:]
+    return df[df['gameweek'].isin(newest)]
+
 class FPLDataCollector:
-    def __init__(self):
-        self.base_url = "https://fantasy.premierleague.com/api"
+    def __init__(self, storage_format: str = "parquet", base_url: str = FPL_API_BASE,
+                 max_workers: int = 1, requests_per_second: float = 10.0,
+                 max_retries: int = 3, backoff_seconds: float = 0.5):
+        if storage_format not in STORAGE_EXTENSIONS:
+            raise ValueError(f"Unsupported storage format: {storage_format}")
+        self.storage_format = storage_format
+        self.base_url = base_url.rstrip('/')
+        
+        # Concurrent collection settings (max_workers=1 keeps the serial path)
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        
+        # Connection pool sized for the number of in-flight requests
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(10, self.max_workers * 2))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # bootstrap-static is shared (and cached) with every other user of this base url
+        self.bootstrap = get_bootstrap_client(self.base_url)
         
+    def _get_json(self, path: str) -> Any:
+        """Rate-limited GET with exponential backoff on connection errors, 429 and 5xx"""
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                started = time.perf_counter()
+                response = self.session.get(url, timeout=10)
+                observe_http(path, response.status_code, time.perf_counter() - started, len(response.content))
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt)
+                logger.warning(f"GET {path} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            response.raise_for_status()
+            return response.json()
+    
     def get_current_gameweek(self) -> int:
         """Get the current gameweek number"""
         try:
-            response = self.session.get(f"{self.base_url}/bootstrap-static/")
-            response.raise_for_status()
-            data = response.json()
+            data = self.bootstrap.get()
             
             # Find current gameweek
             for event in data['events']:
@@ -39,12 +236,34 @@ class FPLDataCollector:
             logger.error(f"Error getting current gameweek: {e}")
             return 1
     
-    def get_historical_gameweek_data(self, gameweek: int) -> List[Dict[str, Any]]:
-        """Get player performance data for a specific gameweek"""
+    def get_gameweek_status(self) -> Dict[int, Dict[str, bool]]:
+        """Finished / data-checked (bonus confirmed) flags for every gameweek"""
+        data = self.bootstrap.get()
+        return {
+            event['id']: {
+                'finished': bool(event.get('finished')),
+                'data_checked': bool(event.get('data_checked')),
+            }
+            for event in data['events']
+        }
+    
+    def get_gameweek_state(self) -> Dict[str, Any]:
+        """Current gameweek with its deadline and finished / data-checked flags, plus the next deadline"""
+        events = self.bootstrap.get()['events']
+        current = next((e for e in events if e['is_current']), None) or max(events, key=lambda e: e['id'])
+        upcoming = next((e for e in events if e.get('is_next')), None)
+        return {
+            'gameweek': current['id'],
+            'deadline_time': current.get('deadline_time'),
+            'finished': bool(current.get('finished')),
+            'data_checked': bool(current.get('data_checked')),
+            'next_deadline_time': upcoming.get('deadline_time') if upcoming else None,
+        }
+    
+    def get_historical_gameweek_data(self, gameweek: int, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """Get player performance data for a specific gameweek (empty on errors unless raise_errors)"""
         try:
-            response = self.session.get(f"{self.base_url}/event/{gameweek}/live/")
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(f"/event/{gameweek}/live/")
             
             gameweek_data = []
             for player in data['elements']:
@@ -81,14 +300,14 @@ class FPLDataCollector:
             
         except Exception as e:
             logger.error(f"Error getting gameweek {gameweek} data: {e}")
+            if raise_errors:
+                raise
             return []
     
     def get_player_static_data(self) -> Dict[int, Dict[str, Any]]:
         """Get static player data (position, team, etc.)"""
         try:
-            response = self.session.get(f"{self.base_url}/bootstrap-static/")
-            response.raise_for_status()
-            data = response.json()
+            data = self.bootstrap.get()
             
             players = {}
             for player in data['elements']:
@@ -110,12 +329,10 @@ class FPLDataCollector:
             logger.error(f"Error getting static player data: {e}")
             return {}
     
-    def get_fixture_data(self, gameweek: int) -> List[Dict[str, Any]]:
-        """Get fixture data for a specific gameweek"""
+    def get_fixture_data(self, gameweek: int, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """Get fixture data for a specific gameweek (empty on errors unless raise_errors)"""
         try:
-            response = self.session.get(f"{self.base_url}/fixtures/?event={gameweek}")
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(f"/fixtures/?event={gameweek}")
             
             fixtures = []
             for fixture in data:
@@ -142,94 +359,410 @@ class FPLDataCollector:
             
         except Exception as e:
             logger.error(f"Error getting fixture data for gameweek {gameweek}: {e}")
+            if raise_errors:
+                raise
             return []
     
-    def collect_historical_data(self, start_gameweek: int = 1, end_gameweek: Optional[int] = None) -> pd.DataFrame:
-        """Collect historical data for multiple gameweeks"""
+    def _build_gameweek_rows(self, gw_data: List[Dict[str, Any]], fixtures: List[Dict[str, Any]],
+                             static_data: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Combine one gameweek's live stats with static and fixture data"""
+        fixture_dict = {}
+        for fixture in fixtures:
+            fixture_dict[fixture['home_team']] = {
+                'difficulty': fixture['home_difficulty'],
+                'is_home': fixture['is_home']
+            }
+        
+        rows = []
+        for player_data in gw_data:
+            player_id = player_data['player_id']
+            if player_id in static_data:
+                # Add static data
+                player_data.update(static_data[player_id])
+                
+                # Add fixture difficulty
+                team_id = static_data[player_id]['team']
+                if team_id in fixture_dict:
+                    player_data['fixture_difficulty'] = fixture_dict[team_id]['difficulty']
+                    player_data['is_home'] = fixture_dict[team_id]['is_home']
+                else:
+                    player_data['fixture_difficulty'] = 3  # Default medium difficulty
+                    player_data['is_home'] = True
+                
+                rows.append(player_data)
+        
+        return rows
+    
+    def _fetch_gameweek(self, gw: int, raise_errors: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Fetch live stats and fixtures for one gameweek"""
+        logger.info(f"Collecting gameweek {gw} data...")
+        return (self.get_historical_gameweek_data(gw, raise_errors),
+                self.get_fixture_data(gw, raise_errors))
+    
+    def collect_historical_data(self, start_gameweek: int = 1, end_gameweek: Optional[int] = None,
+                                max_workers: Optional[int] = None, require_complete: bool = False) -> pd.DataFrame:
+        """Collect historical data for multiple gameweeks
+        
+        With max_workers > 1 gameweeks are fetched concurrently over the pooled
+        session, bounded by the worker count and the token-bucket rate limit;
+        rows are assembled in gameweek order so the frame matches the serial path.
+        With require_complete, a failed request or a gameweek without rows raises
+        instead of being skipped, so callers never store a partial collection.
+        """
         if end_gameweek is None:
             end_gameweek = self.get_current_gameweek()
+        workers = max(1, max_workers if max_workers is not None else self.max_workers)
         
         logger.info(f"Collecting data from gameweek {start_gameweek} to {end_gameweek}")
         
         all_data = []
         static_data = self.get_player_static_data()
+        gameweeks = list(range(start_gameweek, end_gameweek + 1))
         
-        for gw in range(start_gameweek, end_gameweek + 1):
-            logger.info(f"Collecting gameweek {gw} data...")
-            
-            # Get gameweek performance data
-            gw_data = self.get_historical_gameweek_data(gw)
-            
-            # Get fixture data
-            fixtures = self.get_fixture_data(gw)
-            fixture_dict = {}
-            for fixture in fixtures:
-                fixture_dict[fixture['home_team']] = {
-                    'difficulty': fixture['home_difficulty'],
-                    'is_home': fixture['is_home']
-                }
-            
-            # Combine with static data
-            for player_data in gw_data:
-                player_id = player_data['player_id']
-                if player_id in static_data:
-                    # Add static data
-                    player_data.update(static_data[player_id])
-                    
-                    # Add fixture difficulty
-                    team_id = static_data[player_id]['team']
-                    if team_id in fixture_dict:
-                        player_data['fixture_difficulty'] = fixture_dict[team_id]['difficulty']
-                        player_data['is_home'] = fixture_dict[team_id]['is_home']
-                    else:
-                        player_data['fixture_difficulty'] = 3  # Default medium difficulty
-                        player_data['is_home'] = True
-                    
-                    all_data.append(player_data)
-            
-            # Be respectful to the API
-            time.sleep(0.1)
+        if workers == 1:
+            for gw in gameweeks:
+                gw_data, fixtures = self._fetch_gameweek(gw, require_complete)
+                all_data.extend(self._build_gameweek_rows(gw_data, fixtures, static_data))
+                
+                # Be respectful to the API
+                time.sleep(0.1)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map() yields in submission order, i.e. gameweek order
+                fetch = partial(self._fetch_gameweek, raise_errors=require_complete)
+                for gw_data, fixtures in executor.map(fetch, gameweeks):
+                    all_data.extend(self._build_gameweek_rows(gw_data, fixtures, static_data))
         
         df = pd.DataFrame(all_data)
         logger.info(f"Collected {len(df)} player-gameweek records")
         
+        if require_complete:
+            collected = set(df['gameweek'].unique().tolist()) if len(df) else set()
+            missing = [gw for gw in gameweeks if gw not in collected]
+            if missing:
+                raise RuntimeError(f"No player data collected for gameweeks {missing}")
+        
         return df
     
     def save_data(self, df: pd.DataFrame, filename: str = None) -> str:
-        """Save collected data to CSV"""
+        """Save collected data in the configured storage format"""
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"fpl_historical_data_{timestamp}.csv"
+            filename = f"fpl_historical_data_{timestamp}{STORAGE_EXTENSIONS[self.storage_format]}"
         
         filepath = os.path.join("data", filename)
-        os.makedirs("data", exist_ok=True)
-        
-        df.to_csv(filepath, index=False)
+        write_frame(df, filepath)
         logger.info(f"Data saved to {filepath}")
         
         return filepath
     
-    def load_data(self, filename: str) -> pd.DataFrame:
-        """Load data from CSV"""
+    @timed("load_data")
+    def load_data(self, filename: str, columns: Optional[List[str]] = None, memory_map: bool = True) -> pd.DataFrame:
+        """Load data from disk, optionally reading only the requested columns"""
         filepath = os.path.join("data", filename)
-        df = pd.read_csv(filepath)
+        df = read_frame(filepath, columns, memory_map)
         logger.info(f"Data loaded from {filepath}: {len(df)} records")
         
         return df
+    
+    def has_dataset(self) -> bool:
+        """Whether a partitioned dataset has been started in data/dataset"""
+        return os.path.isdir(DATASET_DIR) and any(name.startswith("season=") for name in os.listdir(DATASET_DIR))
+    
+    def current_season(self) -> str:
+        """Season label of the live game, from the first deadline (or today's date when the API has none)"""
+        try:
+            deadline = self.bootstrap.get()['events'][0].get('deadline_time')
+            if deadline:
+                return season_label(datetime.fromisoformat(deadline.replace('Z', '+00:00')))
+        except Exception as e:
+            logger.warning(f"Could not read the season from bootstrap-static: {e}")
+        return season_label(datetime.now())
+    
+    def list_partitions(self, seasons: Optional[Iterable[str]] = None, gameweeks: Optional[Iterable[int]] = None,
+                        last_gameweeks: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored partitions matching the filters, oldest first, without opening any file
+        
+        last_gameweeks keeps only the newest N of the partitions that match
+        """
+        if not os.path.isdir(DATASET_DIR):
+            return []
+        seasons = set(seasons) if seasons is not None else None
+        gameweeks = set(gameweeks) if gameweeks is not None else None
+        
+        partitions = []
+        for season_dir in sorted(os.listdir(DATASET_DIR)):
+            season = partition_value(season_dir, "season")
+            if season is None or (seasons is not None and season not in seasons):
+                continue
+            for gameweek_dir in os.listdir(os.path.join(DATASET_DIR, season_dir)):
+                gameweek = partition_value(gameweek_dir, "gameweek")
+                if gameweek is None or (gameweeks is not None and int(gameweek) not in gameweeks):
+                    continue
+                directory = os.path.join(DATASET_DIR, season_dir, gameweek_dir)
+                files = [f for f in os.listdir(directory) if f.startswith("part.") and not f.endswith(".tmp")]
+                if files:
+                    partitions.append({'season': season, 'gameweek': int(gameweek),
+                                       'path': os.path.join(directory, sorted(files)[-1])})
+        
+        partitions.sort(key=lambda p: (p['season'], p['gameweek']))
+        if last_gameweeks is not None:
+            partitions = partitions[-last_gameweeks:] if last_gameweeks > 0 else []
+        return partitions
+    
+    def dataset_seasons(self) -> List[str]:
+        """Seasons with at least one stored gameweek, oldest first"""
+        return sorted({p['season'] for p in self.list_partitions()})
+    
+    @timed("load_data")
+    def read_partitions(self, partitions: List[Dict[str, Any]], columns: Optional[List[str]] = None,
+                        memory_map: bool = True) -> pd.DataFrame:
+        """Concatenate the given partitions, reading only the requested columns
+        
+        A season column (categorical) is added when rows from more than one
+        season are returned, since gameweek numbers restart every season
+        """
+        frames = [read_frame(p['path'], columns, memory_map) for p in partitions]
+        if not frames:
+            return apply_schema(pd.DataFrame(columns=columns or list(HISTORICAL_SCHEMA)))
+        seasons = [p['season'] for p in partitions]
+        if len(set(seasons)) > 1:
+            frames = [frame.assign(season=season) for frame, season in zip(frames, seasons)]
+        df = pd.concat(frames, ignore_index=True)
+        if 'season' in df.columns:
+            df['season'] = df['season'].astype('category')
+        logger.info(f"Data loaded from {len(partitions)} partitions: {len(df)} records")
+        return df
+    
+    def load_dataset(self, seasons: Optional[Iterable[str]] = None, gameweeks: Optional[Iterable[int]] = None,
+                     columns: Optional[List[str]] = None, last_gameweeks: Optional[int] = None,
+                     memory_map: bool = True) -> pd.DataFrame:
+        """Rows of the partitioned dataset matching the season / gameweek filters
+        
+        Filters are applied to partition paths before anything is read, so
+        only matching gameweek files are opened, and only for the requested
+        columns
+        """
+        partitions = self.list_partitions(seasons, gameweeks, last_gameweeks)
+        return self.read_partitions(partitions, columns, memory_map)
+    
+    def iter_seasons(self, seasons: Optional[Iterable[str]] = None,
+                     columns: Optional[List[str]] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Yield (season, rows) one season at a time, oldest first"""
+        for season in sorted(set(seasons) if seasons is not None else self.dataset_seasons()):
+            yield season, self.load_dataset(seasons=[season], columns=columns)
+    
+    def save_partitions(self, df: pd.DataFrame, season: str) -> List[str]:
+        """Write one partition per gameweek of df, replacing stored partitions of the same gameweeks"""
+        if df.empty or 'gameweek' not in df.columns:
+            raise ValueError(f"No rows to partition for season {season}")
+        paths = []
+        extension = STORAGE_EXTENSIONS[self.storage_format]
+        for gameweek, rows in df.groupby('gameweek', sort=True):
+            directory = os.path.join(DATASET_DIR, f"season={season}", f"gameweek={int(gameweek):02d}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part{extension}")
+            write_frame(rows.drop(columns=['season'], errors='ignore'), path)
+            # a partition written earlier in another format would shadow or duplicate this one
+            for name in os.listdir(directory):
+                if name.startswith("part.") and name != os.path.basename(path) and not name.endswith(".tmp"):
+                    os.remove(os.path.join(directory, name))
+            paths.append(path)
+        logger.info(f"Saved {len(paths)} gameweek partitions of season {season} to {DATASET_DIR}/")
+        return paths
+    
+    def partition_data_file(self, filename: str, season: Optional[str] = None) -> List[str]:
+        """Split a flat historical data file into the partitioned dataset"""
+        season = season or self.current_season()
+        paths = self.save_partitions(self.load_data(filename), season)
+        
+        # Carry the capture records over so incremental collection knows which gameweeks are final
+        captured = self.load_manifest().get(filename)
+        if captured is not None:
+            manifest = self.load_manifest()
+            manifest[dataset_manifest_key(season)] = captured
+            self._write_manifest(manifest)
+        return paths
+    
+    def latest_data_file(self) -> Optional[str]:
+        """Name of the newest historical data file in data/, or None"""
+        if not os.path.exists("data"):
+            return None
+        data_files = [f for f in os.listdir("data") if f.startswith("fpl_historical_data_") and not f.endswith(".tmp")]
+        return sorted(data_files)[-1] if data_files else None
+    
+    def load_manifest(self) -> Dict[str, Any]:
+        """Capture records for every stored data file"""
+        path = os.path.join("data", MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+    
+    def record_capture(self, filename: str, gameweeks: List[int], status: Dict[int, Dict[str, bool]]) -> None:
+        """Record when gameweeks were captured and whether their data was final at the time"""
+        manifest = self.load_manifest()
+        entry = manifest.setdefault(filename, {'gameweeks': {}})
+        captured_at = datetime.now().isoformat()
+        for gw in gameweeks:
+            entry['gameweeks'][str(gw)] = {
+                'captured_at': captured_at,
+                **status.get(gw, {'finished': False, 'data_checked': False}),
+            }
+        
+        self._write_manifest(manifest)
+    
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        path = os.path.join("data", MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    
+    def collect_incremental(self, filename: Optional[str] = None,
+                            last_gameweeks: Optional[int] = None) -> Tuple[pd.DataFrame, str]:
+        """Fetch only gameweeks newer than the stored dataset and add them to it
+        
+        New gameweeks are written as partitions of the current season, so a
+        refresh costs one gameweek's rows however much history is stored. A
+        flat data file (the newest one, or filename) is split into partitions
+        of its own season on first use; a file running past the live gameweek
+        belongs to the previous season, and the new season then starts from
+        gameweek 1. The newest stored gameweek is fetched again if it was
+        captured before its data was checked (bonus points confirmed). Nothing
+        is written or recorded unless every requested gameweek was fetched, so
+        an API failure never replaces stored rows. Returns the current
+        season's rows (only the newest last_gameweeks gameweeks, if given) and
+        where they live
+        """
+        if filename is None and self.has_dataset():
+            return self._collect_partitions(last_gameweeks)
+        
+        filename = filename or self.latest_data_file()
+        if filename is not None:
+            season = self.data_file_season(filename)
+            logger.info(f"Partitioning {filename} as season {season}")
+            self.partition_data_file(filename, season)
+        return self._collect_partitions(last_gameweeks)
+    
+    def data_file_season(self, filename: str) -> str:
+        """Season label of the rows in a flat data file
+        
+        A file ending after the live gameweek was collected last season;
+        otherwise the file's capture records date it, and a file without
+        any is taken to be the live season's
+        """
+        season = self.current_season()
+        stored_gw = int(self.load_data(filename, columns=['gameweek'])['gameweek'].max())
+        if stored_gw > self.get_current_gameweek():
+            return previous_season(season)
+        captures = self.load_manifest().get(filename, {}).get('gameweeks', {}).values()
+        if captures:
+            newest = max(datetime.fromisoformat(capture['captured_at']) for capture in captures)
+            return season_label(newest)
+        return season
+    
+    def _collect_partitions(self, last_gameweeks: Optional[int] = None) -> Tuple[pd.DataFrame, str]:
+        """collect_incremental() for the partitioned dataset: only the current season's missing gameweeks are written"""
+        season = self.current_season()
+        key = dataset_manifest_key(season)
+        status = self.get_gameweek_status()
+        current_gw = self.get_current_gameweek()
+        
+        stored = self.list_partitions(seasons=[season])
+        if stored:
+            stored_gw = stored[-1]['gameweek']
+            captured = self.load_manifest().get(key, {}).get('gameweeks', {}).get(str(stored_gw))
+            start_gw = stored_gw if captured is None or not captured['data_checked'] else stored_gw + 1
+        else:
+            logger.info(f"No stored gameweeks for season {season}. Collecting from gameweek 1...")
+            start_gw = 1
+        
+        if start_gw > current_gw:
+            logger.info(f"Stored data is up to date (season {season}, gameweek {stored_gw})")
+        else:
+            logger.info(f"Fetching gameweeks {start_gw} to {current_gw} of season {season}")
+            new_rows = apply_schema(self.collect_historical_data(start_gameweek=start_gw, end_gameweek=current_gw,
+                                                                 require_complete=True))
+            # an empty fetch leaves the stored partitions and capture records as they are
+            if new_rows.empty:
+                raise RuntimeError(f"No player data collected for gameweeks {start_gw} to {current_gw}")
+            self.save_partitions(new_rows, season)
+            self.record_capture(key, list(range(start_gw, current_gw + 1)), status)
+        
+        return self.load_dataset(seasons=[season], last_gameweeks=last_gameweeks), DATASET_DIR
+    
+    def convert_csv_files(self, remove_csv: bool = False) -> List[str]:
+        """One-shot conversion of existing historical CSVs to the columnar format"""
+        if self.storage_format == 'csv':
+            raise ValueError("Conversion target must be a columnar format")
+        
+        converted = []
+        for csv_path in sorted(glob.glob(os.path.join("data", "fpl_historical_data_*.csv"))):
+            csv_name = os.path.basename(csv_path)
+            target_name = csv_name[:-len('.csv')] + STORAGE_EXTENSIONS[self.storage_format]
+            df = self.load_data(csv_name)
+            converted.append(self.save_data(df, target_name))
+            if remove_csv:
+                os.remove(csv_path)
+        
+        logger.info(f"Converted {len(converted)} CSV files to {self.storage_format}")
+        return converted
 
 def main():
     """Main function to collect historical data"""
-    collector = FPLDataCollector()
+    parser = argparse.ArgumentParser(description="Collect FPL historical data")
+    parser.add_argument("--format", choices=list(STORAGE_EXTENSIONS), default="parquet",
+                        help="storage format for the collected data")
+    parser.add_argument("--convert", action="store_true",
+                        help="convert existing data/fpl_historical_data_*.csv files and exit")
+    parser.add_argument("--remove-csv", action="store_true",
+                        help="delete the CSV files after a successful --convert")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="gameweeks fetched concurrently (1 = serial)")
+    parser.add_argument("--rps", type=float, default=10.0,
+                        help="maximum API requests per second")
+    parser.add_argument("--full", action="store_true",
+                        help="re-collect every gameweek into a new file instead of adding new ones to the newest")
+    parser.add_argument("--partition", nargs="?", const="", metavar="SEASON",
+                        help="split the newest data file into the partitioned dataset under data/dataset "
+                             "(season label such as 2024-25, default: the live season) and exit; "
+                             "later collections then append gameweek partitions")
+    args = parser.parse_args()
     
-    # Collect data for current season (adjust gameweek range as needed)
-    current_gw = collector.get_current_gameweek()
-    logger.info(f"Current gameweek: {current_gw}")
+    collector = FPLDataCollector(storage_format=args.format, max_workers=args.workers,
+                                 requests_per_second=args.rps)
     
-    # Collect data from gameweek 1 to current gameweek
-    df = collector.collect_historical_data(start_gameweek=1, end_gameweek=current_gw)
+    if args.convert:
+        for path in collector.convert_csv_files(remove_csv=args.remove_csv):
+            print(f"Converted: {path}")
+        return
+    
+    if args.partition is not None:
+        filename = collector.latest_data_file()
+        if filename is None:
+            raise SystemExit("No historical data file to partition. Collect data first.")
+        paths = collector.partition_data_file(filename, args.partition or None)
+        print(f"Partitioned {filename} into {len(paths)} gameweek partitions under {DATASET_DIR}/")
+        return
     
-    # Save the data
-    filename = collector.save_data(df)
+    if args.full:
+        # Collect data from gameweek 1 to current gameweek
+        current_gw = collector.get_current_gameweek()
+        logger.info(f"Current gameweek: {current_gw}")
+        status = collector.get_gameweek_status()
+        df = collector.collect_historical_data(start_gameweek=1, end_gameweek=current_gw, require_complete=True)
+        if collector.has_dataset():
+            season = collector.current_season()
+            collector.save_partitions(df, season)
+            collector.record_capture(dataset_manifest_key(season), sorted(df['gameweek'].unique().tolist()), status)
+            filename = DATASET_DIR
+        else:
+            filename = collector.save_data(df)
+            collector.record_capture(os.path.basename(filename), sorted(df['gameweek'].unique().tolist()), status)
+    else:
+        # Only fetch gameweeks newer than what is already stored
+        df, filename = collector.collect_incremental()
     
     print(f"Historical data collection complete!")
     print(f"Collected {len(df)} player-gameweek records")
@@ -0,0 +1,341 @@
+import pandas as pd
+import numpy as np
+import joblib
+from typing import Dict, List, Optional, Tuple
+
+# rolling window sizes used for the averaged features
+ROLLING_WINDOWS = [3, 5, 10]
+
+# longest look-back any feature needs (in gameweeks)
+MAX_WINDOW = max(ROLLING_WINDOWS)
+
+# source column -> feature prefix for the rolling averages
+ROLLING_SOURCES: Dict[str, str] = {
+    'points': 'points',
+    'minutes': 'minutes',
+    'goals_scored': 'goals',
+    'assists': 'assists',
+    'ict_index': 'ict',
+    'expected_goals': 'xg',
+    'expected_assists': 'xa',
+}
+
+# dtype the time feature columns are stored in; windows are computed in float64
+# and cast once at the end, so the only loss is the final rounding
+FEATURE_DTYPE = np.float32
+
+# (feature, source, window) for the consistency indicators
+STD_FEATURES: List[Tuple[str, str, int]] = [
+    ('points_std_5', 'points', 5),
+    ('minutes_std_5', 'minutes', 5),
+]
+
+# (feature, source) for the 3-gameweek least-squares slopes
+TREND_FEATURES: List[Tuple[str, str]] = [
+    ('points_trend', 'points'),
+    ('minutes_trend', 'minutes'),
+]
+
+# (feature, source) for the 3-gameweek first-to-last deltas
+CHANGE_FEATURES: List[Tuple[str, str]] = [
+    ('price_change_3gw', 'price'),
+    ('ownership_change_3gw', 'selected_by_percent'),
+]
+
+
+def time_feature_columns() -> List[str]:
+    """names of every column added by compute_time_features, in output order"""
+    columns = [
+        f'{prefix}_avg_{window}'
+        for window in ROLLING_WINDOWS
+        for prefix in ROLLING_SOURCES.values()
+    ]
+    columns += ['form_3gw', 'form_5gw']
+    columns += [name for name, _ in TREND_FEATURES]
+    columns += [name for name, _, _ in STD_FEATURES]
+    columns += [name for name, _ in CHANGE_FEATURES]
+    return columns
+
+
+def _group_positions(player_ids: np.ndarray) -> np.ndarray:
+    """row offset of each row within its (contiguous) player group"""
+    n = len(player_ids)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.empty(n, dtype=bool)
+    starts[0] = True
+    starts[1:] = player_ids[1:] != player_ids[:-1]
+    start_idx = np.where(starts, np.arange(n), 0)
+    return np.arange(n) - np.maximum.accumulate(start_idx)
+
+
+def _lagged(values: np.ndarray, positions: np.ndarray, lag: int) -> np.ndarray:
+    """values shifted down by lag rows within each player, NaN where the lag leaves the group"""
+    if lag == 0:
+        return values
+    shifted = np.full_like(values, np.nan)
+    shifted[lag:] = values[:-lag]
+    shifted[positions < lag] = np.nan
+    return shifted
+
+
+def compute_time_features(df: pd.DataFrame, dtype: np.dtype = FEATURE_DTYPE) -> pd.DataFrame:
+    """vectorized equivalent of the per-player rolling features
+
+    rows are sorted by player and gameweek (as the groupby version did) and every
+    window statistic is computed with closed-form numpy maths over lagged copies
+    of the source columns, so the whole frame is handled in a single grouped pass.
+    the new columns are stored as dtype; the input columns keep their own dtypes
+    """
+    df = df.sort_values(['player_id', 'gameweek'])
+    positions = _group_positions(df['player_id'].to_numpy())
+
+    sources = list(ROLLING_SOURCES)
+    values = df[sources].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    # running windowed sums/counts, snapshotted as each window size is reached
+    window_sum = np.zeros_like(filled)
+    window_count = np.zeros_like(filled)
+    means: Dict[int, np.ndarray] = {}
+    for lag in range(MAX_WINDOW):
+        in_group = (positions >= lag)[:, None]
+        if lag == 0:
+            window_sum += filled
+            window_count += valid
+        else:
+            window_sum[lag:] += np.where(in_group[lag:], filled[:-lag], 0.0)
+            window_count[lag:] += in_group[lag:] & valid[:-lag]
+        if lag + 1 in ROLLING_WINDOWS:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means[lag + 1] = np.where(window_count > 0, window_sum / window_count, np.nan)
+
+    features: Dict[str, np.ndarray] = {}
+    for window in ROLLING_WINDOWS:
+        for i, prefix in enumerate(ROLLING_SOURCES.values()):
+            features[f'{prefix}_avg_{window}'] = means[window][:, i]
+
+    points_idx = sources.index('points')
+    features['form_3gw'] = means[3][:, points_idx]
+    features['form_5gw'] = means[5][:, points_idx]
+
+    # slope of a least-squares line through the last 2-3 points
+    for name, source in TREND_FEATURES:
+        x = df[source].to_numpy(dtype=np.float64)
+        slope = np.where(positions >= 2,
+                         (x - _lagged(x, positions, 2)) / 2.0,
+                         x - _lagged(x, positions, 1))
+        features[name] = slope
+
+    # two-pass sample standard deviation (ddof=1) over the window
+    for name, source, window in STD_FEATURES:
+        x = df[source].to_numpy(dtype=np.float64)
+        mean = means[window][:, sources.index(source)]
+        squares = np.zeros(len(x))
+        count = np.zeros(len(x))
+        for lag in range(window):
+            lagged = _lagged(x, positions, lag)
+            ok = ~np.isnan(lagged)
+            squares += np.where(ok, (lagged - mean) ** 2, 0.0)
+            count += ok
+        with np.errstate(invalid='ignore', divide='ignore'):
+            features[name] = np.where(count >= 2, np.sqrt(squares / (count - 1)), np.nan)
+
+    # last minus first value across the 3-gameweek window
+    for name, source in CHANGE_FEATURES:
+        x = df[source].to_numpy(dtype=np.float64)
+        first = np.where(positions >= 2, _lagged(x, positions, 2), _lagged(x, positions, 1))
+        features[name] = np.where(positions >= 1, x - first, 0.0)
+
+    feature_frame = pd.DataFrame(
+        {name: features[name].astype(dtype, copy=False) for name in time_feature_columns()},
+        index=df.index,
+    )
+    overlap = [col for col in feature_frame.columns if col in df.columns]
+    return pd.concat([df.drop(columns=overlap), feature_frame], axis=1)
+
+
+# every source column the rolling state has to remember, in buffer order
+STATE_SOURCES: List[str] = list(dict.fromkeys(
+    list(ROLLING_SOURCES)
+    + [source for _, source, _ in STD_FEATURES]
+    + [source for _, source in TREND_FEATURES]
+    + [source for _, source in CHANGE_FEATURES]
+))
+
+
+class PlayerFeatureState:
+    """per-player ring buffers of the last MAX_WINDOW gameweeks plus running window sums
+
+    applying a gameweek costs O(players) regardless of how much history has been
+    seen, and feature_frame() yields the same time features compute_time_features
+    would produce for each player's latest row
+    """
+
+    def __init__(self):
+        self.gameweek = None
+        self.player_index = pd.Index([], dtype=np.int64)
+        self.latest_rows = pd.DataFrame()
+        self.buffer = np.full((0, MAX_WINDOW, len(STATE_SOURCES)), np.nan)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.window_sums = {w: np.zeros((0, len(STATE_SOURCES))) for w in ROLLING_WINDOWS}
+        self.window_counts = {w: np.zeros((0, len(STATE_SOURCES))) for w in ROLLING_WINDOWS}
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> 'PlayerFeatureState':
+        """build the state by replaying a historical frame gameweek by gameweek"""
+        state = cls()
+        state.sync(df)
+        return state
+
+    def sync(self, df: pd.DataFrame, up_to_gameweek: Optional[int] = None) -> None:
+        """apply the gameweeks in df that the state has not fully seen yet
+
+        the latest gameweek already held is re-applied as well, so late corrections
+        (e.g. confirmed bonus points) replace the provisional values
+        """
+        gameweeks = df['gameweek']
+        if up_to_gameweek is not None:
+            df = df[gameweeks <= up_to_gameweek]
+            gameweeks = df['gameweek']
+        if self.gameweek is not None:
+            df = df[gameweeks >= self.gameweek]
+            gameweeks = df['gameweek']
+        for gameweek, gw_rows in df.groupby(gameweeks, sort=True):
+            self.update(gw_rows, int(gameweek))
+
+    def _lag(self, slots: np.ndarray, lag: int) -> np.ndarray:
+        """source values lag gameweeks back for the given slots, NaN when not yet seen"""
+        count = self.count[slots]
+        values = self.buffer[slots, (count - 1 - lag) % MAX_WINDOW]
+        values[count <= lag] = np.nan
+        return values
+
+    def _grow(self, player_ids: np.ndarray) -> np.ndarray:
+        """map player ids to buffer slots, allocating slots for unseen players"""
+        new_ids = pd.Index(player_ids).difference(self.player_index)
+        if len(new_ids) > 0:
+            extra = len(new_ids)
+            self.player_index = self.player_index.append(new_ids)
+            self.buffer = np.concatenate(
+                [self.buffer, np.full((extra, MAX_WINDOW, len(STATE_SOURCES)), np.nan)])
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            for w in ROLLING_WINDOWS:
+                self.window_sums[w] = np.concatenate(
+                    [self.window_sums[w], np.zeros((extra, len(STATE_SOURCES)))])
+                self.window_counts[w] = np.concatenate(
+                    [self.window_counts[w], np.zeros((extra, len(STATE_SOURCES)))])
+        return self.player_index.get_indexer(player_ids)
+
+    def update(self, gw_rows: pd.DataFrame, gameweek: int) -> None:
+        """push one gameweek of player rows into the state in O(players)"""
+        if self.gameweek is not None and gameweek < self.gameweek:
+            raise ValueError(f"Gameweek {gameweek} is older than the state (gameweek {self.gameweek})")
+
+        gw_rows = gw_rows.drop_duplicates('player_id', keep='last')
+        slots = self._grow(gw_rows['player_id'].to_numpy())
+        values = gw_rows[STATE_SOURCES].to_numpy(dtype=np.float64)
+
+        # players whose newest buffered row is this gameweek get it replaced, not pushed
+        if len(self.latest_rows) > 0:
+            previous_gw = self.latest_rows['gameweek'].reindex(gw_rows['player_id']).to_numpy()
+            replace = previous_gw == gameweek
+        else:
+            replace = np.zeros(len(slots), dtype=bool)
+
+        if replace.any():
+            self._replace(slots[replace], values[replace])
+        self._push(slots[~replace], values[~replace])
+
+        rows = gw_rows.set_index('player_id', drop=False)
+        rows.index.name = None
+        if len(self.latest_rows) > 0:
+            kept = self.latest_rows.drop(index=rows.index, errors='ignore')
+            self.latest_rows = pd.concat([kept, rows])
+        else:
+            self.latest_rows = rows.copy()
+        self.gameweek = gameweek
+
+    def _push(self, slots: np.ndarray, values: np.ndarray) -> None:
+        """append values as the newest buffered gameweek, rolling the window sums"""
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        count = self.count[slots]
+        for w in ROLLING_WINDOWS:
+            # the value falling out of a w-wide window is the one w gameweeks back
+            leaving = self._lag(slots, w - 1)
+            leaving_valid = ~np.isnan(leaving)
+            self.window_sums[w][slots] += filled - np.where(leaving_valid, leaving, 0.0)
+            self.window_counts[w][slots] += valid.astype(np.float64) - leaving_valid
+        self.buffer[slots, count % MAX_WINDOW] = values
+        self.count[slots] = count + 1
+
+    def _replace(self, slots: np.ndarray, values: np.ndarray) -> None:
+        """overwrite the newest buffered gameweek, shifting every window sum by the difference"""
+        old = self._lag(slots, 0)
+        valid, old_valid = ~np.isnan(values), ~np.isnan(old)
+        delta = np.where(valid, values, 0.0) - np.where(old_valid, old, 0.0)
+        for w in ROLLING_WINDOWS:
+            self.window_sums[w][slots] += delta
+            self.window_counts[w][slots] += valid.astype(np.float64) - old_valid
+        self.buffer[slots, (self.count[slots] - 1) % MAX_WINDOW] = values
+
+    def feature_frame(self, gameweek: Optional[int] = None, dtype: np.dtype = FEATURE_DTYPE) -> pd.DataFrame:
+        """latest rows with time features, for players whose newest row is gameweek"""
+        if gameweek is None:
+            gameweek = self.gameweek
+        rows = self.latest_rows[self.latest_rows['gameweek'] == gameweek]
+        rows = rows.sort_values('player_id')
+        slots = self.player_index.get_indexer(rows['player_id'].to_numpy())
+        src = {name: i for i, name in enumerate(STATE_SOURCES)}
+
+        features: Dict[str, np.ndarray] = {}
+        means = {}
+        for w in ROLLING_WINDOWS:
+            counts = self.window_counts[w][slots]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means[w] = np.where(counts > 0, self.window_sums[w][slots] / counts, np.nan)
+            for source, prefix in ROLLING_SOURCES.items():
+                features[f'{prefix}_avg_{w}'] = means[w][:, src[source]]
+
+        features['form_3gw'] = means[3][:, src['points']]
+        features['form_5gw'] = means[5][:, src['points']]
+
+        count = self.count[slots]
+        lag0, lag1, lag2 = (self._lag(slots, lag) for lag in range(3))
+
+        for name, source in TREND_FEATURES:
+            i = src[source]
+            features[name] = np.where(count >= 3, (lag0[:, i] - lag2[:, i]) / 2.0, lag0[:, i] - lag1[:, i])
+
+        for name, source, window in STD_FEATURES:
+            i = src[source]
+            mean = means[window][:, i]
+            lags = np.stack([self._lag(slots, lag)[:, i] for lag in range(window)], axis=1)
+            ok = ~np.isnan(lags)
+            squares = np.where(ok, (lags - mean[:, None]) ** 2, 0.0).sum(axis=1)
+            n = ok.sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                features[name] = np.where(n >= 2, np.sqrt(squares / (n - 1)), np.nan)
+
+        for name, source in CHANGE_FEATURES:
+            i = src[source]
+            first = np.where(count >= 3, lag2[:, i], lag1[:, i])
+            features[name] = np.where(count >= 2, lag0[:, i] - first, 0.0)
+
+        feature_frame = pd.DataFrame(
+            {name: features[name].astype(dtype, copy=False) for name in time_feature_columns()},
+            index=rows.index,
+        )
+        overlap = [col for col in feature_frame.columns if col in rows.columns]
+        return pd.concat([rows.drop(columns=overlap), feature_frame], axis=1).reset_index(drop=True)
+
+    def save(self, path: str) -> None:
+        """persist the state alongside the model artifacts"""
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: str) -> 'PlayerFeatureState':
+        """load a previously saved state"""
+        return joblib.load(path)
@@ -0,0 +1,214 @@
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# directory (inside the model dir) holding the compiled forest; models for
+# other prediction horizons are exported next to it under their own names
+FOREST_DIR = "fpl_forest"
+FOREST_META = "meta.json"
+
+# bumped whenever the array layout changes; older exports are recompiled on load
+FOREST_FORMAT = 2
+
+# one .npy file per array; every tree's nodes are concatenated end to end and
+# children holds (left, right) pairs interleaved, so node i's children sit at 2i, 2i+1
+FOREST_ARRAYS = ['feature', 'threshold', 'children', 'value', 'roots']
+
+# (tree, row) lookups stepped together per pass; small enough to stay in cache
+PREDICT_WORKING_SET = 32768
+
+
+def _scaled_float32(x: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """what sklearn compares against a threshold: StandardScaler output cast to float32"""
+    return ((x - mean) / scale).astype(np.float32)
+
+
+def fold_thresholds(threshold: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """raw-feature thresholds equivalent to comparing scaled float32 features
+
+    the scaled-and-rounded feature is monotone in the raw value, so for every
+    threshold t there is a largest raw x with scaled(x) <= t; comparing the raw
+    feature against that x gives exactly the split sklearn makes. it is found by
+    bisection starting from t * scale + mean
+    """
+    guess = threshold * scale + mean
+    step = (np.abs(guess) + scale) * 2.0 ** -20
+
+    # bracket: scaled(lo) <= t < scaled(hi)
+    lo, hi = guess - step, guess + step
+    for _ in range(64):
+        low_bad = _scaled_float32(lo, mean, scale) > threshold
+        high_bad = _scaled_float32(hi, mean, scale) <= threshold
+        if not (low_bad.any() or high_bad.any()):
+            break
+        step = step * 2
+        lo = np.where(low_bad, lo - step, lo)
+        hi = np.where(high_bad, hi + step, hi)
+    else:
+        raise ValueError("Could not bracket folded thresholds")
+
+    while True:
+        mid = lo + (hi - lo) / 2
+        done = (mid == lo) | (mid == hi)
+        if done.all():
+            return lo
+        go_left = _scaled_float32(mid, mean, scale) <= threshold
+        lo = np.where(~done & go_left, mid, lo)
+        hi = np.where(~done & ~go_left, mid, hi)
+
+
+def compile_forest(model, scaler=None) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """flatten a fitted RandomForestRegressor into contiguous arrays
+
+    child pointers are absolute indices into the concatenated arrays and leaves
+    point at themselves, so evaluation can step every tree a fixed number of
+    levels without checking for leaves. when a fitted StandardScaler is given
+    it is folded into the thresholds and the forest takes raw features.
+    feature ids are stored as small ints; child pointers stay intp because
+    numpy would convert narrower index arrays on every gather
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    sizes = np.array([tree.node_count for tree in trees], dtype=np.int64)
+    roots = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)
+
+    feature, threshold, left, right, value = [], [], [], [], []
+    for tree, root in zip(trees, roots):
+        nodes = np.arange(tree.node_count, dtype=np.int64) + root
+        is_leaf = tree.children_left < 0
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+        left.append(np.where(is_leaf, nodes, tree.children_left + root))
+        right.append(np.where(is_leaf, nodes, tree.children_right + root))
+        value.append(tree.value[:, 0, 0])
+
+    n_features = int(model.n_features_in_)
+    feature = np.concatenate(feature)
+    threshold = np.concatenate(threshold).astype(np.float64)
+    left, right = np.concatenate(left), np.concatenate(right)
+    is_leaf = left == np.arange(int(sizes.sum()))
+
+    if scaler is not None:
+        mean = np.asarray(scaler.mean_, dtype=np.float64)[feature]
+        scale = np.asarray(scaler.scale_, dtype=np.float64)[feature]
+        folded = fold_thresholds(threshold[~is_leaf], mean[~is_leaf], scale[~is_leaf])
+        threshold = threshold.copy()
+        threshold[~is_leaf] = folded
+
+    children = np.empty(2 * len(left), dtype=np.intp)
+    children[0::2], children[1::2] = left, right
+
+    arrays = {
+        'feature': feature.astype(np.min_scalar_type(max(n_features - 1, 0))),
+        'threshold': threshold,
+        'children': children,
+        'value': np.concatenate(value).astype(np.float64),
+        'roots': roots,
+    }
+    meta = {
+        'format': FOREST_FORMAT,
+        'n_trees': len(trees),
+        'n_nodes': int(sizes.sum()),
+        'n_features': n_features,
+        'max_depth': int(max(tree.max_depth for tree in trees)),
+        'scaler_folded': scaler is not None,
+    }
+    return arrays, meta
+
+
+def export_forest(model, model_dir: str, version: Optional[str] = None, scaler=None,
+                  name: str = FOREST_DIR) -> str:
+    """compile the forest and write it as .npy arrays that can be memory-mapped"""
+    arrays, meta = compile_forest(model, scaler)
+    meta['version'] = version
+
+    # write next to the final files and swap in; workers that still map the
+    # old files keep reading the old inodes until they reload
+    path = os.path.join(model_dir, name)
+    os.makedirs(path, exist_ok=True)
+    suffix = f".{os.getpid()}.tmp"
+    for name, array in arrays.items():
+        target = os.path.join(path, f"{name}.npy")
+        with open(target + suffix, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(target + suffix, target)
+    meta_path = os.path.join(path, FOREST_META)
+    with open(meta_path + suffix, 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_path + suffix, meta_path)
+
+    logger.info(f"Exported forest ({meta['n_trees']} trees, {meta['n_nodes']} nodes) to {path}/")
+    return path
+
+
+def read_forest_meta(model_dir: str, name: str = FOREST_DIR) -> Optional[Dict[str, Any]]:
+    """metadata of the exported forest, or None if there is none"""
+    meta_path = os.path.join(model_dir, name, FOREST_META)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+class ForestArrays:
+    """read-only random forest backed by (memory-mapped) compiled arrays
+
+    predict() matches RandomForestRegressor.predict: with the scaler folded in
+    it takes raw features, otherwise the same scaled input as sklearn. blocks
+    of trees are stepped level by level for many rows at once
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        self.arrays = arrays
+        self.meta = meta
+        self.n_features_in_ = meta['n_features']
+        self.n_estimators = meta['n_trees']
+        self.scaler_folded = bool(meta.get('scaler_folded', False))
+
+    @classmethod
+    def from_model(cls, model, scaler=None) -> 'ForestArrays':
+        """compile in memory without writing anything"""
+        return cls(*compile_forest(model, scaler))
+
+    @classmethod
+    def load(cls, model_dir: str, mmap_mode: Optional[str] = 'r', name: str = FOREST_DIR) -> 'ForestArrays':
+        """open the exported arrays; with mmap_mode='r' pages are shared by every process mapping them"""
+        path = os.path.join(model_dir, name)
+        meta = read_forest_meta(model_dir, name)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in FOREST_ARRAYS}
+        return cls(arrays, meta)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64 if self.scaler_folded else np.float32)
+        n_rows, n_features = X.shape
+        feature, threshold = self.arrays['feature'], self.arrays['threshold']
+        children, value = self.arrays['children'], self.arrays['value']
+        roots = np.asarray(self.arrays['roots'])
+
+        # a node's split value for a row is one flat gather at row * n_features + feature
+        flat = np.ascontiguousarray(X).ravel()
+        row_base = np.arange(n_rows, dtype=np.intp) * n_features
+
+        # blocks of trees x row chunks keep each pass inside the working set
+        row_chunk = min(n_rows, PREDICT_WORKING_SET) or 1
+        tree_block = max(1, PREDICT_WORKING_SET // row_chunk)
+
+        total = np.zeros(n_rows, dtype=np.float64)
+        for start in range(0, n_rows, row_chunk):
+            rows = slice(start, start + row_chunk)
+            n_chunk = len(row_base[rows])
+            for first in range(0, len(roots), tree_block):
+                block = roots[first:first + tree_block]
+                node = np.repeat(block, n_chunk)
+                base = np.tile(row_base[rows], len(block))
+                for _ in range(self.meta['max_depth']):
+                    go_right = flat[base + feature[node]] > threshold[node]
+                    node = children[2 * node + go_right]
+                total[rows] += value[node].reshape(len(block), n_chunk).sum(axis=0)
+        return total / self.n_estimators
+
+    def nbytes(self) -> int:
+        return int(sum(array.nbytes for array in self.arrays.values()))
@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import Any, Dict, Optional
+import httpx
+import requests
+import logging
+from metrics import observe_http
+
+logger = logging.getLogger(__name__)
+
+# base url for the official fpl api; override to point at a local stand-in server
+FPL_API_BASE = os.getenv("FPL_API_BASE", "https://fantasy.premierleague.com/api")
+
+# seconds a bootstrap-static payload is served without revalidation
+BOOTSTRAP_TTL = int(os.getenv("FPL_BOOTSTRAP_TTL", "300"))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+
+class BootstrapStaticClient:
+    """ttl cache in front of /bootstrap-static/ with conditional revalidation
+
+    within the ttl the cached payload is returned directly; after it, the
+    request carries If-None-Match / If-Modified-Since so an unchanged payload
+    costs a 304 instead of a multi-megabyte download. concurrent callers that
+    miss at the same time share a single in-flight fetch, whether they called
+    get() (blocking, on requests) or aget() (the event-loop version on httpx);
+    both share the same cached payload and validators
+    """
+
+    def __init__(self, base_url: str = FPL_API_BASE, ttl: float = BOOTSTRAP_TTL,
+                 session: Optional[requests.Session] = None, timeout: float = 10.0):
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+
+        self._fetch_lock = threading.Lock()
+        self._inflight: Optional[Future] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._payload: Optional[Dict[str, Any]] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._digest: Optional[str] = None
+        self._fetched_at = 0.0
+        self.stats = {'hits': 0, 'downloads': 0, 'not_modified': 0, 'errors': 0, 'stale_served': 0}
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/bootstrap-static/"
+
+    @property
+    def etag(self) -> Optional[str]:
+        """validator of the payload currently held"""
+        return self._etag
+
+    @property
+    def version(self) -> Optional[str]:
+        """digest of the payload body currently held; changes exactly when the data does"""
+        return self._digest
+
+    def _fresh(self) -> bool:
+        return self._payload is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    def _claim(self, force_revalidate: bool):
+        """(future, leader) for the caller's fetch, or None when the cached payload is fresh
+
+        the first caller to miss becomes the leader and fetches; every caller
+        that misses before it finishes, sync or async, waits on its future
+        """
+        if not force_revalidate and self._fresh():
+            self.stats['hits'] += 1
+            return None
+        with self._fetch_lock:
+            # another caller may have refreshed the payload while we waited for the lock
+            if not force_revalidate and self._fresh():
+                self.stats['hits'] += 1
+                return None
+            if self._inflight is not None:
+                return self._inflight, False
+            self._inflight = Future()
+            return self._inflight, True
+
+    def _settle(self, future: Future, fetch) -> Dict[str, Any]:
+        """resolve the shared future with the leader's fetch result or error"""
+        try:
+            payload = fetch()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(payload)
+            return payload
+        finally:
+            with self._fetch_lock:
+                self._inflight = None
+
+    def get(self, force_revalidate: bool = False) -> Dict[str, Any]:
+        """return the bootstrap-static payload, fetching or revalidating only when needed"""
+        claim = self._claim(force_revalidate)
+        if claim is None:
+            return self._payload
+        future, leader = claim
+        if not leader:
+            return future.result()
+        return self._settle(future, self._fetch)
+
+    async def aget(self, force_revalidate: bool = False) -> Dict[str, Any]:
+        """non-blocking get() for use inside an event loop"""
+        claim = self._claim(force_revalidate)
+        if claim is None:
+            return self._payload
+        future, leader = claim
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(headers=DEFAULT_HEADERS, timeout=self.timeout)
+        try:
+            started = time.perf_counter()
+            response = await self._async_client.get(self.url, headers=self._conditional_headers())
+            observe_http("/bootstrap-static/", response.status_code, time.perf_counter() - started,
+                         len(response.content))
+        except Exception as e:
+            return self._settle(future, partial(self._fetch_failed, e))
+        except BaseException:
+            # cancelled mid-request: release the callers waiting on this fetch, but the
+            # cancellation is ours, not an upstream failure, so it propagates unchanged
+            future.set_exception(RuntimeError("bootstrap-static fetch was cancelled"))
+            with self._fetch_lock:
+                self._inflight = None
+            raise
+        return self._settle(future, partial(self._store_or_fail, response))
+
+    def _store_or_fail(self, response) -> Dict[str, Any]:
+        try:
+            return self._store(response.status_code, response.headers, response.raise_for_status, response.json,
+                               response.content)
+        except Exception as e:
+            return self._fetch_failed(e)
+
+    def _conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self._payload is not None:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+        return headers
+
+    def _store(self, status_code: int, headers, raise_for_status, read_json, body: bytes) -> Dict[str, Any]:
+        if status_code == 304 and self._payload is not None:
+            self.stats['not_modified'] += 1
+        else:
+            raise_for_status()
+            self._payload = read_json()
+            self._etag = headers.get('ETag')
+            self._last_modified = headers.get('Last-Modified')
+            # the upstream etag may be missing or weak, so downstream validators use the body itself
+            self._digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+            self.stats['downloads'] += 1
+        self._fetched_at = time.monotonic()
+        return self._payload
+
+    def _fetch_failed(self, error: Exception) -> Dict[str, Any]:
+        self.stats['errors'] += 1
+        if self._payload is None:
+            raise error
+        # a stale payload beats failing every caller while the api is down
+        logger.warning(f"bootstrap-static refresh failed, serving cached payload: {error}")
+        self.stats['stale_served'] += 1
+        return self._payload
+
+    def _fetch(self) -> Dict[str, Any]:
+        try:
+            started = time.perf_counter()
+            response = self.session.get(self.url, headers=self._conditional_headers(), timeout=self.timeout)
+            observe_http("/bootstrap-static/", response.status_code, time.perf_counter() - started,
+                         len(response.content))
+            return self._store(response.status_code, response.headers, response.raise_for_status, response.json,
+                               response.content)
+        except Exception as e:
+            return self._fetch_failed(e)
+
+    async def aclose(self) -> None:
+        """close the async http client, if one was opened; both are bound to the running loop"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def invalidate(self) -> None:
+        """force the next get() to revalidate with the server"""
+        self._fetched_at = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'cached': self._payload is not None,
+            'etag': self._etag,
+            'age_seconds': round(time.monotonic() - self._fetched_at, 3) if self._payload is not None else None,
+        }
+
+
+# one client per base url, shared by the collector and the service
+_clients: Dict[str, BootstrapStaticClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_bootstrap_client(base_url: str = FPL_API_BASE) -> BootstrapStaticClient:
+    """process-wide bootstrap-static client for base_url"""
+    key = base_url.rstrip('/')
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = BootstrapStaticClient(base_url=key)
+        return _clients[key]
+
+
+class TokenBucket:
+    """thread-safe token bucket: `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """block until a token is available; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
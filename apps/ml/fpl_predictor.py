@@ -1,120 +1,154 @@
 import pandas as pd
 import numpy as np
 import joblib
+import json
 import os
-from typing import List, Dict, Any, Tuple
-from sklearn.model_selection import TimeSeriesSplit
+import threading
+from typing import List, Dict, Any, Iterable, Tuple
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.ensemble import RandomForestRegressor
+import argparse
 import logging
 from datetime import datetime
+from feature_engine import compute_time_features, time_feature_columns, PlayerFeatureState, STATE_SOURCES, FEATURE_DTYPE, MAX_WINDOW
+from forest_store import ForestArrays, export_forest, read_forest_meta, FOREST_DIR, FOREST_FORMAT
+from metrics import stage, observe_inference
+from model_search import param_grid, run_search, format_leaderboard, SEARCH_WORKERS
 
 # configure logging for model training and prediction
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# model input columns, in the order the model was trained on
+FEATURE_COLUMNS = [
+    # Current gameweek features
+    'points', 'minutes', 'goals_scored', 'assists', 'clean_sheets',
+    'goals_conceded', 'own_goals', 'penalties_saved', 'penalties_missed',
+    'yellow_cards', 'red_cards', 'saves', 'bonus', 'bps',
+    'influence', 'creativity', 'threat', 'ict_index', 'starts',
+    'expected_goals', 'expected_assists', 'expected_goal_involvements',
+    'expected_goals_conceded',
+    
+    # Rolling averages
+    'points_avg_3', 'points_avg_5', 'points_avg_10',
+    'minutes_avg_3', 'minutes_avg_5', 'minutes_avg_10',
+    'goals_avg_3', 'goals_avg_5', 'goals_avg_10',
+    'assists_avg_3', 'assists_avg_5', 'assists_avg_10',
+    'ict_avg_3', 'ict_avg_5', 'ict_avg_10',
+    'xg_avg_3', 'xg_avg_5', 'xg_avg_10',
+    'xa_avg_3', 'xa_avg_5', 'xa_avg_10',
+    
+    # Form and trends
+    'form_3gw', 'form_5gw', 'points_trend', 'minutes_trend',
+    'points_std_5', 'minutes_std_5',
+    
+    # Price and ownership changes
+    'price_change_3gw', 'ownership_change_3gw',
+    
+    # Static features
+    'position', 'price', 'selected_by_percent', 'value_form', 'value_season',
+    
+    # Fixture features
+    'fixture_difficulty', 'is_home'
+]
+
+# raw columns prediction needs from the historical data (everything else is derived)
+PREDICTION_INPUT_COLUMNS = list(dict.fromkeys(
+    ['player_id', 'gameweek', 'name', 'position', 'price', 'team']
+    + [col for col in FEATURE_COLUMNS if col not in time_feature_columns()]
+    + STATE_SOURCES
+))
+
+# gameweeks of history prediction reads: the longest rolling window, so
+# features of the newest gameweek come out the same as from the full season
+PREDICTION_WINDOW = MAX_WINDOW
+
+# gameweeks ahead each model predicts (points summed over the window); all of
+# them are trained on and served from the same feature matrix
+PREDICTION_HORIZONS = [int(h) for h in os.getenv("ML_PREDICTION_HORIZONS", "1,3,5").split(",")]
+
+# random forest settings used unless a hyperparameter search picked others
+MODEL_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+}
+
+# leaderboard of the last hyperparameter search, saved next to the models
+SEARCH_LEADERBOARD = "fpl_search_leaderboard.json"
+
+# which horizons were saved together, so stale files from an older run are never mixed in
+MODELS_MANIFEST = "fpl_models.json"
+
+def horizon_column(horizon: int) -> str:
+    """prediction column for one horizon; predicted_points holds the shortest horizon"""
+    return f"predicted_points_{horizon}gw"
+
+def model_filename(horizon: int) -> str:
+    """pickled model file for a horizon; horizon 1 keeps the original name"""
+    return "fpl_model.pkl" if horizon == 1 else f"fpl_model_{horizon}gw.pkl"
+
+def forest_name(horizon: int) -> str:
+    """compiled forest directory for a horizon"""
+    return FOREST_DIR if horizon == 1 else f"{FOREST_DIR}_{horizon}gw"
+
+def future_points(df: pd.DataFrame, horizon: int) -> pd.Series:
+    """points over the next horizon gameweeks of each row; NaN where the window runs past the data
+
+    df must be sorted by player and gameweek
+    """
+    points = df.groupby('player_id')['points']
+    return sum(points.shift(-i) for i in range(1, horizon + 1))
+
+def model_file_version(model_path: str) -> str:
+    """version tag of a saved model, taken from its file mtime"""
+    return datetime.fromtimestamp(os.path.getmtime(model_path)).strftime("%Y%m%d_%H%M%S")
+
 class FPLPredictor:
     def __init__(self):
         self.model = None
+        self.models = {}
         self.scaler = StandardScaler()
         self.feature_columns = None
+        self.feature_state = None
+        # the rolling state is advanced in place by predictions, which the service
+        # runs from several executor threads on one shared predictor
+        self._state_lock = threading.Lock()
+        self.model_version = None
+        self.model_params = dict(MODEL_PARAMS)
+        self.search_leaderboard = None
         self.target_column = 'next_gameweek_points'
+        self.feature_dtype = FEATURE_DTYPE
         
     def create_time_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """create rolling averages and trend features for better predictions"""
-        df = df.copy()
-        
-        # sort by player and gameweek for rolling calculations
-        df = df.sort_values(['player_id', 'gameweek'])
-        
-        # create rolling averages for form and minutes over different windows
-        for window in [3, 5, 10]:
-            df[f'points_avg_{window}'] = df.groupby('player_id')['points'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
-            df[f'minutes_avg_{window}'] = df.groupby('player_id')['minutes'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
-            df[f'goals_avg_{window}'] = df.groupby('player_id')['goals_scored'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
-            df[f'assists_avg_{window}'] = df.groupby('player_id')['assists'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
-            df[f'ict_avg_{window}'] = df.groupby('player_id')['ict_index'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
-            df[f'xg_avg_{window}'] = df.groupby('player_id')['expected_goals'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
-            df[f'xa_avg_{window}'] = df.groupby('player_id')['expected_assists'].rolling(window=window, min_periods=1).mean().reset_index(0, drop=True)
-        
-        # Create form indicators
-        df['form_3gw'] = df.groupby('player_id')['points'].rolling(window=3, min_periods=1).mean().reset_index(0, drop=True)
-        df['form_5gw'] = df.groupby('player_id')['points'].rolling(window=5, min_periods=1).mean().reset_index(0, drop=True)
-        
-        # Create trend indicators
-        df['points_trend'] = df.groupby('player_id')['points'].rolling(window=3, min_periods=2).apply(lambda x: np.polyfit(range(len(x)), x, 1)[0] if len(x) >= 2 else 0).reset_index(0, drop=True)
-        df['minutes_trend'] = df.groupby('player_id')['minutes'].rolling(window=3, min_periods=2).apply(lambda x: np.polyfit(range(len(x)), x, 1)[0] if len(x) >= 2 else 0).reset_index(0, drop=True)
-        
-        # Create consistency indicators
-        df['points_std_5'] = df.groupby('player_id')['points'].rolling(window=5, min_periods=2).std().reset_index(0, drop=True)
-        df['minutes_std_5'] = df.groupby('player_id')['minutes'].rolling(window=5, min_periods=2).std().reset_index(0, drop=True)
-        
-        # Create price change indicators
-        df['price_change_3gw'] = df.groupby('player_id')['price'].rolling(window=3, min_periods=1).apply(lambda x: x.iloc[-1] - x.iloc[0] if len(x) >= 2 else 0).reset_index(0, drop=True)
-        
-        # Create ownership change indicators
-        df['ownership_change_3gw'] = df.groupby('player_id')['selected_by_percent'].rolling(window=3, min_periods=1).apply(lambda x: x.iloc[-1] - x.iloc[0] if len(x) >= 2 else 0).reset_index(0, drop=True)
-        
-        return df
+        # every rolling mean, std, slope and delta is computed in one vectorized pass
+        return compute_time_features(df, self.feature_dtype)
     
     def create_target_variable(self, df: pd.DataFrame, prediction_horizon: int = 1) -> pd.DataFrame:
         """Create target variable for next gameweek(s) prediction"""
         df = df.copy()
         df = df.sort_values(['player_id', 'gameweek'])
         
-        # Create target: points in next gameweek(s)
-        df['next_gameweek_points'] = df.groupby('player_id')['points'].shift(-prediction_horizon)
-        
-        # For multi-gameweek prediction, sum the next N gameweeks
-        if prediction_horizon > 1:
-            for i in range(2, prediction_horizon + 1):
-                next_points = df.groupby('player_id')['points'].shift(-i)
-                df['next_gameweek_points'] += next_points.fillna(0)
+        # Create target: points summed over the next N gameweeks
+        df[self.target_column] = future_points(df, prediction_horizon)
         
         return df
     
     def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
         """Prepare features for ML model"""
         # Select feature columns
-        feature_cols = [
-            # Current gameweek features
-            'points', 'minutes', 'goals_scored', 'assists', 'clean_sheets',
-            'goals_conceded', 'own_goals', 'penalties_saved', 'penalties_missed',
-            'yellow_cards', 'red_cards', 'saves', 'bonus', 'bps',
-            'influence', 'creativity', 'threat', 'ict_index', 'starts',
-            'expected_goals', 'expected_assists', 'expected_goal_involvements',
-            'expected_goals_conceded',
-            
-            # Rolling averages
-            'points_avg_3', 'points_avg_5', 'points_avg_10',
-            'minutes_avg_3', 'minutes_avg_5', 'minutes_avg_10',
-            'goals_avg_3', 'goals_avg_5', 'goals_avg_10',
-            'assists_avg_3', 'assists_avg_5', 'assists_avg_10',
-            'ict_avg_3', 'ict_avg_5', 'ict_avg_10',
-            'xg_avg_3', 'xg_avg_5', 'xg_avg_10',
-            'xa_avg_3', 'xa_avg_5', 'xa_avg_10',
-            
-            # Form and trends
-            'form_3gw', 'form_5gw', 'points_trend', 'minutes_trend',
-            'points_std_5', 'minutes_std_5',
-            
-            # Price and ownership changes
-            'price_change_3gw', 'ownership_change_3gw',
-            
-            # Static features
-            'position', 'price', 'selected_by_percent', 'value_form', 'value_season',
-            
-            # Fixture features
-            'fixture_difficulty', 'is_home'
-        ]
+        feature_cols = FEATURE_COLUMNS
         
         # Filter existing columns
         existing_cols = [col for col in feature_cols if col in df.columns]
         self.feature_columns = existing_cols
         
-        # Prepare features
-        X = df[existing_cols].copy()
+        # Prepare features in one compact dtype (the forest trains on float32 either way)
+        X = df[existing_cols].astype(self.feature_dtype)
         
         # Handle missing values
         X = X.fillna(0)
@@ -125,128 +159,247 @@ class FPLPredictor:
         return X, existing_cols
     
     def train_model(self, df: pd.DataFrame, prediction_horizon: int = 1) -> Dict[str, float]:
-        """Train the ML model with proper time series validation"""
-        logger.info("Preparing data for training...")
-        
-        # Create time-based features
-        df = self.create_time_features(df)
-        
-        # Create target variable
-        df = self.create_target_variable(df, prediction_horizon)
-        
-        # Remove rows with missing targets (last N gameweeks for each player)
-        df = df.dropna(subset=['next_gameweek_points'])
-        
-        # Prepare features
-        X, feature_cols = self.prepare_features(df)
-        y = df['next_gameweek_points']
+        """Train the ML model for a single horizon with proper time series validation"""
+        return self.train_models(df, [prediction_horizon])[prediction_horizon]
+    
+    def train_models(self, df: pd.DataFrame, horizons: List[int] = None) -> Dict[int, Dict[str, float]]:
+        """Train one model per prediction horizon from a single feature matrix
+        
+        Time features, the feature matrix and its scaling are computed once;
+        each horizon only adds its target column and its own forest. The
+        scaler is shared (fitted on the shortest horizon's training rows),
+        so serving scales, or folds, the features once for every horizon.
+        """
+        horizons = sorted(set(horizons or PREDICTION_HORIZONS))
+        logger.info(f"Preparing data for training horizons {horizons}...")
+        X, targets, gameweeks = self.training_matrix(df, horizons)
+        all_metrics = self._fit_models(X, targets, gameweeks, horizons)
+        
+        # Seed the per-player rolling state so prediction starts from the trained history
+        self.feature_state = PlayerFeatureState.from_history(df)
+        
+        return all_metrics
+    
+    def train_on_seasons(self, seasons: Iterable[Tuple[str, pd.DataFrame]],
+                         horizons: List[int] = None) -> Dict[int, Dict[str, float]]:
+        """Train on several seasons, holding only one season's raw rows at a time
+        
+        Each (season, rows) pair, oldest first, is turned into its slice of
+        the float32 feature matrix and then dropped. Features and targets
+        never cross a season boundary (player ids are reassigned every
+        season), and the train/test split runs over (season, gameweek) in time
+        order. The rolling state is seeded from the newest season
+        """
+        horizons = sorted(set(horizons or PREDICTION_HORIZONS))
+        parts, trained = [], []
+        newest = None
+        for order, (season, df) in enumerate(seasons):
+            X, targets, gameweeks = self.training_matrix(df, horizons)
+            # gameweeks of later seasons sort after every gameweek of earlier ones
+            parts.append((X, targets, gameweeks + order * 1000))
+            trained.append(season)
+            newest = df
+            logger.info(f"Season {season}: {len(X)} samples")
+        if not parts:
+            raise ValueError("No seasons to train on")
+        
+        X = pd.concat([part[0] for part in parts], ignore_index=True)
+        targets = {horizon: pd.concat([part[1][horizon] for part in parts], ignore_index=True)
+                   for horizon in horizons}
+        gameweeks = pd.concat([part[2] for part in parts], ignore_index=True)
+        del parts
+        
+        logger.info(f"Preparing data for training horizons {horizons} on seasons {trained}...")
+        all_metrics = self._fit_models(X, targets, gameweeks, horizons)
+        self.feature_state = PlayerFeatureState.from_history(newest)
+        return all_metrics
+    
+    def training_matrix(self, df: pd.DataFrame, horizons: List[int]) -> Tuple[pd.DataFrame, Dict[int, pd.Series], pd.Series]:
+        """Feature matrix, per-horizon targets and gameweek of every row of one season, on a 0..n index"""
+        df = self.create_time_features(df).sort_values(['player_id', 'gameweek']).reset_index(drop=True)
+        X, _ = self.prepare_features(df)
+        targets = {horizon: future_points(df, horizon) for horizon in horizons}
+        return X, targets, df['gameweek'].astype(np.int64)
+    
+    def _fit_models(self, X: pd.DataFrame, targets: Dict[int, pd.Series], gameweeks: pd.Series,
+                    horizons: List[int]) -> Dict[int, Dict[str, float]]:
+        """Fit the shared scaler and one forest per horizon; horizons without enough gameweeks are skipped"""
+        feature_cols = list(X.columns)
+        horizons = list(horizons)
+        
+        # Horizons longer than the data allows have nothing to train or test on
+        splits = {horizon: self.split_gameweeks(gameweeks, targets[horizon]) for horizon in horizons}
+        for horizon in list(horizons):
+            train_mask, test_mask = splits[horizon]
+            if not train_mask.any() or not test_mask.any():
+                logger.warning(f"[{horizon}gw] Not enough gameweeks to train this horizon; skipping")
+                horizons.remove(horizon)
+        if not horizons:
+            raise ValueError("Not enough gameweeks to train any prediction horizon")
+        
+        # Scale features once, on the shortest horizon's training gameweeks (in float64,
+        # so the folded thresholds of the compiled forest match sklearn exactly)
+        self.scaler.fit(X[splits[horizons[0]][0]].astype(np.float64))
+        X_scaled = self.scaler.transform(X.astype(np.float64))
         
         logger.info(f"Training data: {len(X)} samples, {len(feature_cols)} features")
         
-        # Use TimeSeriesSplit for proper time series validation
-        tscv = TimeSeriesSplit(n_splits=5)
+        self.models = {}
+        all_metrics = {}
+        for horizon in horizons:
+            # Rows whose target window runs past the data are left out (last N gameweeks for each player)
+            train_mask, test_mask = splits[horizon]
+            y = targets[horizon]
+            
+            logger.info(f"[{horizon}gw] Train set: {int(train_mask.sum())} samples, test set: {int(test_mask.sum())} samples")
+            
+            # Train Random Forest model
+            logger.info(f"[{horizon}gw] Training Random Forest model...")
+            model = RandomForestRegressor(**self.model_params, n_jobs=-1)
+            model.fit(X_scaled[train_mask.to_numpy()], y[train_mask])
+            self.models[horizon] = model
+            
+            # Evaluate model
+            y_test = y[test_mask]
+            y_pred = model.predict(X_scaled[test_mask.to_numpy()])
+            
+            metrics = {
+                'mse': mean_squared_error(y_test, y_pred),
+                'mae': mean_absolute_error(y_test, y_pred),
+                'r2': r2_score(y_test, y_pred),
+                'rmse': np.sqrt(mean_squared_error(y_test, y_pred))
+            }
+            all_metrics[horizon] = metrics
+            
+            logger.info(f"[{horizon}gw] Model Performance:")
+            logger.info(f"  MSE: {metrics['mse']:.4f}")
+            logger.info(f"  MAE: {metrics['mae']:.4f}")
+            logger.info(f"  R²: {metrics['r2']:.4f}")
+            logger.info(f"  RMSE: {metrics['rmse']:.4f}")
+            
+            # Feature importance
+            feature_importance = pd.DataFrame({
+                'feature': feature_cols,
+                'importance': model.feature_importances_
+            }).sort_values('importance', ascending=False)
+            
+            logger.info(f"[{horizon}gw] Top 10 Most Important Features:")
+            for _, row in feature_importance.head(10).iterrows():
+                logger.info(f"  {row['feature']}: {row['importance']:.4f}")
+        
+        # The shortest horizon is the primary model behind predicted_points
+        self.model = self.models[horizons[0]]
+        self.model_version = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Split data by gameweek for time series validation
-        unique_gameweeks = sorted(df['gameweek'].unique())
+        return all_metrics
+    
+    def search_hyperparameters(self, df: pd.DataFrame, grid: Dict[str, List[Any]] = None,
+                               prediction_horizon: int = 1, n_splits: int = 5,
+                               workers: int = SEARCH_WORKERS) -> List[Dict[str, Any]]:
+        """Walk-forward CV of every grid configuration across a process pool
+        
+        The feature matrix is built once and shared with the workers; each
+        fold trains on all gameweeks before its test block. The best
+        configuration becomes model_params for the next train_models() call.
+        Returns the leaderboard, best first.
+        """
+        df = self.create_time_features(df).sort_values(['player_id', 'gameweek'])
+        X, _ = self.prepare_features(df)
+        y = future_points(df, prediction_horizon)
+        has_target = y.notna().to_numpy()
+        
+        # Trees only compare features against thresholds, so the search can skip scaling
+        configs = [{**MODEL_PARAMS, **params} for params in param_grid(grid)]
+        leaderboard = run_search(X.to_numpy()[has_target], y.to_numpy()[has_target],
+                                 df['gameweek'].to_numpy()[has_target], configs, n_splits, workers)
+        
+        self.model_params = dict(leaderboard[0]['params'])
+        self.search_leaderboard = leaderboard
+        logger.info(f"Best configuration: {self.model_params} (MAE {leaderboard[0]['mae']:.4f})")
+        return leaderboard
+    
+    def split_gameweeks(self, gameweeks: pd.Series, target: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """Train/test masks splitting the gameweeks that have a target 80/20 in time order"""
+        has_target = target.notna()
+        unique_gameweeks = sorted(gameweeks[has_target].unique())
         train_size = int(len(unique_gameweeks) * 0.8)
-        train_gameweeks = unique_gameweeks[:train_size]
-        test_gameweeks = unique_gameweeks[train_size:]
-        
-        # Create train/test splits
-        train_mask = df['gameweek'].isin(train_gameweeks)
-        test_mask = df['gameweek'].isin(test_gameweeks)
-        
-        X_train, X_test = X[train_mask], X[test_mask]
-        y_train, y_test = y[train_mask], y[test_mask]
-        
-        logger.info(f"Train set: {len(X_train)} samples")
-        logger.info(f"Test set: {len(X_test)} samples")
-        
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
-        
-        # Train Random Forest model
-        logger.info("Training Random Forest model...")
-        self.model = RandomForestRegressor(
-            n_estimators=200,
-            max_depth=10,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        # Train the model
-        self.model.fit(X_train_scaled, y_train)
-        
-        # Evaluate model
-        y_pred = self.model.predict(X_test_scaled)
-        
-        metrics = {
-            'mse': mean_squared_error(y_test, y_pred),
-            'mae': mean_absolute_error(y_test, y_pred),
-            'r2': r2_score(y_test, y_pred),
-            'rmse': np.sqrt(mean_squared_error(y_test, y_pred))
-        }
-        
-        logger.info("Model Performance:")
-        logger.info(f"  MSE: {metrics['mse']:.4f}")
-        logger.info(f"  MAE: {metrics['mae']:.4f}")
-        logger.info(f"  R²: {metrics['r2']:.4f}")
-        logger.info(f"  RMSE: {metrics['rmse']:.4f}")
-        
-        # Feature importance
-        feature_importance = pd.DataFrame({
-            'feature': feature_cols,
-            'importance': self.model.feature_importances_
-        }).sort_values('importance', ascending=False)
-        
-        logger.info("Top 10 Most Important Features:")
-        for _, row in feature_importance.head(10).iterrows():
-            logger.info(f"  {row['feature']}: {row['importance']:.4f}")
-        
-        return metrics
+        train_mask = has_target & gameweeks.isin(unique_gameweeks[:train_size])
+        test_mask = has_target & gameweeks.isin(unique_gameweeks[train_size:])
+        return train_mask, test_mask
     
-    def predict_next_gameweek(self, df: pd.DataFrame, gameweek: int) -> pd.DataFrame:
-        """Predict points for next gameweek"""
+    def predict_next_gameweek(self, df: pd.DataFrame, gameweek: int, include_features: bool = False) -> pd.DataFrame:
+        """Predict points for next gameweek
+
+        include_features adds the model inputs each prediction was made from
+        (in the compact feature dtype) next to the predicted points
+        """
         if self.model is None:
             raise ValueError("Model not trained. Call train_model() first.")
         
-        # Get latest data for each player
-        latest_data = df[df['gameweek'] == gameweek].copy()
-        
-        if len(latest_data) == 0:
-            raise ValueError(f"No data found for gameweek {gameweek}")
-        
-        # Create time-based features
-        latest_data = self.create_time_features(latest_data)
-        
-        # Prepare features
-        X, _ = self.prepare_features(latest_data)
-        
-        # Scale features
-        X_scaled = self.scaler.transform(X)
-        
-        # Make predictions
-        predictions = self.model.predict(X_scaled)
+        with stage("features"):
+            # Bring the rolling state up to date; only gameweeks it hasn't seen are applied.
+            # A state from a later gameweek, or one that ends before df starts (df may be
+            # just the last PREDICTION_WINDOW gameweeks), is rebuilt from df instead
+            with self._state_lock:
+                state = self.feature_state
+                if state is None or state.gameweek > gameweek or state.gameweek < int(df['gameweek'].min()) - 1:
+                    state = self.feature_state = PlayerFeatureState()
+                state.sync(df, up_to_gameweek=gameweek)
+                
+                # Latest row plus time features for each player in the gameweek
+                latest_data = state.feature_frame(gameweek, self.feature_dtype)
+            
+            if len(latest_data) == 0:
+                raise ValueError(f"No data found for gameweek {gameweek}")
+            
+            # Prepare features once; every horizon's model reads the same matrix
+            X, _ = self.prepare_features(latest_data)
+        X_raw, X_scaled = None, None
         
         # Create results dataframe
         results = latest_data[['player_id', 'name', 'position', 'price', 'team']].copy()
-        results['predicted_points'] = predictions
+        
+        models = self.models or {1: self.model}
+        with stage("inference"):
+            for horizon, model in models.items():
+                observe_inference(len(X), horizon)
+                # A compiled forest has the scaler folded into its thresholds and takes raw features
+                if getattr(model, 'scaler_folded', False):
+                    if X_raw is None:
+                        X_raw = X.to_numpy(dtype=np.float64)
+                    results[horizon_column(horizon)] = model.predict(X_raw)
+                else:
+                    if X_scaled is None:
+                        X_scaled = self.scaler.transform(X.astype(np.float64))
+                    results[horizon_column(horizon)] = model.predict(X_scaled)
+        
+        results['predicted_points'] = results[horizon_column(min(models))]
         results['gameweek'] = gameweek + 1
         
+        if include_features:
+            features = X[[col for col in X.columns if col not in results.columns]]
+            results = pd.concat([results, features], axis=1)
+        
         return results
     
+    @property
+    def horizons(self) -> List[int]:
+        """Prediction horizons served by the loaded models"""
+        return sorted(self.models) if self.models else [1]
+    
     def save_model(self, model_dir: str = "models") -> None:
-        """Save the trained model"""
+        """Save the trained model for every horizon"""
         os.makedirs(model_dir, exist_ok=True)
+        models = self.models or {1: self.model}
         
-        # Save model
-        model_path = os.path.join(model_dir, "fpl_model.pkl")
-        joblib.dump(self.model, model_path)
+        # Save one model per horizon, plus its compiled copy (scaler folded in) that serving workers memory-map
+        for horizon, model in models.items():
+            model_path = os.path.join(model_dir, model_filename(horizon))
+            joblib.dump(model, model_path)
+            export_forest(model, model_dir, model_file_version(model_path), scaler=self.scaler,
+                          name=forest_name(horizon))
         
-        # Save scaler
+        # Save scaler (shared by every horizon)
         scaler_path = os.path.join(model_dir, "fpl_scaler.pkl")
         joblib.dump(self.scaler, scaler_path)
         
@@ -254,24 +407,70 @@ class FPLPredictor:
         features_path = os.path.join(model_dir, "fpl_features.pkl")
         joblib.dump(self.feature_columns, features_path)
         
-        logger.info(f"Model saved to {model_dir}/")
+        # Save rolling feature state
+        with self._state_lock:
+            if self.feature_state is not None:
+                self.feature_state.save(os.path.join(model_dir, "fpl_feature_state.pkl"))
+        
+        # Record which horizons belong together and the settings they were trained with
+        manifest_path = os.path.join(model_dir, MODELS_MANIFEST)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump({'horizons': sorted(models), 'version': self.model_version, 'params': self.model_params}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        
+        # Leaderboard of the search that picked those settings
+        if self.search_leaderboard is not None:
+            with open(os.path.join(model_dir, SEARCH_LEADERBOARD), "w") as f:
+                json.dump(self.search_leaderboard, f, indent=2)
+        
+        logger.info(f"Models for horizons {sorted(models)} saved to {model_dir}/")
     
-    def load_model(self, model_dir: str = "models") -> bool:
-        """Load the trained model"""
+    def load_model(self, model_dir: str = "models", mmap: bool = False) -> bool:
+        """Load the trained model for every saved horizon
+
+        with mmap=True each forest is served from memory-mapped compiled arrays
+        (compiled from the pickle on first use), so several worker processes
+        share one read-only copy of the trees instead of each unpickling its own.
+        models saved before horizons existed load as a single horizon-1 model
+        """
         try:
-            # Load model
-            model_path = os.path.join(model_dir, "fpl_model.pkl")
-            self.model = joblib.load(model_path)
-            
             # Load scaler
             scaler_path = os.path.join(model_dir, "fpl_scaler.pkl")
             self.scaler = joblib.load(scaler_path)
             
+            manifest_path = os.path.join(model_dir, MODELS_MANIFEST)
+            horizons = [1]
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    horizons = json.load(f)['horizons']
+            
+            # Load models; the version is the primary model's file mtime
+            models = {}
+            for horizon in horizons:
+                model_path = os.path.join(model_dir, model_filename(horizon))
+                version = model_file_version(model_path)
+                if mmap:
+                    name = forest_name(horizon)
+                    meta = read_forest_meta(model_dir, name)
+                    if meta is None or meta.get('format') != FOREST_FORMAT or meta.get('version') != version:
+                        export_forest(joblib.load(model_path), model_dir, version, scaler=self.scaler, name=name)
+                    models[horizon] = ForestArrays.load(model_dir, name=name)
+                else:
+                    models[horizon] = joblib.load(model_path)
+            self.models = models
+            self.model = models[min(models)]
+            self.model_version = model_file_version(os.path.join(model_dir, model_filename(min(models))))
+            
             # Load feature columns
             features_path = os.path.join(model_dir, "fpl_features.pkl")
             self.feature_columns = joblib.load(features_path)
             
-            logger.info("True ML model loaded successfully")
+            # Load rolling feature state if one was saved with the model
+            state_path = os.path.join(model_dir, "fpl_feature_state.pkl")
+            if os.path.exists(state_path):
+                self.feature_state = PlayerFeatureState.load(state_path)
+            
+            logger.info(f"True ML model loaded successfully (horizons {sorted(models)})")
             return True
         except Exception as e:
             logger.error(f"Error loading model: {e}")
@@ -281,30 +480,42 @@ def main():
     """Main function to train the true ML model"""
     from data_collector import FPLDataCollector
     
+    parser = argparse.ArgumentParser(description="Train the FPL prediction models")
+    parser.add_argument("--search", action="store_true",
+                        help="pick forest settings by walk-forward CV over a parameter grid first")
+    parser.add_argument("--splits", type=int, default=5, help="walk-forward folds for --search")
+    parser.add_argument("--workers", type=int, default=SEARCH_WORKERS, help="worker processes for --search")
+    parser.add_argument("--seasons", help="comma separated seasons of the partitioned dataset to train on "
+                                          "(default: every stored season)")
+    args = parser.parse_args()
+    
     # Collect data
     collector = FPLDataCollector()
-    current_gw = collector.get_current_gameweek()
     
-    # Try to load existing data first
-    data_files = [f for f in os.listdir("data") if f.startswith("fpl_historical_data_")]
-    if data_files:
-        latest_file = sorted(data_files)[-1]
-        logger.info(f"Loading existing data: {latest_file}")
-        df = collector.load_data(latest_file)
-    else:
-        logger.info("No existing data found. Collecting new data...")
-        df = collector.collect_historical_data(start_gameweek=1, end_gameweek=current_gw)
-        collector.save_data(df)
+    # Load stored data, fetching only gameweeks that are missing or provisional
+    df, data_path = collector.collect_incremental()
+    logger.info(f"Training on {data_path}")
     
-    # Train model
     model = FPLPredictor()
-    metrics = model.train_model(df, prediction_horizon=1)
+    if args.search:
+        # The search cross-validates on the newest season (the one collect_incremental returns)
+        leaderboard = model.search_hyperparameters(df, n_splits=args.splits, workers=args.workers)
+        print(format_leaderboard(leaderboard))
+    
+    # Train one model per horizon; a partitioned dataset is read one season at a time
+    if collector.has_dataset():
+        seasons = args.seasons.split(",") if args.seasons else None
+        del df
+        all_metrics = model.train_on_seasons(collector.iter_seasons(seasons))
+    else:
+        all_metrics = model.train_models(df)
     
-    # Save model
+    # Save models
     model.save_model()
     
     print("True ML model training complete!")
-    print(f"Model performance: R² = {metrics['r2']:.4f}, RMSE = {metrics['rmse']:.4f}")
+    for horizon, metrics in all_metrics.items():
+        print(f"{horizon}gw model performance: R² = {metrics['r2']:.4f}, RMSE = {metrics['rmse']:.4f}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+import httpx
+import numpy as np
+import logging
+from mock_fpl_api import MockFPLServer, load_mock_data
+
+# configure logging for load test runs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATIONS = ["3-4-3", "3-5-2", "4-3-3", "4-4-2", "4-5-1", "5-3-2", "5-4-1"]
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds"""
+    if not samples:
+        return {'count': 0}
+    ms = np.array(samples) * 1000
+    return {
+        'count': len(samples),
+        'p50': float(np.percentile(ms, 50)),
+        'p95': float(np.percentile(ms, 95)),
+        'p99': float(np.percentile(ms, 99)),
+        'max': float(ms.max()),
+    }
+
+
+async def probe_health(client: httpx.AsyncClient, url: str, duration: float, interval: float) -> List[float]:
+    """hit /health every interval seconds and record latencies"""
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(f"{url}/health")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def strategy_worker(client: httpx.AsyncClient, url: str, deadline: float, worker: int,
+                          samples: List[float], statuses: Counter) -> None:
+    """post ai-strategy requests back to back until the deadline"""
+    i = worker
+    while time.perf_counter() < deadline:
+        body = {'budget': 80 + (i % 21), 'formation': FORMATIONS[i % len(FORMATIONS)]}
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/predict/ai-strategy", json=body)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        samples.append(time.perf_counter() - start)
+        i += 1
+
+
+async def run_load_test(url: str, concurrency: int, duration: float, interval: float) -> None:
+    limits = httpx.Limits(max_connections=concurrency + 4)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        # warm the prediction cache so the loaded phase measures steady state
+        await client.post(f"{url}/predict/ai-strategy", json={'budget': 100})
+
+        idle = await probe_health(client, url, min(duration, 5.0), interval)
+
+        strategy_samples: List[float] = []
+        statuses: Counter = Counter()
+        deadline = time.perf_counter() + duration
+        workers = [strategy_worker(client, url, deadline, w, strategy_samples, statuses)
+                   for w in range(concurrency)]
+        loaded, *_ = await asyncio.gather(probe_health(client, url, duration, interval), *workers)
+
+    print(f"{'':>22} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, samples in [("/health idle", idle), ("/health under load", loaded),
+                           ("/predict/ai-strategy", strategy_samples)]:
+        s = latency_summary(samples)
+        if s['count']:
+            print(f"{label:>22} {s['count']:>6} {s['p50']:>8.1f} {s['p95']:>8.1f} {s['p99']:>8.1f} {s['max']:>8.1f}")
+    print(f"ai-strategy: {len(strategy_samples) / duration:.1f} req/s with {concurrency} concurrent clients, "
+          f"statuses {dict(statuses)}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def copy_workdir(workdir: str) -> str:
+    """copy the service's data/ and models/ into workdir, so a test run cannot change them"""
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in ("data", "models"):
+        if os.path.isdir(os.path.join(app_dir, name)):
+            shutil.copytree(os.path.join(app_dir, name), os.path.join(workdir, name))
+    return workdir
+
+
+def start_service(fpl_api_base: str, port: int, extra_env: Dict[str, str],
+                  workdir: Optional[str] = None) -> subprocess.Popen:
+    """launch the ml service with uvicorn against the given fpl api and wait for /health
+
+    workdir is where the service finds models/ and data/ (default: the service
+    directory). the scheduler is off unless extra_env turns it on, so the
+    service never collects into or snapshots its workdir by default
+    """
+    env = {**os.environ, 'FPL_API_BASE': fpl_api_base, 'ML_SCHEDULER': 'off', **extra_env}
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", app_dir,
+         "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=workdir or app_dir,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(120):
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("ML service did not become healthy")
+
+
+def main():
+    """measure /health latency while ai-strategy requests saturate the service"""
+    parser = argparse.ArgumentParser(description="ML service load test")
+    parser.add_argument("--url", default="http://localhost:3002", help="running service to test")
+    parser.add_argument("--serve", action="store_true",
+                        help="start the service and a mock fpl api locally instead of using --url")
+    parser.add_argument("--mock-latency", type=float, default=0.5, help="mock fpl api latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent ai-strategy clients")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of load")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between /health probes")
+    args = parser.parse_args()
+
+    if not args.serve:
+        asyncio.run(run_load_test(args.url.rstrip('/'), args.concurrency, args.duration, args.interval))
+        return
+
+    process: Optional[subprocess.Popen] = None
+    # a short bootstrap ttl keeps slow fpl api revalidations in the loaded phase
+    with MockFPLServer(load_mock_data(), latency=args.mock_latency) as mock, \
+            tempfile.TemporaryDirectory(prefix="fpl_load_") as workdir:
+        try:
+            port = free_port()
+            process = start_service(mock.base_url, port, {'FPL_BOOTSTRAP_TTL': '1'},
+                                    workdir=copy_workdir(workdir))
+            asyncio.run(run_load_test(f"http://127.0.0.1:{port}", args.concurrency, args.duration, args.interval))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,49 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import asyncio
+import contextvars
+import gzip
+import io
+import zlib
 import pandas as pd
 import numpy as np
 import joblib
+import json
 import os
 from datetime import datetime, timedelta
 import requests
 import logging
-from fpl_predictor import FPLPredictor
-from data_collector import FPLDataCollector
+from fpl_predictor import FPLPredictor, FEATURE_COLUMNS, PREDICTION_INPUT_COLUMNS, PREDICTION_WINDOW, horizon_column
+from data_collector import FPLDataCollector, recent_gameweeks
+from cache import ServiceCache, CACHE_KEYS
+from fpl_client import FPL_API_BASE, get_bootstrap_client
+from squad_optimizer import SquadOptimizer, solve_squads
+from transfer_planner import TransferPlanner, per_gameweek_points
+from squad_simulator import DRAWS, SquadSimulator
+from process_stats import process_memory
+from metrics import METRICS_ENABLED, MetricsMiddleware, registry, stage, timed
+from prediction_frame import build_prediction_frame, player_lookup, rank_top_players
+from scheduler import GameweekScheduler
+
+try:
+    import orjson
+except ImportError:  # responses fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # ndjson streams only
+    pa = None
 
 # configure logging for debugging and monitoring
 logging.basicConfig(level=logging.INFO)
@@ -27,10 +60,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# per-route latency and a Server-Timing header breaking each request into stages
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # global model and data instances loaded at startup
 fpl_predictor = None
 data_collector = None
-fpl_api_base = "https://fantasy.premierleague.com/api"
+fpl_api_base = FPL_API_BASE
+
+# process-level cache for the dataset, current gameweek and prediction frame
+service_cache = ServiceCache()
+CURRENT_GW_TTL = int(os.getenv("ML_CURRENT_GW_TTL", "300"))
+
+# worker processes for batch squad optimization, and the largest batch accepted
+OPTIMIZER_WORKERS = int(os.getenv("ML_OPTIMIZER_WORKERS", str(os.cpu_count() or 1)))
+MAX_BATCH_STRATEGIES = int(os.getenv("ML_MAX_BATCH_STRATEGIES", "500"))
+
+# largest squad budget (in millions) a strategy request may ask for; the optimizer's
+# tables grow with the budget, so anything beyond a real fpl budget is rejected
+MAX_STRATEGY_BUDGET = float(os.getenv("ML_MAX_STRATEGY_BUDGET", "200"))
+optimizer_pool: Optional[ProcessPoolExecutor] = None
+
+# blocking pandas/sklearn work runs on a bounded thread pool so the event loop
+# keeps serving cheap endpoints; requests beyond MAX_CONCURRENT_JOBS queue for
+# at most QUEUE_TIMEOUT seconds before getting a 503
+EXECUTOR_WORKERS = int(os.getenv("ML_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_CONCURRENT_JOBS = int(os.getenv("ML_MAX_CONCURRENT_JOBS", str(EXECUTOR_WORKERS)))
+QUEUE_TIMEOUT = float(os.getenv("ML_QUEUE_TIMEOUT", "30"))
+
+# longest transfer plan, in gameweeks, and the time a plan search may take
+MAX_PLAN_HORIZON = int(os.getenv("ML_MAX_PLAN_HORIZON", "8"))
+TRANSFER_PLAN_BUDGET = float(os.getenv("ML_TRANSFER_PLAN_BUDGET", "1.0"))
+
+# most monte carlo draws per squad simulation, and simulations kept per set of predictions
+MAX_SIMULATION_DRAWS = int(os.getenv("ML_MAX_SIMULATION_DRAWS", "200000"))
+SIMULATIONS_KEPT = int(os.getenv("ML_SIMULATIONS_KEPT", "256"))
+
+# rows encoded per chunk of a streamed prediction response
+STREAM_CHUNK_ROWS = int(os.getenv("ML_STREAM_CHUNK_ROWS", "500"))
+cpu_executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="ml-cpu")
+job_slots: Optional[asyncio.Semaphore] = None
+
+# serve the forest from memory-mapped arrays so uvicorn --workers N share one copy
+MMAP_MODEL = os.getenv("ML_MMAP_MODEL", "1") == "1"
+
+# predictions can be precomputed on gameweek transitions: "run" polls and runs the
+# pipeline here (collecting into data/ and writing snapshots), "follow" only loads
+# snapshots published by another process (e.g. the scheduler sidecar). the default,
+# "off", computes them lazily per request and never writes to data/ or snapshots/
+SCHEDULER_MODE = os.getenv("ML_SCHEDULER", "off")
+scheduler: Optional[GameweekScheduler] = None
 
 class PlayerPrediction(BaseModel):
     player_id: int
@@ -39,9 +119,10 @@ class PlayerPrediction(BaseModel):
     features: Dict[str, Any]
 
 class AIStrategyRequest(BaseModel):
-    budget: float
+    budget: float = Field(gt=0, le=MAX_STRATEGY_BUDGET)
     formation: str = "3-4-3"
     exclude_players: List[int] = []
+    horizon: int = 1
 
 class AIStrategyResponse(BaseModel):
     players: List[PlayerPrediction]
@@ -49,96 +130,398 @@ class AIStrategyResponse(BaseModel):
     expected_points: float
     strategy_name: str = "AI Strategy"
 
+class AIStrategyBatchRequest(BaseModel):
+    strategies: List[AIStrategyRequest]
+
+class AIStrategyBatchItem(BaseModel):
+    request: AIStrategyRequest
+    result: Optional[AIStrategyResponse] = None
+    error: Optional[str] = None
+
+class AIStrategyBatchResponse(BaseModel):
+    results: List[AIStrategyBatchItem]
+    gameweek: int
+
+class TransferPlanRequest(BaseModel):
+    squad: List[int]
+    bank: float = 0.0
+    free_transfers: int = 1
+    horizon: int = 3
+    max_transfers: int = 2
+    selling_prices: Dict[int, float] = {}
+
+class SimulationRequest(BaseModel):
+    squad: List[int]
+    starting_xi: Optional[List[int]] = None
+    bench: Optional[List[int]] = None
+    captain: Optional[int] = None
+    vice_captain: Optional[int] = None
+    draws: int = DRAWS
+    seed: int = 0
+
 @app.on_event("startup")
 async def startup_event():
     """load trained model and data collector on service startup"""
-    global fpl_predictor, data_collector
+    global fpl_predictor, data_collector, job_slots, scheduler
+    job_slots = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
     try:
         # initialize data collector for fetching fpl data
         data_collector = FPLDataCollector()
         
         # load trained fpl predictor model
         fpl_predictor = FPLPredictor()
-        if fpl_predictor.load_model():
+        if fpl_predictor.load_model(mmap=MMAP_MODEL):
             logger.info("FPL predictor loaded successfully")
+            if SCHEDULER_MODE != "off":
+                scheduler = GameweekScheduler(data_collector, fpl_predictor,
+                                              follow=SCHEDULER_MODE == "follow").start()
         else:
             logger.warning("No trained FPL predictor found. Run training first.")
     except Exception as e:
         logger.error(f"Error loading model: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """stop the scheduler and optimizer worker processes and close the async fpl client"""
+    if scheduler is not None:
+        scheduler.stop()
+    if optimizer_pool is not None:
+        optimizer_pool.shutdown(wait=False, cancel_futures=True)
+    await get_bootstrap_client(fpl_api_base).aclose()
+
+async def run_blocking(func, *args, **kwargs):
+    """run blocking work on the cpu executor, waiting at most QUEUE_TIMEOUT for a free slot
+
+    the work runs in a copy of the caller's context so stages timed in the
+    worker thread land in the request's Server-Timing header
+    """
+    try:
+        with stage("queue"):
+            await asyncio.wait_for(job_slots.acquire(), timeout=QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="ML service is busy, try again shortly",
+                            headers={"Retry-After": str(int(QUEUE_TIMEOUT))})
+    try:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(cpu_executor, partial(context.run, func, *args, **kwargs))
+    finally:
+        job_slots.release()
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """encode an already plain payload (dicts, lists, python scalars) in one pass
+
+    the prediction endpoints build their payloads column by column, so
+    re-validating them through the response models would only repeat that
+    work per player; the models still document the response shapes
+    """
+    return Response(dump_json(content), status_code=status_code, media_type="application/json")
+
+def dump_json(content: Any) -> bytes:
+    if orjson is not None:
+        # top players are keyed by position number
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, separators=(",", ":")).encode()
+
 @app.get("/health")
 async def health_check():
     """health check endpoint for service monitoring"""
     return {
         "status": "healthy",
         "model_loaded": fpl_predictor is not None and fpl_predictor.model is not None,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "worker_pid": os.getpid(),
+        "memory": process_memory()
     }
 
+def fetch_current_players() -> Dict[str, Any]:
+    """fetch current player data from fpl api"""
+    return players_from_bootstrap(get_bootstrap_client(fpl_api_base).get())
+
+# fields served per player by /players/current, in response order
+PLAYER_FIELDS = (
+    "id", "name", "position", "team", "team_name", "price", "form", "total_points", "points_per_game",
+    "selected_by_percent", "transfers_in", "transfers_out", "value_form", "value_season", "influence",
+    "creativity", "threat", "ict_index", "starts", "expected_goals", "expected_assists",
+    "expected_goal_involvements", "expected_goals_conceded", "goals_scored", "assists", "clean_sheets",
+    "goals_conceded", "own_goals", "penalties_saved", "penalties_missed", "yellow_cards", "red_cards", "saves",
+    "bonus", "bps", "influence_rank", "creativity_rank", "threat_rank", "ict_index_rank",
+    "corners_and_indirect_freekicks_order", "direct_freekicks_order", "penalties_order",
+)
+
+# set-piece orders are missing from older bootstrap payloads
+OPTIONAL_PLAYER_FIELDS = {"corners_and_indirect_freekicks_order", "direct_freekicks_order", "penalties_order"}
+
+# encoded /players/current bodies kept per bootstrap version (field/shape/encoding variants)
+PLAYERS_BODY_VARIANTS = 64
+
+def player_column(elements: List[Dict[str, Any]], field: str, team_map: Dict[int, str]) -> List[Any]:
+    """one /players/current field for every bootstrap element"""
+    if field == "name":
+        return [f"{player['first_name']} {player['second_name']}" for player in elements]
+    if field == "team_name":
+        return [team_map.get(player["team"], "Unknown") for player in elements]
+    if field == "price":
+        return [player["now_cost"] / 10 for player in elements]
+    if field == "position":
+        return [player["element_type"] for player in elements]
+    if field in OPTIONAL_PLAYER_FIELDS:
+        return [player.get(field) for player in elements]
+    return [player[field] for player in elements]
+
+@timed("serialize_players")
+def players_from_bootstrap(data: Dict[str, Any], fields: Optional[List[str]] = None,
+                           columnar: bool = False) -> Dict[str, Any]:
+    """flatten a bootstrap-static payload into the player list served by the api
+
+    fields selects and orders the player fields (default: all of PLAYER_FIELDS);
+    columnar returns one array per field instead of one object per player
+    """
+    fields = list(fields or PLAYER_FIELDS)
+    team_map = {team["id"]: team["name"] for team in data["teams"]}
+    elements = data["elements"]
+    columns = {field: player_column(elements, field, team_map) for field in fields}
+
+    if columnar:
+        return {"columns": columns, "count": len(elements)}
+    players = [dict(zip(fields, values)) for values in zip(*columns.values())]
+    return {"players": players, "count": len(players)}
+
+def parse_player_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """comma separated field names -> validated list, None for every field"""
+    if not fields:
+        return None
+    selected = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in PLAYER_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Unknown player fields: {', '.join(unknown) or fields}")
+    return selected
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """br when the client takes it and brotli is installed, else gzip, else identity"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    if brotli is not None and accepted & {"br", "*"}:
+        return "br"
+    if accepted & {"gzip", "*"}:
+        return "gzip"
+    return "identity"
+
+def players_body(data: Dict[str, Any], fields: Optional[List[str]], columnar: bool, encoding: str) -> bytes:
+    """/players/current body in the given content coding"""
+    body = dump_json(players_from_bootstrap(data, fields, columnar))
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """weak comparison (as If-None-Match requires) of the full tag, content-coding suffix included
+
+    each encoding has its own strong etag, so a tag received with a gzip body
+    never validates the brotli or identity representation
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
 @app.get("/players/current")
-async def get_current_players():
-    """fetch current player data from fpl api for team generation"""
+async def get_current_players(request: Request, fields: Optional[str] = None, shape: str = "records"):
+    """fetch current player data from fpl api for team generation
+
+    fields=id,name,price projects the player fields, shape=columnar returns
+    arrays per field. bodies are compressed per Accept-Encoding and carry a
+    strong ETag derived from the bootstrap data; a matching If-None-Match is
+    answered with 304 without rebuilding anything
+    """
+    selected = parse_player_fields(fields)
+    if shape not in ("records", "columnar"):
+        raise HTTPException(status_code=400, detail="shape must be 'records' or 'columnar'")
     try:
-        response = requests.get(f"{fpl_api_base}/bootstrap-static/")
-        response.raise_for_status()
-        data = response.json()
-        
-        # Create team ID to name mapping
-        team_map = {team["id"]: team["name"] for team in data["teams"]}
-        
-        players = []
-        for player in data["elements"]:
-            players.append({
-                "id": player["id"],
-                "name": f"{player['first_name']} {player['second_name']}",
-                "position": player["element_type"],
-                "team": player["team"],
-                "team_name": team_map.get(player["team"], "Unknown"),
-                "price": player["now_cost"] / 10,
-                "form": player["form"],
-                "total_points": player["total_points"],
-                "points_per_game": player["points_per_game"],
-                "selected_by_percent": player["selected_by_percent"],
-                "transfers_in": player["transfers_in"],
-                "transfers_out": player["transfers_out"],
-                "value_form": player["value_form"],
-                "value_season": player["value_season"],
-                "influence": player["influence"],
-                "creativity": player["creativity"],
-                "threat": player["threat"],
-                "ict_index": player["ict_index"],
-                "starts": player["starts"],
-                "expected_goals": player["expected_goals"],
-                "expected_assists": player["expected_assists"],
-                "expected_goal_involvements": player["expected_goal_involvements"],
-                "expected_goals_conceded": player["expected_goals_conceded"],
-                "goals_scored": player["goals_scored"],
-                "assists": player["assists"],
-                "clean_sheets": player["clean_sheets"],
-                "goals_conceded": player["goals_conceded"],
-                "own_goals": player["own_goals"],
-                "penalties_saved": player["penalties_saved"],
-                "penalties_missed": player["penalties_missed"],
-                "yellow_cards": player["yellow_cards"],
-                "red_cards": player["red_cards"],
-                "saves": player["saves"],
-                "bonus": player["bonus"],
-                "bps": player["bps"],
-                "influence_rank": player["influence_rank"],
-                "creativity_rank": player["creativity_rank"],
-                "threat_rank": player["threat_rank"],
-                "ict_index_rank": player["ict_index_rank"],
-                "corners_and_indirect_freekicks_order": player.get("corners_and_indirect_freekicks_order"),
-                "direct_freekicks_order": player.get("direct_freekicks_order"),
-                "penalties_order": player.get("penalties_order")
-            })
-        
-        return {"players": players, "count": len(players)}
+        client = get_bootstrap_client(fpl_api_base)
+        data = await client.aget()
+        version = client.version
     
     except Exception as e:
         logger.error(f"Error fetching player data: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch player data")
 
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    variant = (tuple(selected or PLAYER_FIELDS), shape)
+    # the representation's tag; the content coding is appended so each encoding has its own strong etag
+    tag = f"{version}-{zlib.crc32(repr(variant).encode()):08x}"
+    etag = f'"{tag}"' if encoding == "identity" else f'"{tag};{encoding}"'
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache", "ETag": etag}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # bodies for the current bootstrap version; a new version drops them all
+    bodies = service_cache.get_or_compute(CACHE_KEYS['PLAYERS'], version, dict)
+    body = bodies.get((variant, encoding))
+    if body is None:
+        body = await run_blocking(players_body, data, selected, shape == "columnar", encoding)
+        if len(bodies) >= PLAYERS_BODY_VARIANTS:
+            bodies.clear()
+        bodies[(variant, encoding)] = body
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """cache hit/miss counters and the key each entry was computed for"""
+    return {
+        **service_cache.get_stats(),
+        'bootstrap_static': get_bootstrap_client(fpl_api_base).get_stats(),
+    }
+
+def cache_metrics():
+    """cache and bootstrap-static counters, read from their stats at scrape time"""
+    stats = service_cache.get_stats()
+    for name, entry in stats['entries'].items():
+        for outcome in ('hits', 'misses', 'invalidations'):
+            yield ('ml_cache_events_total', 'counter', 'Service cache lookups by entry and outcome',
+                   {'cache': name, 'outcome': outcome}, entry[outcome])
+        yield ('ml_cache_entry_age_seconds', 'gauge', 'Age of each cached value',
+               {'cache': name}, entry['age_seconds'] if entry['age_seconds'] is not None else float('nan'))
+    bootstrap = get_bootstrap_client(fpl_api_base).get_stats()
+    for outcome in ('hits', 'downloads', 'not_modified', 'errors', 'stale_served'):
+        yield ('ml_bootstrap_static_events_total', 'counter', 'bootstrap-static client lookups by outcome',
+               {'outcome': outcome}, bootstrap[outcome])
+
+def process_metrics():
+    for name, value in process_memory().items():
+        yield ('ml_process_memory_bytes', 'gauge', 'Resident memory of this worker by kind (rss, pss, shared...)',
+               {'kind': name[:-3]}, value * 2 ** 20)
+
+registry.register_collector(cache_metrics)
+registry.register_collector(process_metrics)
+
+@app.get("/metrics")
+async def get_metrics():
+    """prometheus metrics: stage and request latency, fpl api calls, cache counters, inference batch sizes"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (ML_METRICS=0)")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(name: str = None):
+    """drop one cache entry (dataset, current_gameweek, predictions) or all of them"""
+    if name is not None and name not in CACHE_KEYS.values():
+        raise HTTPException(status_code=400, detail=f"Unknown cache entry: {name}")
+    service_cache.invalidate(name)
+    return service_cache.get_stats()
+
+@app.get("/scheduler/status")
+async def get_scheduler_status():
+    """gameweek state, published snapshot and per-stage timings of the last scheduler runs"""
+    if scheduler is None:
+        return {'mode': 'off', 'running': False}
+    return {**scheduler.status(), 'runs': scheduler.history()}
+
+@app.post("/scheduler/run")
+async def trigger_scheduler_run():
+    """re-run the prediction pipeline now, regardless of the gameweek state"""
+    if scheduler is None or scheduler.follow:
+        raise HTTPException(status_code=400, detail="Scheduler is not running the pipeline in this process")
+    scheduler.trigger()
+    return {'triggered': True, **scheduler.status()}
+
+def get_latest_data_file() -> str:
+    """name of the newest historical data file, or 503 if none has been collected"""
+    if not os.path.exists("data"):
+        raise HTTPException(status_code=503, detail="Data directory not found. Please collect data first.")
+    
+    latest_file = data_collector.latest_data_file()
+    if latest_file is None:
+        raise HTTPException(status_code=503, detail="No historical data found. Please collect data first.")
+    
+    return latest_file
+
+def prediction_input():
+    """cache key and loader for the history prediction reads
+
+    from the partitioned dataset that is the newest season's last
+    PREDICTION_WINDOW gameweeks, keyed by those partitions and their mtimes;
+    otherwise the same window of the newest flat data file, keyed by name and mtime
+    """
+    if data_collector.has_dataset():
+        seasons = data_collector.dataset_seasons()
+        partitions = data_collector.list_partitions(seasons=seasons[-1:], last_gameweeks=PREDICTION_WINDOW)
+        if not partitions:
+            raise HTTPException(status_code=503, detail="No historical data found. Please collect data first.")
+        key = tuple((p['season'], p['gameweek'], os.path.getmtime(p['path'])) for p in partitions)
+        return key, lambda: data_collector.read_partitions(partitions, columns=PREDICTION_INPUT_COLUMNS)
+    
+    latest_file = get_latest_data_file()
+    mtime = os.path.getmtime(os.path.join("data", latest_file))
+    return (latest_file, mtime), lambda: recent_gameweeks(
+        data_collector.load_data(latest_file, columns=PREDICTION_INPUT_COLUMNS), PREDICTION_WINDOW)
+
+def get_prediction_frame():
+    """cached next-gameweek predictions enriched with names, plus the current gameweek
+
+    the dataset is keyed by the data it was read from (file or partitions, with
+    mtimes), the predictions by that key, model version and gameweek, so new
+    data, a retrained model or a gameweek rollover each invalidate the cached frame
+    """
+    data_key, load = prediction_input()
+    df = service_cache.get_or_compute(CACHE_KEYS['DATASET'], data_key, load)
+    current_gw = service_cache.get_with_ttl(
+        CACHE_KEYS['CURRENT_GW'], CURRENT_GW_TTL, data_collector.get_current_gameweek
+    )
+    
+    def compute_predictions():
+        # Current player data for names, team names and FPL positions
+        players = player_lookup(get_bootstrap_client(fpl_api_base).get())
+        with stage("predict"):
+            return build_prediction_frame(fpl_predictor, df, current_gw, players)
+    
+    prediction_key = (data_key, fpl_predictor.model_version, current_gw)
+    predictions_df = service_cache.get_or_compute(CACHE_KEYS['PREDICTIONS'], prediction_key, compute_predictions)
+    return predictions_df, current_gw
+
+def get_snapshot():
+    """the scheduler's published snapshot, or 503 while the first one is being computed"""
+    snapshot = scheduler.snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Predictions are being computed, try again shortly",
+                            headers={"Retry-After": "10"})
+    return snapshot
+
+async def load_prediction_frame():
+    """next-gameweek predictions and the current gameweek without blocking the event loop
+
+    with the scheduler enabled this is a read of the published snapshot.
+    otherwise bootstrap-static is refreshed on the async client first, so the
+    worker thread reads it from the shared cache instead of making a blocking request
+    """
+    if scheduler is not None:
+        snapshot = get_snapshot()
+        return snapshot.predictions, snapshot.gameweek
+    await get_bootstrap_client(fpl_api_base).aget()
+    return await run_blocking(get_prediction_frame)
+
 @app.get("/predict/top-players")
 async def get_top_players_by_position():
     """Get top players by position for display purposes"""
@@ -146,67 +529,208 @@ async def get_top_players_by_position():
         raise HTTPException(status_code=503, detail="ML model not loaded. Please train the model first.")
     
     try:
-        # Load historical data
-        data_dir = "data"
-        if not os.path.exists(data_dir):
-            raise HTTPException(status_code=503, detail="Data directory not found. Please collect data first.")
+        # Ranked once per gameweek transition by the scheduler
+        if scheduler is not None:
+            return json_response(get_snapshot().top_players)
         
-        data_files = [f for f in os.listdir(data_dir) if f.startswith("fpl_historical_data_")]
-        if not data_files:
-            raise HTTPException(status_code=503, detail="No historical data found. Please collect data first.")
-        
-        latest_file = sorted(data_files)[-1]
-        df = data_collector.load_data(latest_file)
-        
-        # Get current gameweek
-        current_gw = data_collector.get_current_gameweek()
-        
-        # Get current player data to include names
-        current_players_response = await get_current_players()
-        current_players = {p['id']: p for p in current_players_response['players']}
-        
-        # Make predictions using true ML model
-        predictions_df = fpl_predictor.predict_next_gameweek(df, current_gw)
-        
-        # Add player names and team names to predictions
-        predictions_df['name'] = predictions_df['player_id'].map(
-            lambda pid: current_players.get(pid, {}).get('name', f'Player {pid}')
-        )
-        predictions_df['team_name'] = predictions_df['player_id'].map(
-            lambda pid: current_players.get(pid, {}).get('team_name', 'Unknown')
-        )
-        
-        # Group by position and get top 5 for each
-        top_players_by_position = {}
-        for position in [1, 2, 3, 4]:  # GK, DEF, MID, FWD
-            position_players = predictions_df[predictions_df['position'] == position].copy()
-            position_players = position_players.sort_values('predicted_points', ascending=False).head(5)
-            
-            top_players_by_position[position] = []
-            for _, row in position_players.iterrows():
-                predicted_points = float(row['predicted_points'])
-                confidence = min(0.95, max(0.3, 0.8 - (predicted_points * 0.02)))
-                
-                top_players_by_position[position].append({
-                    'player_id': int(row['player_id']),
-                    'name': str(row['name']),
-                    'position': int(row['position']),
-                    'price': float(row['price']),
-                    'team': int(row['team']),
-                    'predicted_points': predicted_points,
-                    'confidence': confidence
-                })
-        
-        return {
-            'top_players_by_position': top_players_by_position,
-            'total_players_analyzed': len(predictions_df),
-            'gameweek': current_gw + 1
-        }
+        # Cached predictions for the next gameweek (recomputed only when data, model or gameweek change)
+        predictions_df, current_gw = await load_prediction_frame()
+        return json_response(await run_blocking(rank_top_players, predictions_df, current_gw))
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting top players: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get top players: {str(e)}")
 
+def with_horizon(predictions_df: pd.DataFrame, horizon: int) -> pd.DataFrame:
+    """prediction frame ranked on one horizon's points, or 400 for an unknown horizon"""
+    column = horizon_column(horizon)
+    if column not in predictions_df.columns:
+        raise HTTPException(status_code=400,
+                            detail=f"No model for a {horizon} gameweek horizon (available: {fpl_predictor.horizons})")
+    return predictions_df.assign(predicted_points=predictions_df[column])
+
+@timed("serialize_predictions")
+def horizon_records(predictions_df: pd.DataFrame, horizons: List[int]) -> List[Dict[str, Any]]:
+    """one record per player with its predicted points for every horizon, built from whole columns"""
+    columns = {str(horizon): horizon_column(horizon) for horizon in horizons if horizon_column(horizon) in predictions_df}
+    players = pd.DataFrame({
+        'player_id': predictions_df['player_id'].to_numpy(dtype=np.int64),
+        'name': predictions_df['name'].astype(str).to_numpy(),
+        'position': predictions_df['position'].to_numpy(dtype=np.int64),
+        'team': predictions_df['team'].to_numpy(dtype=np.int64),
+        'team_name': predictions_df['team_name'].astype(str).to_numpy(),
+        'price': predictions_df['price'].to_numpy(dtype=np.float64),
+    }).to_dict('records')
+    points = zip(*(predictions_df[column].to_numpy(dtype=np.float64).tolist() for column in columns.values()))
+    for record, values in zip(players, points):
+        record['predicted_points'] = dict(zip(columns, values))
+    return players
+
+@app.get("/predict/horizons")
+async def get_horizon_predictions():
+    """predicted points over every trained horizon (e.g. 1, 3 and 5 gameweeks) for every player"""
+    if fpl_predictor is None or fpl_predictor.model is None:
+        raise HTTPException(status_code=503, detail="ML model not loaded. Please train the model first.")
+    
+    try:
+        # All horizons come out of the same prediction pass over one feature matrix
+        predictions_df, current_gw = await load_prediction_frame()
+        players = await run_blocking(horizon_records, predictions_df, fpl_predictor.horizons)
+        return json_response({
+            'gameweek': current_gw + 1,
+            'horizons': fpl_predictor.horizons,
+            'players': players,
+            'count': len(players)
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting horizon predictions: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get horizon predictions: {str(e)}")
+
+# columns of every streamed prediction, ahead of the horizons and any requested features
+STREAM_COLUMNS = ['player_id', 'name', 'position', 'team', 'team_name', 'price', 'gameweek', 'predicted_points', 'confidence']
+
+def parse_int_list(value: Optional[str], name: str) -> Optional[List[int]]:
+    """'1,3' -> [1, 3]; 400 on anything that isn't a comma separated list of integers"""
+    if not value:
+        return None
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a comma separated list of integers")
+
+def stream_rows(frame: pd.DataFrame, positions: Optional[List[int]], teams: Optional[List[int]],
+                min_price: Optional[float], max_price: Optional[float]) -> np.ndarray:
+    """positions of the rows passing the filters, ordered by predicted points"""
+    mask = np.ones(len(frame), dtype=bool)
+    if positions:
+        mask &= frame['position'].isin(positions).to_numpy()
+    if teams:
+        mask &= frame['team'].isin(teams).to_numpy()
+    if min_price is not None:
+        mask &= frame['price'].to_numpy() >= min_price
+    if max_price is not None:
+        mask &= frame['price'].to_numpy() <= max_price
+    rows = np.flatnonzero(mask)
+    order = np.argsort(-frame['predicted_points'].to_numpy()[rows], kind='stable')
+    return rows[order]
+
+def prediction_chunk(frame: pd.DataFrame, rows: np.ndarray, columns: List[str]) -> pd.DataFrame:
+    """only the given rows and columns of the prediction frame"""
+    return frame.iloc[rows, frame.columns.get_indexer(columns)].reset_index(drop=True)
+
+def ndjson_chunks(frame: pd.DataFrame, rows: np.ndarray, columns: List[str]):
+    """one json object per line, STREAM_CHUNK_ROWS lines per yielded chunk"""
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        chunk = prediction_chunk(frame, rows[start:start + STREAM_CHUNK_ROWS], columns)
+        values = []
+        for column in chunk.columns:
+            series = chunk[column]
+            if series.dtype == np.float32:
+                # shortest decimal for the stored float32, not its float64 expansion
+                values.append(series.to_numpy(dtype=np.float64).round(6).tolist())
+            elif series.dtype == object:
+                values.append(series.astype(str).tolist())
+            else:
+                values.append(series.tolist())
+        names = list(chunk.columns)
+        yield b"".join(dump_json(dict(zip(names, record))) + b"\n" for record in zip(*values))
+
+def arrow_chunks(frame: pd.DataFrame, rows: np.ndarray, columns: List[str]):
+    """an arrow ipc stream: the schema with the first batch, then one record batch per STREAM_CHUNK_ROWS rows"""
+    # the schema comes from the full frame so an empty selection still has typed columns
+    schema = pa.Schema.from_pandas(prediction_chunk(frame, np.arange(min(1, len(frame))), columns),
+                                   preserve_index=False)
+    buffer = io.BytesIO()
+    writer = pa.ipc.new_stream(buffer, schema)
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        chunk = prediction_chunk(frame, rows[start:start + STREAM_CHUNK_ROWS], columns)
+        writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+        # hand over what the writer produced and reuse the buffer for the next batch
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    writer.close()
+    yield buffer.getvalue()
+
+@app.get("/predict/stream")
+async def stream_predictions(format: str = "ndjson", position: Optional[str] = None, team: Optional[str] = None,
+                             min_price: Optional[float] = None, max_price: Optional[float] = None,
+                             features: Optional[str] = None):
+    """next-gameweek predictions for every player, streamed best first
+
+    format=ndjson yields one json object per line, format=arrow an arrow ipc
+    stream of record batches. position=2,3 and team=1,14 select by fpl
+    position and team id, min_price/max_price by price; features=form_3gw,xg_avg_5
+    adds model inputs to each row. rows are encoded STREAM_CHUNK_ROWS at a
+    time straight from the cached prediction frame, so memory stays at one
+    chunk whatever the player count
+    """
+    if format not in ("ndjson", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'arrow'")
+    if format == "arrow" and pa is None:
+        raise HTTPException(status_code=406, detail="Arrow streams need pyarrow installed")
+    positions = parse_int_list(position, "position")
+    teams = parse_int_list(team, "team")
+    if fpl_predictor is None or fpl_predictor.model is None:
+        raise HTTPException(status_code=503, detail="ML model not loaded. Please train the model first.")
+    
+    try:
+        predictions_df, current_gw = await load_prediction_frame()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming predictions: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to stream predictions: {str(e)}")
+
+    available = [col for col in FEATURE_COLUMNS if col in predictions_df.columns]
+    requested = [name.strip() for name in features.split(",") if name.strip()] if features else []
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown feature columns: {', '.join(unknown)}")
+    horizons = [horizon_column(h) for h in fpl_predictor.horizons if horizon_column(h) in predictions_df.columns]
+    columns = list(dict.fromkeys(STREAM_COLUMNS + horizons + requested))
+
+    rows = stream_rows(predictions_df, positions, teams, min_price, max_price)
+    headers = {"X-Gameweek": str(current_gw + 1), "X-Total-Count": str(len(rows))}
+    if format == "arrow":
+        return StreamingResponse(arrow_chunks(predictions_df, rows, columns),
+                                 media_type="application/vnd.apache.arrow.stream", headers=headers)
+    return StreamingResponse(ndjson_chunks(predictions_df, rows, columns),
+                             media_type="application/x-ndjson", headers=headers)
+
+@timed("serialize_predictions")
+def prediction_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """PlayerPrediction-shaped dicts for every row of a prediction frame, built from whole columns"""
+    columns = (
+        frame['player_id'].to_numpy(dtype=np.int64).tolist(),
+        frame['predicted_points'].to_numpy(dtype=np.float64).tolist(),
+        frame['confidence'].to_numpy(dtype=np.float64).tolist(),
+        frame['name'].astype(str).tolist(),
+        frame['position'].to_numpy(dtype=np.int64).tolist(),
+        frame['price'].to_numpy(dtype=np.float64).tolist(),
+        frame['team'].to_numpy(dtype=np.int64).tolist(),
+        frame['team_name'].astype(str).tolist(),
+    )
+    return [
+        {'player_id': player_id, 'predicted_points': points, 'confidence': confidence,
+         'features': {'name': name, 'position': position, 'price': price, 'team': team, 'team_name': team_name}}
+        for player_id, points, confidence, name, position, price, team, team_name in zip(*columns)
+    ]
+
+def strategy_result(players: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """AIStrategyResponse-shaped payload for a selected squad's records"""
+    return {
+        'players': players,
+        'total_cost': sum(p['features']['price'] for p in players),
+        'expected_points': sum(p['predicted_points'] for p in players),
+        'strategy_name': "AI Strategy",
+    }
+
 @app.post("/predict/ai-strategy", response_model=AIStrategyResponse)
 async def generate_ai_strategy(request: AIStrategyRequest):
     """Generate AI-optimized team using True ML predictions"""
@@ -214,39 +738,11 @@ async def generate_ai_strategy(request: AIStrategyRequest):
         raise HTTPException(status_code=503, detail="ML model not loaded. Please train the model first.")
     
     try:
-        # Load historical data
-        data_dir = "data"
-        if not os.path.exists(data_dir):
-            raise HTTPException(status_code=503, detail="Data directory not found. Please collect data first.")
-        
-        data_files = [f for f in os.listdir(data_dir) if f.startswith("fpl_historical_data_")]
-        if not data_files:
-            raise HTTPException(status_code=503, detail="No historical data found. Please collect data first.")
-        
-        latest_file = sorted(data_files)[-1]
-        df = data_collector.load_data(latest_file)
+        # Cached predictions for the next gameweek (recomputed only when data, model or gameweek change)
+        predictions_df, current_gw = await load_prediction_frame()
         
-        # Get current gameweek
-        current_gw = data_collector.get_current_gameweek()
-        
-        # Get current player data to include names
-        current_players_response = await get_current_players()
-        current_players = {p['id']: p for p in current_players_response['players']}
-        
-        # Make predictions using true ML model
-        predictions_df = fpl_predictor.predict_next_gameweek(df, current_gw)
-        
-        # Add player names, team names, and current position data to predictions
-        predictions_df['name'] = predictions_df['player_id'].map(
-            lambda pid: current_players.get(pid, {}).get('name', f'Player {pid}')
-        )
-        predictions_df['team_name'] = predictions_df['player_id'].map(
-            lambda pid: current_players.get(pid, {}).get('team_name', 'Unknown')
-        )
-        # Override position with current FPL position data to ensure accuracy
-        predictions_df['position'] = predictions_df['player_id'].map(
-            lambda pid: current_players.get(pid, {}).get('position', 3)
-        )
+        # Use current FPL position data and the requested horizon's predicted points
+        predictions_df = with_horizon(predictions_df, request.horizon)
         
         # Filter by budget and excluded players
         filtered_predictions = predictions_df[
@@ -257,42 +753,15 @@ async def generate_ai_strategy(request: AIStrategyRequest):
         if len(filtered_predictions) < 11:
             raise HTTPException(status_code=400, detail="Not enough players within budget")
         
-        # Convert to PlayerPrediction objects
-        predictions = []
-        for _, row in filtered_predictions.iterrows():
-            # Calculate actual confidence based on prediction variance
-            # Higher variance = lower confidence
-            predicted_points = float(row['predicted_points'])
-            confidence = min(0.95, max(0.3, 0.8 - (predicted_points * 0.02)))  # Dynamic confidence
-            
-            predictions.append(PlayerPrediction(
-                player_id=int(row['player_id']),
-                predicted_points=predicted_points,
-                confidence=confidence,
-                features={
-                    'name': str(row['name']),
-                    'position': int(row['position']),
-                    'price': float(row['price']),
-                    'team': int(row['team']),
-                    'team_name': str(row['team_name'])
-                }
-            ))
-        
-        # Sort by predicted points
-        predictions.sort(key=lambda x: x.predicted_points, reverse=True)
-        
-        # Select team based on formation
-        selected_team = select_team_by_formation(predictions, request.formation, request.budget)
-        
-        total_cost = sum(p.features.get('price', 0) for p in selected_team)
-        expected_points = sum(p.predicted_points for p in selected_team)
-        
-        return AIStrategyResponse(
-            players=selected_team,
-            total_cost=total_cost,
-            expected_points=expected_points
-        )
+        # Select team based on formation; only the 15 selected rows are serialized
+        selected_team = await run_blocking(select_team_by_formation, filtered_predictions,
+                                           request.formation, request.budget)
+        return json_response(strategy_result(prediction_records(selected_team)))
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating AI strategy: {e}")
         logger.error(f"Exception type: {type(e).__name__}")
@@ -300,84 +769,206 @@ async def generate_ai_strategy(request: AIStrategyRequest):
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Failed to generate AI strategy: {str(e)}")
 
-def get_position_name(position_id: int) -> str:
-    """Convert position ID to name"""
-    position_map = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
-    return position_map.get(position_id, "UNK")
+@timed("plan_transfers")
+def plan_transfers(predictions_df: pd.DataFrame, request: TransferPlanRequest) -> Dict[str, Any]:
+    """transfer plan from the per-gameweek points implied by every trained horizon"""
+    horizons = [h for h in fpl_predictor.horizons if horizon_column(h) in predictions_df.columns]
+    cumulative = {h: predictions_df[horizon_column(h)].to_numpy() for h in horizons}
+    points = per_gameweek_points(cumulative, request.horizon)
+    candidates = predictions_df[['player_id', 'position', 'team', 'price']].reset_index(drop=True)
+    planner = TransferPlanner(candidates, points, max_transfers=request.max_transfers,
+                              time_budget=TRANSFER_PLAN_BUDGET)
+    return planner.plan(request.squad, request.bank, request.free_transfers, request.selling_prices)
 
-def select_team_by_formation(predictions: List[PlayerPrediction], formation: str, budget: float) -> List[PlayerPrediction]:
-    """Select optimal team based on formation constraints including bench players"""
-    # Position mapping: 1=GK, 2=DEF, 3=MID, 4=FWD
-    # FPL rules: 15 players total (11 starting + 4 bench), max 3 per team
-    
-    # Define starting XI limits for each formation
-    starting_xi_limits = {
-        "3-4-3": {"GK": 1, "DEF": 3, "MID": 4, "FWD": 3},
-        "3-5-2": {"GK": 1, "DEF": 3, "MID": 5, "FWD": 2},
-        "4-3-3": {"GK": 1, "DEF": 4, "MID": 3, "FWD": 3},
-        "4-4-2": {"GK": 1, "DEF": 4, "MID": 4, "FWD": 2},
-        "4-5-1": {"GK": 1, "DEF": 4, "MID": 5, "FWD": 1},
-        "5-3-2": {"GK": 1, "DEF": 5, "MID": 3, "FWD": 2},
-        "5-4-1": {"GK": 1, "DEF": 5, "MID": 4, "FWD": 1}
-    }
-    
-    # Total limits including bench
-    total_limits = {
-        "3-4-3": {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3},
-        "3-5-2": {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3},
-        "4-3-3": {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3},
-        "4-4-2": {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3},
-        "4-5-1": {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3},
-        "5-3-2": {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3},
-        "5-4-1": {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3}
-    }
+@app.post("/predict/transfer-plan")
+async def generate_transfer_plan(request: TransferPlanRequest):
+    """best transfers for an existing squad over the next gameweeks, -4 hits included
+
+    per-gameweek points are interpolated from the cumulative horizon models
+    (e.g. 1, 3 and 5 gameweeks); the search is a time-boxed beam over single
+    and double transfers per gameweek (see transfer_planner.py)
+    """
+    if fpl_predictor is None or fpl_predictor.model is None:
+        raise HTTPException(status_code=503, detail="ML model not loaded. Please train the model first.")
+    if not 1 <= request.horizon <= MAX_PLAN_HORIZON:
+        raise HTTPException(status_code=400, detail=f"horizon must be between 1 and {MAX_PLAN_HORIZON}")
+    if request.max_transfers not in (1, 2):
+        raise HTTPException(status_code=400, detail="max_transfers must be 1 or 2")
     
-    starting_limits = starting_xi_limits.get(formation, starting_xi_limits["3-4-3"])
-    total_limits_dict = total_limits.get(formation, total_limits["3-4-3"])
+    try:
+        predictions_df, current_gw = await load_prediction_frame()
+        plan = await run_blocking(plan_transfers, predictions_df, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error planning transfers: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to plan transfers: {str(e)}")
     
-    selected = []
-    position_counts = {"GK": 0, "DEF": 0, "MID": 0, "FWD": 0}
+    names = dict(zip(predictions_df['player_id'].tolist(), predictions_df['name'].astype(str).tolist()))
+    for step in plan['gameweeks']:
+        step['gameweek'] = current_gw + 1 + step.pop('gameweek_offset')
+        for transfer in step['transfers']:
+            transfer['out_name'] = names.get(transfer['out'])
+            transfer['in_name'] = names.get(transfer['in'])
+    return json_response(plan)
+
+@timed("simulate_squad")
+def simulate_squad(predictions_df: pd.DataFrame, request: SimulationRequest) -> Dict[str, Any]:
+    """monte carlo summary of a squad's next gameweek (see squad_simulator.py)"""
+    rows = predictions_df.set_index('player_id', drop=False).reindex(request.squad)
+    missing = [pid for pid, known in zip(request.squad, rows['position'].notna()) if not known]
+    if missing:
+        raise ValueError(f"No predictions for players: {missing}")
+    simulator = SquadSimulator(rows.reset_index(drop=True), draws=request.draws, seed=request.seed)
+    return simulator.summary(request.starting_xi, request.bench, request.captain, request.vice_captain)
+
+@app.post("/predict/simulate")
+async def simulate_gameweek(request: SimulationRequest):
+    """squad points distribution, captain and vice-captain picks and bench order values for next gameweek
+
+    outcomes are sampled with same-club players correlated and automatic
+    substitutions applied; results are cached per squad and lineup until the
+    predictions change
+    """
+    if fpl_predictor is None or fpl_predictor.model is None:
+        raise HTTPException(status_code=503, detail="ML model not loaded. Please train the model first.")
+    if not 1000 <= request.draws <= MAX_SIMULATION_DRAWS:
+        raise HTTPException(status_code=400, detail=f"draws must be between 1000 and {MAX_SIMULATION_DRAWS}")
     
-    # Sort predictions by predicted points
-    sorted_predictions = sorted(predictions, key=lambda x: x.predicted_points, reverse=True)
+    try:
+        predictions_df, current_gw = await load_prediction_frame()
+        # simulations for the current predictions; a new gameweek, model or prediction run drops them all
+        prediction_key = (current_gw, fpl_predictor.model_version,
+                          zlib.crc32(predictions_df['predicted_points'].to_numpy().tobytes()))
+        simulations = service_cache.get_or_compute(CACHE_KEYS['SIMULATIONS'], prediction_key, dict)
+        variant = tuple(tuple(ids) if ids is not None else None for ids in (
+            request.squad, request.starting_xi, request.bench)) + (
+            request.captain, request.vice_captain, request.draws, request.seed)
+        result = simulations.get(variant)
+        if result is None:
+            result = await run_blocking(simulate_squad, predictions_df, request)
+            if len(simulations) >= SIMULATIONS_KEPT:
+                simulations.clear()
+            simulations[variant] = result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error simulating squad: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to simulate squad: {str(e)}")
     
-    logger.info(f"Selecting team with formation: {formation}")
-    logger.info(f"Starting XI limits: {starting_limits}")
-    logger.info(f"Total limits (including bench): {total_limits_dict}")
+    names = dict(zip(predictions_df['player_id'].tolist(), predictions_df['name'].astype(str).tolist()))
+    return json_response({
+        **result,
+        'gameweek': current_gw + 1,
+        'players': [{**player, 'name': names.get(player['player_id'])} for player in result['players']],
+    })
+
+@app.post("/predict/ai-strategy/batch", response_model=AIStrategyBatchResponse)
+async def generate_ai_strategy_batch(request: AIStrategyBatchRequest):
+    """Generate AI-optimized teams for many budget/formation/exclusion variants from one prediction pass"""
+    if fpl_predictor is None or fpl_predictor.model is None:
+        raise HTTPException(status_code=503, detail="ML model not loaded. Please train the model first.")
+    if not request.strategies:
+        raise HTTPException(status_code=400, detail="No strategies requested")
+    if len(request.strategies) > MAX_BATCH_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_STRATEGIES} strategies per batch")
     
-    # First, select the starting XI (11 players)
-    for prediction in sorted_predictions:
-        if len(selected) >= 11:
-            break
-            
-        position_id = prediction.features.get('position', 3)
-        position = get_position_name(position_id)
+    try:
+        # Predictions are computed (or read from cache) once for the whole batch
+        predictions_df, current_gw = await load_prediction_frame()
         
-        if position_counts[position] < starting_limits[position]:
-            selected.append(prediction)
-            position_counts[position] += 1
-            logger.info(f"Selected {prediction.features.get('name', 'Unknown')} as {position} (Starting XI)")
-    
-    # Then, select bench players (4 more players)
-    for prediction in sorted_predictions:
-        if len(selected) >= 15:
-            break
+        # Shared candidate pool: nobody above the largest budget can be picked by any variant
+        max_budget = max(strategy.budget for strategy in request.strategies)
+        predictions_df = predictions_df[predictions_df['price'] <= max_budget]
+        
+        # Variants are solved in one pass per horizon, each on that horizon's predicted points
+        solutions = [None] * len(request.strategies)
+        by_id = {}
+        for horizon in sorted({s.horizon for s in request.strategies}):
+            pool = with_horizon(predictions_df, horizon)
+            candidates = pool[['player_id', 'position', 'team', 'price', 'predicted_points']].reset_index(drop=True)
             
-        if prediction in selected:
-            continue  # Skip already selected players
+            indices = [i for i, s in enumerate(request.strategies) if s.horizon == horizon]
+            jobs = [(request.strategies[i].budget, request.strategies[i].formation,
+                     tuple(request.strategies[i].exclude_players)) for i in indices]
+            for i, solution in zip(indices, await run_blocking(solve_strategies, candidates, jobs)):
+                solutions[i] = solution
             
-        position_id = prediction.features.get('position', 3)
-        position = get_position_name(position_id)
+            # Only the selected players are serialized, each once however many squads pick them
+            selected_ids = {pid for i in indices if solutions[i] is not None
+                            for pid in solutions[i]['starting_xi'] + solutions[i]['bench']}
+            selected = pool[pool['player_id'].isin(selected_ids)]
+            by_id[horizon] = dict(zip(selected['player_id'].tolist(), prediction_records(selected)))
+        
+        results = []
+        for strategy, solution in zip(request.strategies, solutions):
+            if solution is None:
+                results.append({'request': strategy.model_dump(), 'result': None,
+                                'error': "No legal squad fits the budget and club limits"})
+                continue
+            players = [by_id[strategy.horizon][pid] for pid in solution['starting_xi'] + solution['bench']]
+            results.append({'request': strategy.model_dump(), 'error': None, 'result': strategy_result(players)})
         
-        if position_counts[position] < total_limits_dict[position]:
-            selected.append(prediction)
-            position_counts[position] += 1
-            logger.info(f"Selected {prediction.features.get('name', 'Unknown')} as {position} (Bench)")
+        return json_response({'results': results, 'gameweek': current_gw + 1})
     
-    logger.info(f"Final team selection: {len(selected)} players")
-    logger.info(f"Final position counts: {position_counts}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating AI strategy batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate AI strategy batch: {str(e)}")
+
+def get_optimizer_pool() -> ProcessPoolExecutor:
+    """Process pool for squad optimization, created on first use"""
+    global optimizer_pool
+    if optimizer_pool is None:
+        optimizer_pool = ProcessPoolExecutor(max_workers=OPTIMIZER_WORKERS)
+    return optimizer_pool
+
+def solve_strategies(candidates: pd.DataFrame, jobs: List[tuple]) -> List[Dict[str, Any]]:
+    """Solve (budget, formation, exclude) jobs, spread across worker processes when there are several"""
+    workers = min(OPTIMIZER_WORKERS, len(jobs))
+    if workers <= 1:
+        return solve_squads(candidates, jobs)
     
-    return selected
+    # One chunk per worker so the candidate frame is pickled once per process, not once per job
+    chunks = [jobs[i::workers] for i in range(workers)]
+    chunk_results = list(get_optimizer_pool().map(solve_squads, [candidates] * workers, chunks))
+    
+    solutions = [None] * len(jobs)
+    for i, results in enumerate(chunk_results):
+        solutions[i::workers] = results
+    return solutions
+
+def get_position_name(position_id: int) -> str:
+    """Convert position ID to name"""
+    position_map = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+    return position_map.get(position_id, "UNK")
+
+@timed("select_team")
+def select_team_by_formation(predictions: pd.DataFrame, formation: str, budget: float) -> pd.DataFrame:
+    """Select the optimal 15-man squad (starting XI first, then bench) within budget and club limits
+
+    returns the selected rows of the prediction frame in squad order
+    """
+    # Highest predicted points first, so ties resolve towards the better-ranked player
+    ranked = predictions.sort_values('predicted_points', ascending=False, kind='stable')
+    candidates = ranked[['player_id', 'position', 'team', 'price', 'predicted_points']].reset_index(drop=True)
+
+    logger.info(f"Selecting team with formation: {formation}, budget: {budget}")
+    solution = SquadOptimizer(candidates, budget, formation).solve()
+    if solution is None:
+        raise ValueError("No legal squad fits the budget and club limits")
+
+    # index lookup of the chosen ids, in squad order
+    selected = ranked.set_index('player_id', drop=False).loc[solution['starting_xi'] + solution['bench']]
+
+    logger.info(f"Final team selection: {len(selected)} players, cost {solution['total_cost']:.1f}, "
+                f"{solution['nodes_explored']} nodes explored")
+    return selected.reset_index(drop=True)
 
 if __name__ == "__main__":
     import uvicorn
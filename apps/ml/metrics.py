@@ -0,0 +1,315 @@
+import bisect
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# instrumentation switch; with ML_METRICS=0 stages and timed functions are
+# plain calls, no middleware is installed and /metrics is not served
+METRICS_ENABLED = os.getenv("ML_METRICS", "1") == "1"
+
+# seconds, from sub-millisecond cache reads up to a cold training-size load
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# rows per model call
+BATCH_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+# (stage, seconds) recorded while serving the current request; None outside a request
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('request_timings', default=None)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """monotonic counter per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """cumulative-bucket histogram per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # per-bucket counts, then sum and count
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 3)
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in values:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float('inf'),), state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(state[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {_format_value(state[-1])}"
+
+
+class MetricsRegistry:
+    """metrics owned by this process plus callbacks that report point-in-time values at scrape time"""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, Any], float]]]] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, Any], float]]]) -> None:
+        """collector() yields (name, type, help, labels, value) tuples, e.g. from cache stats"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        described = set()
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help, labels, value in samples:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {name} {help}")
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name}{_format_labels(list(labels), tuple(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "ml_http_request_duration_seconds", "Time to serve a request, by route", ["method", "route", "status"])
+STAGE_SECONDS = registry.histogram(
+    "ml_stage_duration_seconds", "Time spent in each stage of request handling and prediction", ["stage"])
+SCHEDULER_STAGE_SECONDS = registry.histogram(
+    "ml_scheduler_stage_duration_seconds", "Time spent in each stage of a scheduler run", ["stage"])
+SCHEDULER_RUNS = registry.counter(
+    "ml_scheduler_runs_total", "Scheduler pipeline runs by outcome", ["status"])
+OUTBOUND_SECONDS = registry.histogram(
+    "ml_fpl_api_request_duration_seconds", "Latency of requests to the FPL API", ["endpoint", "status"])
+OUTBOUND_BYTES = registry.counter(
+    "ml_fpl_api_response_bytes_total", "Response body bytes received from the FPL API", ["endpoint"])
+INFERENCE_ROWS = registry.histogram(
+    "ml_inference_batch_rows", "Rows per model prediction call", ["horizon"], buckets=BATCH_BUCKETS)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """add a finished stage to the stage histogram and the current request's Server-Timing"""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+class _Stage:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """context manager timing a block as one stage"""
+    return _Stage(name) if METRICS_ENABLED else _NO_STAGE
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """decorator timing every call of a function as one stage; the function itself when metrics are off"""
+    def decorate(func: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+# numeric path segments (player ids, gameweeks) are folded so each api endpoint is one label value
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(path: str) -> str:
+    """'/element-summary/123/' -> '/element-summary/{id}/'; query strings are dropped"""
+    return _ID_SEGMENT.sub("/{id}", path.partition("?")[0])
+
+
+def observe_http(path: str, status: int, seconds: float, size: int) -> None:
+    """record one outbound FPL API request; it also counts towards the request's fpl_api stage"""
+    if not METRICS_ENABLED:
+        return
+    endpoint = endpoint_label(path)
+    OUTBOUND_SECONDS.observe(seconds, endpoint=endpoint, status=status)
+    OUTBOUND_BYTES.inc(size, endpoint=endpoint)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append(("fpl_api", seconds))
+
+
+def observe_inference(rows: int, horizon: int) -> None:
+    if METRICS_ENABLED:
+        INFERENCE_ROWS.observe(rows, horizon=horizon)
+
+
+def observe_scheduler_run(record: Dict[str, Any]) -> None:
+    if not METRICS_ENABLED:
+        return
+    SCHEDULER_RUNS.inc(status=record.get('status', 'unknown'))
+    for name, seconds in record.get('stages', {}).items():
+        SCHEDULER_STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing header value; repeated stages are summed, in first-seen order"""
+    durations: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0.0) + seconds
+        counts[name] = counts.get(name, 0) + 1
+    entries = [
+        f'{name};dur={seconds * 1000:.2f}' + (f';desc="x{counts[name]}"' if counts[name] > 1 else "")
+        for name, seconds in durations.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """asgi middleware: request latency by route and a Server-Timing header of the request's stages
+
+    the header is added when the response starts, so it covers every stage
+    that finished before the first byte (for streamed responses, the setup)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b"server-timing",
+                                server_timing(timings, time.perf_counter() - started).encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # the matched route template keeps label values bounded; unknown paths share one
+            route = getattr(scope.get('route'), 'path', None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                    method=scope['method'], route=route, status=status[0])
@@ -0,0 +1,252 @@
+import pandas as pd
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+import logging
+
+# configure logging for the stand-in server
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# live stats served per player, in the order the real api lists them
+LIVE_STAT_FIELDS = [
+    'minutes', 'goals_scored', 'assists', 'clean_sheets', 'goals_conceded',
+    'own_goals', 'penalties_saved', 'penalties_missed', 'yellow_cards',
+    'red_cards', 'saves', 'bonus', 'bps', 'influence', 'creativity', 'threat',
+    'ict_index', 'starts', 'expected_goals', 'expected_assists',
+    'expected_goal_involvements', 'expected_goals_conceded',
+]
+
+# the real api serves these as decimal strings
+STRING_FIELDS = {
+    'influence', 'creativity', 'threat', 'ict_index', 'expected_goals',
+    'expected_assists', 'expected_goal_involvements', 'expected_goals_conceded',
+    'selected_by_percent', 'value_form', 'value_season', 'form', 'points_per_game',
+}
+
+# string fields the real api formats with two decimals
+TWO_DECIMAL_FIELDS = {
+    'expected_goals', 'expected_assists', 'expected_goal_involvements', 'expected_goals_conceded',
+}
+
+
+def _api_value(field: str, value: Any) -> Any:
+    """convert a frame value into the type the fpl api uses for field"""
+    if field in STRING_FIELDS:
+        decimals = 2 if field in TWO_DECIMAL_FIELDS else 1
+        return f"{float(value):.{decimals}f}"
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+class MockFPLData:
+    """fpl api payloads rebuilt from a historical player-gameweek frame"""
+
+    def __init__(self, df: pd.DataFrame, current_gameweek: Optional[int] = None):
+        self.df = df
+        self.gameweeks = sorted(int(gw) for gw in df['gameweek'].unique())
+        self.current_gameweek = current_gameweek or self.gameweeks[-1]
+        self._bootstrap_body: Optional[bytes] = None
+
+    def bootstrap_static(self) -> Dict[str, Any]:
+        latest = self.df.sort_values('gameweek').drop_duplicates('player_id', keep='last')
+        totals = self.df.groupby('player_id')['points'].sum()
+
+        elements = []
+        for row in latest.to_dict('records'):
+            first_name, _, second_name = str(row['name']).partition(' ')
+            element = {
+                'id': int(row['player_id']),
+                'first_name': first_name,
+                'second_name': second_name,
+                'element_type': int(row['position']),
+                'team': int(row['team']),
+                'now_cost': int(round(float(row['price']) * 10)),
+                'total_points': int(totals.get(row['player_id'], 0)),
+                'form': _api_value('form', row['points']),
+                'points_per_game': _api_value('points_per_game', row['points']),
+                'influence_rank': 0,
+                'creativity_rank': 0,
+                'threat_rank': 0,
+                'ict_index_rank': 0,
+                'corners_and_indirect_freekicks_order': None,
+                'direct_freekicks_order': None,
+                'penalties_order': None,
+            }
+            for field in ['selected_by_percent', 'transfers_in', 'transfers_out', 'value_form',
+                          'value_season', 'bps', 'bonus'] + LIVE_STAT_FIELDS:
+                if field in row:
+                    element[field] = _api_value(field, row[field])
+            elements.append(element)
+
+        teams = [{'id': int(t), 'name': f"Team {int(t)}", 'short_name': f"T{int(t):02d}"}
+                 for t in sorted(self.df['team'].unique())]
+        events = [{
+            'id': gw,
+            'is_current': gw == self.current_gameweek,
+            'is_next': gw == self.current_gameweek + 1,
+            'finished': gw <= self.current_gameweek,
+            'data_checked': gw < self.current_gameweek,
+            'deadline_time': None,
+        } for gw in range(1, max(self.gameweeks[-1], self.current_gameweek) + 2)]
+
+        return {'events': events, 'teams': teams, 'elements': elements}
+
+    def bootstrap_body(self) -> bytes:
+        if self._bootstrap_body is None:
+            self._bootstrap_body = json.dumps(self.bootstrap_static()).encode()
+        return self._bootstrap_body
+
+    def set_frame(self, df: pd.DataFrame, current_gameweek: Optional[int] = None) -> None:
+        """swap in new data; the next bootstrap-static response gets a new etag"""
+        self.df = df
+        self.gameweeks = sorted(int(gw) for gw in df['gameweek'].unique())
+        self.current_gameweek = current_gameweek or self.gameweeks[-1]
+        self._bootstrap_body = None
+
+    def event_live(self, gameweek: int) -> Dict[str, Any]:
+        rows = self.df[self.df['gameweek'] == gameweek]
+        elements = []
+        for row in rows.to_dict('records'):
+            stats = {field: _api_value(field, row[field]) for field in LIVE_STAT_FIELDS}
+            stats['total_points'] = int(row['points'])
+            elements.append({'id': int(row['player_id']), 'stats': stats})
+        return {'elements': elements}
+
+    def fixtures(self, gameweek: int) -> List[Dict[str, Any]]:
+        rows = self.df[self.df['gameweek'] == gameweek].drop_duplicates('team')
+        home = rows[rows['is_home'].astype(bool)].sort_values('team')
+        away = rows[~rows['is_home'].astype(bool)].sort_values('team')
+        fixtures = []
+        for (_, h), (_, a) in zip(home.iterrows(), away.iterrows()):
+            fixtures.append({
+                'event': gameweek,
+                'team_h': int(h['team']),
+                'team_a': int(a['team']),
+                'team_h_difficulty': int(h['fixture_difficulty']),
+                'team_a_difficulty': int(a['fixture_difficulty']),
+            })
+        return fixtures
+
+
+class MockFPLServer:
+    """local stand-in for the fpl api with optional injected latency
+
+    serves /bootstrap-static/ (with ETag / 304 support), /event/{gw}/live/ and
+    /fixtures/?event={gw} from a historical frame. use as a context manager and
+    point clients at .base_url; paths added to .failing answer 503 to simulate
+    an api outage
+    """
+
+    def __init__(self, data: MockFPLData, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.data = data
+        self.latency = latency
+        self.requests = Counter()
+        self.failing = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+                with server._lock:
+                    server.requests[path] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if path in server.failing:
+                    return self._send(503)
+
+                if path == '/bootstrap-static/':
+                    body = server.data.bootstrap_body()
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        with server._lock:
+                            server.requests['304'] += 1
+                        return self._send(304, headers={'ETag': etag})
+                    return self._send(200, body, {'Content-Type': 'application/json', 'ETag': etag})
+
+                live = re.fullmatch(r'/event/(\d+)/live/', path)
+                if live:
+                    body = json.dumps(server.data.event_live(int(live.group(1)))).encode()
+                    return self._send(200, body, {'Content-Type': 'application/json'})
+
+                if path == '/fixtures/':
+                    event = re.search(r'event=(\d+)', query)
+                    fixtures = server.data.fixtures(int(event.group(1))) if event else []
+                    return self._send(200, json.dumps(fixtures).encode(), {'Content-Type': 'application/json'})
+
+                self._send(404)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockFPLServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockFPLServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def load_mock_data(data_dir: str = "data") -> MockFPLData:
+    """mock payloads built from the newest shipped historical csv"""
+    files = sorted(glob.glob(os.path.join(data_dir, "fpl_historical_data_*.csv")))
+    if not files:
+        raise FileNotFoundError(f"No historical data found in {data_dir}/")
+    return MockFPLData(pd.read_csv(files[-1]))
+
+
+def main():
+    """run the stand-in api until interrupted"""
+    parser = argparse.ArgumentParser(description="Local stand-in for the FPL API")
+    parser.add_argument("--port", type=int, default=3010)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    server = MockFPLServer(load_mock_data(), latency=args.latency, port=args.port)
+    logger.info(f"Mock FPL API on {server.base_url} (set FPL_API_BASE to use it)")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
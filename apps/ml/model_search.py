@@ -0,0 +1,161 @@
+import itertools
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+from sklearn.model_selection import TimeSeriesSplit
+import logging
+
+logger = logging.getLogger(__name__)
+
+# forest settings searched by default; every combination is one configuration
+PARAM_GRID = {
+    'n_estimators': [100, 200],
+    'max_depth': [6, 10, 14],
+    'min_samples_leaf': [2, 5],
+    'max_features': [1.0, 0.5],
+}
+
+# worker processes for the search
+SEARCH_WORKERS = int(os.getenv("ML_SEARCH_WORKERS", str(os.cpu_count() or 1)))
+
+# matrices shared with the workers, opened once per process
+_shared: Dict[str, np.ndarray] = {}
+
+
+def param_grid(grid: Optional[Dict[str, List[Any]]] = None) -> List[Dict[str, Any]]:
+    """every combination of the grid's values, as keyword arguments for the forest"""
+    grid = grid or PARAM_GRID
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def walk_forward_folds(gameweeks: np.ndarray, n_splits: int = 5) -> List[Tuple[int, int, int]]:
+    """expanding-window folds over gameweeks as (train_end, test_start, test_end) row offsets
+
+    rows must be sorted by gameweek, so every fold trains on a prefix of the
+    matrix and tests on the block of gameweeks right after it. n_splits is
+    capped at one less than the number of gameweeks
+    """
+    unique = np.unique(gameweeks)
+    n_splits = min(n_splits, len(unique) - 1)
+    if n_splits < 1:
+        raise ValueError("Walk-forward validation needs at least two gameweeks")
+
+    folds = []
+    for _, test_idx in TimeSeriesSplit(n_splits=n_splits).split(unique):
+        test_start = int(np.searchsorted(gameweeks, unique[test_idx[0]], side='left'))
+        test_end = int(np.searchsorted(gameweeks, unique[test_idx[-1]], side='right'))
+        folds.append((test_start, test_start, test_end))
+    return folds
+
+
+@contextmanager
+def shared_matrices(arrays: Dict[str, np.ndarray]) -> Iterator[str]:
+    """write arrays once as .npy into a temp dir for worker processes to memory-map; yields the dir"""
+    with tempfile.TemporaryDirectory(prefix="fpl_shared_") as matrix_dir:
+        for name, array in arrays.items():
+            np.save(os.path.join(matrix_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        try:
+            yield matrix_dir
+        finally:
+            _shared.clear()
+
+
+def open_shared(matrix_dir: str) -> Dict[str, np.ndarray]:
+    """pool initializer: map every shared matrix read-only (also usable in-process)"""
+    for filename in os.listdir(matrix_dir):
+        name, ext = os.path.splitext(filename)
+        if ext == ".npy":
+            _shared[name] = np.load(os.path.join(matrix_dir, filename), mmap_mode='r')
+    return _shared
+
+
+def shared_arrays() -> Dict[str, np.ndarray]:
+    """matrices mapped by open_shared() in this process"""
+    return _shared
+
+
+def _fit_fold(config_id: int, fold_id: int, params: Dict[str, Any], fold: Tuple[int, int, int]) -> Dict[str, Any]:
+    """fit one configuration on one fold's training prefix and score it on the fold's test block"""
+    X, y = _shared['X'], _shared['y']
+    train_end, test_start, test_end = fold
+
+    start = time.perf_counter()
+    model = RandomForestRegressor(**params, n_jobs=1)
+    model.fit(X[:train_end], y[:train_end])
+    train_seconds = time.perf_counter() - start
+
+    y_test = y[test_start:test_end]
+    y_pred = model.predict(X[test_start:test_end])
+    return {
+        'config_id': config_id,
+        'fold': fold_id,
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'train_seconds': train_seconds,
+        'train_rows': train_end,
+        'test_rows': test_end - test_start,
+    }
+
+
+def run_search(X: np.ndarray, y: np.ndarray, gameweeks: np.ndarray, configs: List[Dict[str, Any]],
+               n_splits: int = 5, workers: int = SEARCH_WORKERS) -> List[Dict[str, Any]]:
+    """walk-forward cross-validate every configuration; returns the leaderboard, best first
+
+    the feature matrix is written once as float32 .npy (the dtype the forest
+    trains on) and memory-mapped by every worker, so each (configuration,
+    fold) task ships only its parameters and row offsets. configurations are
+    ranked by mean MAE across folds
+    """
+    order = np.argsort(gameweeks, kind='stable')
+    X = np.asarray(X, dtype=np.float32)[order]
+    y = np.asarray(y, dtype=np.float64)[order]
+    folds = walk_forward_folds(np.asarray(gameweeks)[order], n_splits)
+    tasks = [(c, f, params, fold) for c, params in enumerate(configs) for f, fold in enumerate(folds)]
+    logger.info(f"Searching {len(configs)} configurations x {len(folds)} folds on {workers} workers")
+
+    results = []
+    with shared_matrices({'X': X, 'y': y}) as matrix_dir:
+        if workers <= 1:
+            open_shared(matrix_dir)
+            results = [_fit_fold(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=open_shared,
+                                     initargs=(matrix_dir,)) as pool:
+                futures = [pool.submit(_fit_fold, *task) for task in tasks]
+                for done, future in enumerate(as_completed(futures), 1):
+                    results.append(future.result())
+                    if done % max(1, len(tasks) // 10) == 0:
+                        logger.info(f"  {done}/{len(tasks)} fits done")
+
+    leaderboard = []
+    for config_id, params in enumerate(configs):
+        fold_results = sorted((r for r in results if r['config_id'] == config_id), key=lambda r: r['fold'])
+        leaderboard.append({
+            'params': params,
+            'mae': float(np.mean([r['mae'] for r in fold_results])),
+            'rmse': float(np.mean([r['rmse'] for r in fold_results])),
+            'train_seconds': float(sum(r['train_seconds'] for r in fold_results)),
+            'folds': [{k: r[k] for k in ('fold', 'mae', 'rmse', 'train_seconds', 'train_rows', 'test_rows')}
+                      for r in fold_results],
+        })
+    leaderboard.sort(key=lambda entry: entry['mae'])
+    for rank, entry in enumerate(leaderboard, 1):
+        entry['rank'] = rank
+    return leaderboard
+
+
+def format_leaderboard(leaderboard: List[Dict[str, Any]], top: int = 10) -> str:
+    """plain-text table of the best configurations with their per-fold MAE"""
+    lines = [f"{'rank':>4} {'mae':>7} {'rmse':>7} {'train s':>8}  params / fold mae"]
+    for entry in leaderboard[:top]:
+        folds = " ".join(f"{fold['mae']:.3f}" for fold in entry['folds'])
+        lines.append(f"{entry['rank']:>4} {entry['mae']:>7.4f} {entry['rmse']:>7.4f} {entry['train_seconds']:>8.1f}  "
+                     f"{entry['params']}  [{folds}]")
+    return "\n".join(lines)
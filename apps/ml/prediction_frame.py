@@ -0,0 +1,81 @@
+import pandas as pd
+import numpy as np
+from typing import Any, Dict
+from squad_simulator import outcome_confidence
+
+# the prediction frame and the response shapes built from it, shared by the
+# request path in main.py and the scheduler that precomputes them
+
+TOP_PLAYERS_PER_POSITION = 5
+
+
+def player_lookup(bootstrap: Dict[str, Any]) -> pd.DataFrame:
+    """name, team name and current position for every player in a bootstrap-static payload, indexed by player id"""
+    team_map = {team["id"]: team["name"] for team in bootstrap["teams"]}
+    elements = bootstrap["elements"]
+    return pd.DataFrame({
+        'name': [f"{player['first_name']} {player['second_name']}" for player in elements],
+        'team_name': [team_map.get(player["team"], "Unknown") for player in elements],
+        'current_position': np.fromiter((player["element_type"] for player in elements), dtype=np.int64, count=len(elements)),
+    }, index=pd.Index([player["id"] for player in elements], dtype=np.int64, name='player_id'))
+
+
+def build_prediction_frame(predictor, df: pd.DataFrame, current_gw: int, players: pd.DataFrame) -> pd.DataFrame:
+    """next-gameweek predictions enriched with player names, team names and current positions
+
+    one positional lookup into the bootstrap frame; players missing from it
+    get placeholder names and keep their stored position. position is set to
+    the current FPL position (also kept as current_position), so every
+    consumer applies squad quotas and formations to the same positions. the
+    model inputs are kept alongside so they can be streamed with the predictions,
+    and so is each prediction's confidence, which stays the next-gameweek one
+    when a consumer re-ranks on a longer horizon
+    """
+    predictions_df = predictor.predict_next_gameweek(df, current_gw, include_features=True)
+    player_ids = predictions_df['player_id'].to_numpy()
+    rows = players.index.get_indexer(player_ids)
+    missing = rows < 0
+    names = players['name'].to_numpy()[rows]
+    team_names = players['team_name'].to_numpy()[rows]
+    positions = players['current_position'].to_numpy()[rows]
+    if missing.any():
+        names[missing] = [f"Player {pid}" for pid in player_ids[missing]]
+        team_names[missing] = "Unknown"
+        positions[missing] = predictions_df['position'].to_numpy(dtype=np.int64)[missing]
+    predictions_df['name'] = names
+    predictions_df['team_name'] = team_names
+    predictions_df['current_position'] = positions
+    predictions_df['position'] = positions
+    predictions_df['confidence'] = prediction_confidence(predictions_df)
+    return predictions_df
+
+
+def prediction_confidence(predictions_df: pd.DataFrame) -> np.ndarray:
+    """confidence shown next to each prediction: the simulator's chance of it coming true within a couple of points"""
+    return outcome_confidence(predictions_df)
+
+
+def rank_top_players(predictions_df: pd.DataFrame, current_gw: int) -> Dict[str, Any]:
+    """top predicted players per position, in the /predict/top-players response shape"""
+    ranked = predictions_df.sort_values('predicted_points', ascending=False, kind='stable')
+    top = ranked.groupby('position', sort=False).head(TOP_PLAYERS_PER_POSITION)
+    records = pd.DataFrame({
+        'player_id': top['player_id'].to_numpy(dtype=np.int64),
+        'name': top['name'].astype(str).to_numpy(),
+        'position': top['position'].to_numpy(dtype=np.int64),
+        'price': top['price'].to_numpy(dtype=np.float64),
+        'team': top['team'].to_numpy(dtype=np.int64),
+        'predicted_points': top['predicted_points'].to_numpy(dtype=np.float64),
+        'confidence': top['confidence'].to_numpy(dtype=np.float64),
+    }).to_dict('records')
+
+    top_players_by_position = {position: [] for position in [1, 2, 3, 4]}  # GK, DEF, MID, FWD
+    for record in records:
+        if record['position'] in top_players_by_position:
+            top_players_by_position[record['position']].append(record)
+
+    return {
+        'top_players_by_position': top_players_by_position,
+        'total_players_analyzed': len(predictions_df),
+        'gameweek': current_gw + 1
+    }
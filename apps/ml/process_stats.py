@@ -0,0 +1,77 @@
+import os
+import sys
+from typing import Dict
+import logging
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# fields of /proc/<pid>/smaps_rollup reported, in kB
+SMAPS_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb',
+}
+
+
+def process_memory(pid: int = None) -> Dict[str, float]:
+    """resident memory of a process in MB
+
+    rss counts every resident page including ones shared with other workers;
+    pss splits shared pages between the processes mapping them, so summing pss
+    over workers gives their real footprint. where smaps_rollup is unavailable
+    only the current rss is reported (from /proc/<pid>/statm, or psutil); with
+    neither, this process's high-water mark is reported as peak_rss_mb
+    """
+    pid = pid or os.getpid()
+    try:
+        memory = {}
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in SMAPS_FIELDS:
+                    memory[SMAPS_FIELDS[name]] = round(int(rest.split()[0]) / 1024, 1)
+        memory['private_mb'] = round(memory.get('private_clean_mb', 0) + memory.get('private_dirty_mb', 0), 1)
+        return memory
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            pages = int(f.read().split()[1])
+        return {'rss_mb': round(pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20, 1)}
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        try:
+            return {'rss_mb': round(psutil.Process(pid).memory_info().rss / 2 ** 20, 1)}
+        except psutil.Error:
+            return {}
+    if pid == os.getpid() and resource is not None:
+        # ru_maxrss is the peak, in kB on linux and bytes on macos
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {'peak_rss_mb': round(peak / (2 ** 20 if sys.platform == 'darwin' else 1024), 1)}
+    return {}
+
+
+def peak_memory(pid: int = None) -> float:
+    """high-water mark of a process's resident memory in MB (VmHWM), or 0.0 if unavailable"""
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0.0
@@ -0,0 +1,318 @@
+import pandas as pd
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import joblib
+import logging
+from fpl_predictor import PREDICTION_WINDOW
+from metrics import observe_scheduler_run
+from prediction_frame import build_prediction_frame, player_lookup, rank_top_players
+
+try:
+    import fcntl
+except ImportError:  # not available on windows; runs are then only serialized per process
+    fcntl = None
+
+# configure logging for the scheduler
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# where published snapshots live, shared by every worker and the sidecar
+SNAPSHOT_DIR = os.getenv("ML_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_FILE = "predictions_snapshot.pkl"
+LOCK_FILE = "scheduler.lock"
+
+# seconds between gameweek state checks
+POLL_INTERVAL = float(os.getenv("ML_SCHEDULER_INTERVAL", "300"))
+
+
+class PredictionSnapshot:
+    """everything the prediction endpoints serve, computed for one gameweek state and model"""
+
+    def __init__(self, predictions: pd.DataFrame, top_players: Dict[str, Any], gameweek: int,
+                 gameweek_state: Dict[str, Any], model_version: Optional[str], data_file: Optional[str],
+                 created_at: Optional[str] = None):
+        self.predictions = predictions
+        self.top_players = top_players
+        self.gameweek = gameweek
+        self.gameweek_state = gameweek_state
+        self.model_version = model_version
+        self.data_file = data_file
+        self.created_at = created_at or datetime.now().isoformat()
+
+    def save(self, path: str) -> None:
+        """write atomically so readers never see a partial snapshot"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PredictionSnapshot':
+        return joblib.load(path)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'gameweek': self.gameweek,
+            'gameweek_state': self.gameweek_state,
+            'model_version': self.model_version,
+            'data_file': self.data_file,
+            'created_at': self.created_at,
+            'players': len(self.predictions),
+        }
+
+
+class GameweekScheduler:
+    """background pipeline that keeps a prediction snapshot in step with the gameweek
+
+    every poll it reads the current gameweek state (deadline, finished,
+    data_checked) through the collector. on a transition, or when the model
+    changed, it runs incremental ingest -> re-prediction -> top-players
+    ranking and publishes the result as a new snapshot in memory and on disk.
+    runs are serialized across processes with a file lock, so with several
+    workers one runs the pipeline and the others pick up its snapshot. in
+    follow mode the scheduler never runs the pipeline itself and only loads
+    snapshots published by another process (e.g. the sidecar cli)
+    """
+
+    def __init__(self, collector, predictor, snapshot_dir: str = SNAPSHOT_DIR,
+                 poll_interval: float = POLL_INTERVAL, follow: bool = False, history: int = 20):
+        self.collector = collector
+        self.predictor = predictor
+        self.snapshot_dir = snapshot_dir
+        self.poll_interval = poll_interval
+        self.follow = follow
+
+        self._snapshot: Optional[PredictionSnapshot] = None
+        self._snapshot_mtime = 0.0
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._force = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.runs: deque = deque(maxlen=history)
+        self.last_state: Optional[Dict[str, Any]] = None
+        self.last_check_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.snapshot_dir, SNAPSHOT_FILE)
+
+    @property
+    def snapshot(self) -> Optional[PredictionSnapshot]:
+        """the published snapshot; replaced as a whole, never mutated"""
+        return self._snapshot
+
+
+    def load_snapshot(self) -> bool:
+        """adopt the on-disk snapshot if it is newer than ours and was built by the loaded model"""
+        try:
+            mtime = os.path.getmtime(self.snapshot_path)
+        except OSError:
+            return False
+        if mtime <= self._snapshot_mtime:
+            return False
+
+        snapshot = PredictionSnapshot.load(self.snapshot_path)
+        self._snapshot_mtime = mtime
+        if snapshot.model_version != self.predictor.model_version:
+            logger.info(f"Ignoring snapshot from model {snapshot.model_version}")
+            return False
+        if 'confidence' not in snapshot.predictions.columns:
+            logger.info("Ignoring snapshot built without prediction confidence")
+            return False
+        self._snapshot = snapshot
+        logger.info(f"Loaded prediction snapshot for gameweek {snapshot.gameweek} ({snapshot.created_at})")
+        return True
+
+    def _is_current(self, state: Dict[str, Any]) -> bool:
+        snapshot = self._snapshot
+        return (snapshot is not None and snapshot.gameweek_state == state
+                and snapshot.model_version == self.predictor.model_version)
+
+    @contextmanager
+    def _process_lock(self) -> Iterator[None]:
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.snapshot_dir, LOCK_FILE), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+    def current_state(self) -> Dict[str, Any]:
+        """gameweek state from a revalidated bootstrap-static (a 304 when nothing changed)"""
+        self.collector.bootstrap.invalidate()
+        state = self.collector.get_gameweek_state()
+        self.last_state = state
+        self.last_check_at = datetime.now().isoformat()
+        return state
+
+    def check(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """run the pipeline if the gameweek state moved on (or force); returns the run record if one ran"""
+        self.load_snapshot()
+        if self.follow:
+            return None
+
+        state = self.current_state()
+        if not force and self._is_current(state):
+            return None
+
+        previous = self._snapshot.gameweek_state if self._snapshot is not None else None
+        if force:
+            reason = "forced"
+        elif previous is None:
+            reason = "startup"
+        else:
+            reason = f"state changed (gameweek {previous['gameweek']} -> {state['gameweek']})"
+        return self.run(state, reason, force)
+
+    def run(self, state: Dict[str, Any], reason: str, force: bool = False) -> Dict[str, Any]:
+        """ingest -> predict -> rank -> publish, timing each stage"""
+        record: Dict[str, Any] = {
+            'reason': reason,
+            'gameweek': state['gameweek'],
+            'started_at': datetime.now().isoformat(),
+            'stages': {},
+        }
+        started = time.perf_counter()
+
+        with self._run_lock, self._process_lock():
+            # another process may have published this state while we waited for the lock
+            self.load_snapshot()
+            if not force and self._is_current(state):
+                record.update(status='skipped', detail='published by another process')
+                return self._finish(record, started)
+
+            try:
+                stage = time.perf_counter()
+                df, data_path = self.collector.collect_incremental(last_gameweeks=PREDICTION_WINDOW)
+                record['stages']['ingest'] = round(time.perf_counter() - stage, 3)
+
+                stage = time.perf_counter()
+                players = player_lookup(self.collector.bootstrap.get())
+                predictions = build_prediction_frame(self.predictor, df, state['gameweek'], players)
+                record['stages']['predict'] = round(time.perf_counter() - stage, 3)
+
+                stage = time.perf_counter()
+                top_players = rank_top_players(predictions, state['gameweek'])
+                record['stages']['rank'] = round(time.perf_counter() - stage, 3)
+
+                stage = time.perf_counter()
+                snapshot = PredictionSnapshot(
+                    predictions, top_players, state['gameweek'], state,
+                    self.predictor.model_version, os.path.basename(data_path),
+                )
+                snapshot.save(self.snapshot_path)
+                self._snapshot = snapshot
+                self._snapshot_mtime = os.path.getmtime(self.snapshot_path)
+                record['stages']['publish'] = round(time.perf_counter() - stage, 3)
+
+                record['status'] = 'ok'
+                self.last_error = None
+                logger.info(f"Published snapshot for gameweek {state['gameweek']} ({reason})")
+            except Exception as e:
+                record.update(status='error', error=str(e))
+                self.last_error = str(e)
+                logger.error(f"Scheduler run failed: {e}")
+
+        return self._finish(record, started)
+
+    def _finish(self, record: Dict[str, Any], started: float) -> Dict[str, Any]:
+        record['finished_at'] = datetime.now().isoformat()
+        record['duration_seconds'] = round(time.perf_counter() - started, 3)
+        self.runs.append(record)
+        observe_scheduler_run(record)
+        return record
+
+
+    def start(self) -> 'GameweekScheduler':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="gameweek-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def trigger(self) -> None:
+        """run the pipeline on the next loop iteration regardless of state"""
+        self._force = True
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            force, self._force = self._force, False
+            try:
+                self.check(force=force)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Scheduler check failed: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def status(self) -> Dict[str, Any]:
+        last_run = self.runs[-1] if self.runs else None
+        return {
+            'mode': 'follow' if self.follow else 'run',
+            'running': self._thread is not None and self._thread.is_alive(),
+            'busy': self._run_lock.locked(),
+            'poll_interval_seconds': self.poll_interval,
+            'last_check_at': self.last_check_at,
+            'last_state': self.last_state,
+            'last_error': self.last_error,
+            'last_run': last_run,
+            'snapshot': self._snapshot.summary() if self._snapshot is not None else None,
+        }
+
+    def history(self) -> List[Dict[str, Any]]:
+        return list(self.runs)
+
+
+def main():
+    """run the scheduler as a sidecar next to (or instead of) the service's own"""
+    from data_collector import FPLDataCollector
+    from fpl_predictor import FPLPredictor
+
+    parser = argparse.ArgumentParser(description="Precompute FPL predictions on gameweek transitions")
+    parser.add_argument("--once", action="store_true", help="check once and exit")
+    parser.add_argument("--force", action="store_true", help="run the pipeline even if nothing changed")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="seconds between checks")
+    args = parser.parse_args()
+
+    predictor = FPLPredictor()
+    if not predictor.load_model(mmap=True):
+        raise SystemExit("No trained model found. Run training first.")
+    scheduler = GameweekScheduler(FPLDataCollector(), predictor, poll_interval=args.interval)
+
+    if args.once:
+        record = scheduler.check(force=args.force)
+        print(record or "Snapshot is up to date")
+        return
+
+    if args.force:
+        scheduler.trigger()
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import pandas as pd
+import numpy as np
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Position mapping: 1=GK, 2=DEF, 3=MID, 4=FWD
+POSITIONS = [1, 2, 3, 4]
+
+# FPL rules: 15 players total (2 GK, 5 DEF, 5 MID, 3 FWD), max 3 per club
+SQUAD_QUOTAS = {1: 2, 2: 5, 3: 5, 4: 3}
+MAX_PER_CLUB = 3
+
+# starting XI counts per position for each formation
+FORMATIONS: Dict[str, Dict[int, int]] = {
+    "3-4-3": {1: 1, 2: 3, 3: 4, 4: 3},
+    "3-5-2": {1: 1, 2: 3, 3: 5, 4: 2},
+    "4-3-3": {1: 1, 2: 4, 3: 3, 4: 3},
+    "4-4-2": {1: 1, 2: 4, 3: 4, 4: 2},
+    "4-5-1": {1: 1, 2: 4, 3: 5, 4: 1},
+    "5-3-2": {1: 1, 2: 5, 3: 3, 4: 2},
+    "5-4-1": {1: 1, 2: 5, 3: 4, 4: 1},
+}
+
+# positions merged pairwise before the final budget split
+MERGE_GROUPS = [(1, 4), (2, 3)]
+
+# bench points count this much relative to starting XI points
+BENCH_WEIGHT = 0.1
+
+# prices are handled in integer tenths of a million
+PRICE_UNITS = 10
+
+
+class SquadOptimizer:
+    """exact squad + starting XI selection under budget, quota, formation and club limits
+
+    each position is solved as a cardinality-constrained knapsack (dp over
+    budget), positions are merged by max-plus convolution, and the per-club
+    limit is enforced by best-first branch-and-bound: when the relaxed optimum
+    has too many players from a club, one child per offending player excludes
+    that player. the first relaxed optimum popped that respects every club
+    limit is the exact optimum
+    """
+
+    def __init__(self, candidates: pd.DataFrame, budget: float, formation: str = "3-4-3",
+                 quotas: Optional[Dict[int, int]] = None, max_per_club: int = MAX_PER_CLUB,
+                 bench_weight: float = BENCH_WEIGHT, points_column: str = 'predicted_points',
+                 formations: Optional[Dict[str, Dict[int, int]]] = None):
+        formations = formations or FORMATIONS
+        self.quotas = quotas or SQUAD_QUOTAS
+        self.starting = formations.get(formation, formations.get("3-4-3"))
+        self.formation = formation if formation in formations else "3-4-3"
+        self.max_per_club = max_per_club
+        self.bench_weight = bench_weight
+
+        frame = candidates[['player_id', 'position', 'team', 'price', points_column]]
+        frame = frame[frame['position'].isin(POSITIONS)]
+        self.ids = frame['player_id'].to_numpy()
+        self.positions = frame['position'].to_numpy().astype(np.int64)
+        self.teams = frame['team'].to_numpy().astype(np.int64)
+        self.costs = np.round(frame['price'].to_numpy(dtype=np.float64) * PRICE_UNITS).astype(np.int64)
+        self.points = frame[points_column].to_numpy(dtype=np.float64)
+        self.nodes_explored = 0
+        # the dp tables are sized by the budget; beyond the dearest possible squad it never binds
+        self.budget_units = max(0, min(int(round(budget * PRICE_UNITS)), self._max_squad_cost()))
+
+    def _max_squad_cost(self) -> int:
+        """cost of the most expensive squad the quotas allow from these candidates"""
+        return int(sum(np.sort(self.costs[self.positions == position])[::-1][:quota].sum()
+                       for position, quota in self.quotas.items()))
+
+    # --- candidate pruning -------------------------------------------------
+
+    def prune_candidates(self, pool: np.ndarray) -> np.ndarray:
+        """drop players that can always be swapped for a cheaper, better one
+
+        q dominates p (same position) when q costs no more, scores no less and
+        ranks ahead on the (points desc, cost asc, index) tie-break. p can be
+        dropped without losing optimality when its dominators cover enough
+        distinct clubs that one of them is always free to take p's place
+        (quota - 1 may already be in the squad and at most 4 other clubs can
+        be full), or when enough of them share p's club
+        """
+        keep = []
+        for position in POSITIONS:
+            members = pool[self.positions[pool] == position]
+            if len(members) == 0:
+                continue
+            quota = self.quotas[position]
+            cost, pts, team = self.costs[members], self.points[members], self.teams[members]
+            order = np.lexsort((members, cost, -pts))
+            rank = np.empty(len(members), dtype=np.int64)
+            rank[order] = np.arange(len(members))
+
+            # dominates[q, p]
+            dominates = ((cost[:, None] <= cost[None, :])
+                         & (pts[:, None] >= pts[None, :])
+                         & (rank[:, None] < rank[None, :]))
+
+            clubs, club_idx = np.unique(team, return_inverse=True)
+            club_onehot = np.zeros((len(members), len(clubs)), dtype=np.int64)
+            club_onehot[np.arange(len(members)), club_idx] = 1
+            dominator_clubs = (dominates.T.astype(np.int64) @ club_onehot) > 0
+            distinct_clubs = dominator_clubs.sum(axis=1)
+            same_club = (dominates & (team[:, None] == team[None, :])).sum(axis=0)
+
+            # clubs that can be full among the other squad members
+            full_clubs = (sum(self.quotas.values()) - 1) // self.max_per_club
+            prunable = ((distinct_clubs >= quota + full_clubs)
+                        | (same_club >= min(quota, self.max_per_club)))
+            keep.append(members[~prunable])
+        return np.concatenate(keep) if keep else np.zeros(0, dtype=np.int64)
+
+    # --- relaxation (no club limit) -------------------------------------------
+
+    def _position_table(self, members: np.ndarray, position: int) -> Tuple[np.ndarray, np.ndarray]:
+        """best value for exactly quota players of one position at every budget
+
+        items are processed in descending points so the first `starting`
+        players taken form the starting XI and get full weight
+        """
+        quota = self.quotas[position]
+        starting = self.starting[position]
+        budget = self.budget_units
+        weights = np.where(np.arange(quota) < starting, 1.0, self.bench_weight)
+
+        order = members[np.lexsort((members, self.costs[members], -self.points[members]))]
+        dp = np.full((quota + 1, budget + 1), -np.inf)
+        dp[0, :] = 0.0
+        taken = np.zeros((len(order), quota, budget + 1), dtype=bool)
+
+        for i, idx in enumerate(order):
+            cost = int(self.costs[idx])
+            if cost > budget:
+                continue
+            candidate = dp[:-1, :budget + 1 - cost] + (self.points[idx] * weights)[:, None]
+            better = candidate > dp[1:, cost:]
+            dp[1:, cost:] = np.where(better, candidate, dp[1:, cost:])
+            taken[i, :, cost:] = better
+
+        return dp[quota], (order, taken)
+
+    @staticmethod
+    def _backtrack_position(trace, budget_units: int, quota: int, costs: np.ndarray) -> List[int]:
+        order, taken = trace
+        chosen = []
+        k, b = quota, budget_units
+        for i in range(len(order) - 1, -1, -1):
+            if k == 0:
+                break
+            if taken[i, k - 1, b]:
+                chosen.append(int(order[i]))
+                b -= int(costs[order[i]])
+                k -= 1
+        return chosen
+
+    @staticmethod
+    def _combine(left: np.ndarray, right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """max-plus convolution of two 'best value within budget b' tables
+
+        only the points where `right` improves need to be tried as its share
+        of the budget; returns the merged table and the budget given to right
+        """
+        size = len(left)
+        finite = np.isfinite(right)
+        improves = finite & np.concatenate(([True], right[1:] > right[:-1]))
+        shares = np.flatnonzero(improves)
+        if len(shares) == 0:
+            return np.full(size, -np.inf), np.zeros(size, dtype=np.int64)
+
+        b = np.arange(size)
+        rest = b[None, :] - shares[:, None]
+        valid = rest >= 0
+        values = np.where(valid, left[np.clip(rest, 0, None)], -np.inf) + right[shares][:, None]
+        best = np.argmax(values, axis=0)
+        return values[best, b], shares[best]
+
+    def _solve_relaxed(self, pool: np.ndarray, cache: Dict) -> Optional[Tuple[float, List[int]]]:
+        """optimal squad ignoring club limits, or None if infeasible
+
+        per-position tables and pairwise merges are cached by their member set,
+        so a branch that excludes one player only redoes its own position
+        """
+        tables, keys = {}, {}
+        for position in POSITIONS:
+            members = pool[self.positions[pool] == position]
+            keys[position] = (position, members.tobytes())
+            if keys[position] not in cache:
+                cache[keys[position]] = self._position_table(members, position)
+            tables[position] = cache[keys[position]]
+
+        merged = []
+        for first, second in MERGE_GROUPS:
+            merge_key = ('merge', keys[first], keys[second])
+            if merge_key not in cache:
+                cache[merge_key] = self._combine(tables[first][0], tables[second][0])
+            merged.append(cache[merge_key])
+
+        (table_a, shares_a), (table_b, shares_b) = merged
+        totals = table_a + table_b[::-1]
+        split = int(np.argmax(totals))
+        if not np.isfinite(totals[split]):
+            return None
+
+        chosen = []
+        for (first, second), shares, b in zip(MERGE_GROUPS, (shares_a, shares_b),
+                                              (split, self.budget_units - split)):
+            share = int(shares[b])
+            chosen += self._backtrack_position(tables[second][1], share, self.quotas[second], self.costs)
+            chosen += self._backtrack_position(tables[first][1], b - share, self.quotas[first], self.costs)
+
+        return float(totals[split]), chosen
+
+    # --- branch and bound -----------------------------------------------------
+
+    def solve(self, exclude: Iterable[int] = ()) -> Optional[Dict]:
+        """optimal 15-man squad and starting XI, or None if no legal squad exists"""
+        excluded_ids = set(exclude)
+        pool = np.flatnonzero(~np.isin(self.ids, list(excluded_ids))) if excluded_ids else np.arange(len(self.ids))
+        pool = self.prune_candidates(pool)
+
+        cache: Dict = {}
+        self.nodes_explored = 0
+        root = self._solve_relaxed(pool, cache)
+        if root is None:
+            return None
+
+        heap = [(-root[0], 0, frozenset(), root[1])]
+        seen = {frozenset()}
+        counter = 1
+        while heap:
+            neg_value, _, banned, chosen = heapq.heappop(heap)
+            self.nodes_explored += 1
+
+            teams = self.teams[chosen]
+            clubs, counts = np.unique(teams, return_counts=True)
+            over = clubs[counts > self.max_per_club]
+            if len(over) == 0:
+                return self._build_solution(chosen, -neg_value)
+
+            # every legal squad leaves out at least one of this club's picks
+            club = over[0]
+            for idx in [i for i in chosen if self.teams[i] == club]:
+                child = banned | {idx}
+                if child in seen:
+                    continue
+                seen.add(child)
+                child_pool = pool[~np.isin(pool, list(child))]
+                relaxed = self._solve_relaxed(child_pool, cache)
+                if relaxed is not None:
+                    heapq.heappush(heap, (-relaxed[0], counter, child, relaxed[1]))
+                    counter += 1
+
+        return None
+
+    def _build_solution(self, chosen: List[int], objective: float) -> Dict:
+        chosen = np.array(chosen)
+        starting_xi, bench = [], []
+        for position in self.quotas:
+            members = chosen[self.positions[chosen] == position]
+            members = members[np.lexsort((members, self.costs[members], -self.points[members]))]
+            starting_xi += members[:self.starting[position]].tolist()
+            bench += members[self.starting[position]:].tolist()
+
+        # bench goalkeeper first, then outfield players by predicted points
+        bench.sort(key=lambda i: (self.positions[i] != 1, -self.points[i]))
+
+        return {
+            'formation': self.formation,
+            'starting_xi': [int(self.ids[i]) for i in starting_xi],
+            'bench': [int(self.ids[i]) for i in bench],
+            'total_cost': float(self.costs[chosen].sum()) / PRICE_UNITS,
+            'starting_points': float(self.points[starting_xi].sum()),
+            'squad_points': float(self.points[chosen].sum()),
+            'objective': objective,
+            'nodes_explored': self.nodes_explored,
+        }
+
+
+def solve_squads(candidates: pd.DataFrame, jobs: List[Tuple[float, str, Tuple[int, ...]]]) -> List[Optional[Dict]]:
+    """solve several (budget, formation, exclude) variants against one candidate pool
+
+    module-level so it can run in a worker process
+    """
+    return [SquadOptimizer(candidates, budget, formation).solve(exclude) for budget, formation, exclude in jobs]
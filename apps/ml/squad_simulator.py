@@ -0,0 +1,320 @@
+import pandas as pd
+import numpy as np
+from itertools import permutations
+from typing import Dict, List, Optional, Tuple
+import logging
+from scipy.special import ndtr
+from squad_optimizer import POSITIONS, SQUAD_QUOTAS
+
+logger = logging.getLogger(__name__)
+
+# simulated gameweeks per squad
+DRAWS = 50000
+
+# loadings of each position on its club's (attacking, defensive) outcome:
+# goals lift a club's midfielders and forwards together, a clean sheet its
+# goalkeeper and defenders; the rest of each player's outcome is their own
+CLUB_LOADINGS = {1: (0.0, 0.6), 2: (0.15, 0.55), 3: (0.4, 0.1), 4: (0.45, 0.0)}
+
+# spread of points in a gameweek the player appears in, at least
+MIN_POINTS_SD = 1.0
+
+# chance of appearing for players without recent minutes in the frame
+DEFAULT_PLAY_PROBABILITY = 0.9
+
+# smallest starting XI counts fpl allows after automatic substitutions
+FORMATION_MINIMUMS = {2: 3, 3: 2, 4: 1}
+
+# quantile reported as a captain pick's upside
+UPSIDE_QUANTILE = 0.9
+
+# captains (and vice-captains) compared, by expected points
+CAPTAIN_CANDIDATES = 5
+
+# points either side of a prediction that count as it coming true
+CONFIDENCE_MARGIN = 2.0
+
+# a blank: at most the appearance points, i.e. no goal, assist, clean sheet or bonus
+BLANK_POINTS = 2
+
+SQUAD_SIZE = sum(SQUAD_QUOTAS.values())
+
+
+def outcome_parameters(players: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """chance of appearing plus lognormal parameters of points when appearing, per player
+
+    the expected points are the model's prediction; recent minutes give the
+    chance of appearing and the recent points spread is split, by the law of
+    total variance, into the part from not appearing (0 points) and the
+    spread when playing
+    """
+    mean = np.maximum(players['predicted_points'].to_numpy(dtype=np.float64), 0.1)
+    if 'minutes_avg_5' in players:
+        play = np.clip(players['minutes_avg_5'].to_numpy(dtype=np.float64) / 90, 0.05, 0.98)
+    else:
+        play = np.full(len(players), DEFAULT_PLAY_PROBABILITY)
+    mean_playing = mean / play
+    if 'points_std_5' in players:
+        variance = np.nan_to_num(players['points_std_5'].to_numpy(dtype=np.float64)) ** 2
+        variance_playing = (variance - play * (1 - play) * mean_playing ** 2) / play
+    else:
+        variance_playing = mean_playing
+    sd_playing = np.sqrt(np.maximum(variance_playing, MIN_POINTS_SD ** 2))
+
+    sigma2 = np.log1p(sd_playing ** 2 / mean_playing ** 2)
+    return {'play': play, 'mu': np.log(mean_playing) - sigma2 / 2, 'sigma': np.sqrt(sigma2)}
+
+
+def lognormal_cdf(x: np.ndarray, mu: np.ndarray, sigma: np.ndarray) -> np.ndarray:
+    """P(X <= x) for lognormal X; 0 for x <= 0"""
+    x = np.asarray(x, dtype=np.float64)
+    return np.where(x > 0, ndtr((np.log(np.maximum(x, 1e-12)) - mu) / sigma), 0.0)
+
+
+def outcome_confidence(players: pd.DataFrame, margin: float = CONFIDENCE_MARGIN) -> np.ndarray:
+    """chance each player's points land within margin of their prediction
+
+    read off the same per-player outcome the simulator samples from: 0 points
+    with probability 1 - play, else lognormal points, so players with a
+    nervy place in the side or a wide spread of returns get less confidence
+    """
+    params = outcome_parameters(players)
+    predicted = players['predicted_points'].to_numpy(dtype=np.float64)
+    low, high = predicted - margin, predicted + margin
+    playing = lognormal_cdf(high, params['mu'], params['sigma']) - lognormal_cdf(low, params['mu'], params['sigma'])
+    absent = ((low <= 0) & (high >= 0)).astype(np.float64)
+    return (1 - params['play']) * absent + params['play'] * playing
+
+
+def quantiles(values: np.ndarray, q) -> np.ndarray:
+    """np.quantile along the last axis (linear interpolation), by sorting
+
+    sorting the draws is several times faster here than numpy's partition
+    based quantile; the result has the quantiles on the first axis
+    """
+    ordered = np.sort(values, axis=-1)
+    position = np.asarray(q, dtype=np.float64) * (values.shape[-1] - 1)
+    below = np.floor(np.atleast_1d(position)).astype(np.int64)
+    above = np.minimum(below + 1, values.shape[-1] - 1)
+    low = np.moveaxis(np.take(ordered, below, axis=-1), -1, 0)
+    high = np.moveaxis(np.take(ordered, above, axis=-1), -1, 0)
+    weight = (np.atleast_1d(position) - below).reshape((-1,) + (1,) * (values.ndim - 1))
+    result = low + weight * (high - low)
+    return result if position.ndim else result[0]
+
+
+def default_lineup(positions: np.ndarray, means: np.ndarray) -> Tuple[List[int], List[int]]:
+    """best legal XI by expected points, and the bench: goalkeeper first, then by expected points"""
+    by_points = np.argsort(-means, kind='stable')
+    xi = [int(i) for i in by_points if positions[i] == 1][:1]
+    for position, minimum in FORMATION_MINIMUMS.items():
+        xi += [int(i) for i in by_points if positions[i] == position][:minimum]
+    xi += [int(i) for i in by_points if positions[i] != 1 and i not in xi][:11 - len(xi)]
+    bench = [int(i) for i in by_points if i not in xi]
+    bench.sort(key=lambda i: (positions[i] != 1, -means[i]))
+    return sorted(xi, key=lambda i: (positions[i], -means[i])), bench
+
+
+class SquadSimulator:
+    """monte carlo gameweeks for one squad, all draws at once
+
+    a player's outcome is a gaussian copula: club attacking and defensive
+    factors shared by teammates (weighted by CLUB_LOADINGS) plus their own
+    noise, mapped to lognormal points when they appear. appearances are
+    independent draws. the starting XI scores with fpl's automatic
+    substitutions (bench order, formation minimums) and the captain's points
+    doubled, falling back to the vice-captain when the captain doesn't play
+    """
+
+    def __init__(self, players: pd.DataFrame, draws: int = DRAWS, seed: int = 0):
+        """players: the squad's rows of a prediction frame (player_id, position, team, predicted_points)"""
+        if players['player_id'].nunique() != SQUAD_SIZE or len(players) != SQUAD_SIZE:
+            raise ValueError(f"A squad has {SQUAD_SIZE} distinct players")
+        counts = players['position'].value_counts()
+        if any(counts.get(position, 0) != SQUAD_QUOTAS[position] for position in POSITIONS):
+            raise ValueError("A squad has 2 goalkeepers, 5 defenders, 5 midfielders and 3 forwards")
+
+        self.ids = players['player_id'].to_numpy(dtype=np.int64)
+        self.positions = players['position'].to_numpy(dtype=np.int64)
+        self.teams = players['team'].to_numpy(dtype=np.int64)
+        self.means = players['predicted_points'].to_numpy(dtype=np.float64)
+        self.parameters = outcome_parameters(players)
+        self.draws = draws
+        self.points, self.played = self.sample(np.random.default_rng(seed))
+
+    def sample(self, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """(15, draws) points and appearance flags, one row per player"""
+        # one matrix maps independent normals (attack and defence per shared club,
+        # then one per player) to the correlated latent outcomes; a player with
+        # no teammates in the squad has all their weight on their own normal
+        _, club_index, club_size = np.unique(self.teams, return_inverse=True, return_counts=True)
+        shared = club_size[club_index] > 1
+        factor = np.cumsum(club_size > 1)[club_index] - 1
+        n_clubs = int((club_size > 1).sum())
+        weights = np.zeros((SQUAD_SIZE, 2 * n_clubs + SQUAD_SIZE), dtype=np.float32)
+        for player in range(SQUAD_SIZE):
+            attack, defence = CLUB_LOADINGS[self.positions[player]] if shared[player] else (0.0, 0.0)
+            if shared[player]:
+                weights[player, 2 * factor[player]:2 * factor[player] + 2] = attack, defence
+            weights[player, 2 * n_clubs + player] = np.sqrt(1 - attack ** 2 - defence ** 2)
+        z = weights @ rng.standard_normal((weights.shape[1], self.draws), dtype=np.float32)
+
+        played = rng.random((SQUAD_SIZE, self.draws), dtype=np.float32) < self.parameters['play'][:, None]
+        z *= self.parameters['sigma'].astype(np.float32)[:, None]
+        z += self.parameters['mu'].astype(np.float32)[:, None]
+        points = np.exp(z, out=z)
+        points *= played
+        return points, played
+
+    def _rows(self, player_ids: List[int]) -> List[int]:
+        row_of = {int(player_id): row for row, player_id in enumerate(self.ids)}
+        missing = [player_id for player_id in player_ids if int(player_id) not in row_of]
+        if missing:
+            raise ValueError(f"Players not in the squad: {missing}")
+        return [row_of[int(player_id)] for player_id in player_ids]
+
+    def substitutions(self, starters: List[int], bench: List[int]) -> np.ndarray:
+        """which bench players come on, for every pattern of appearances
+
+        row b of the (2 ** n, len(bench)) table is for the draws where bit i
+        of b says whether starters + bench player i appeared: absent starters
+        are replaced in XI order by the first bench player (in bench order)
+        who appeared and keeps the formation legal
+        """
+        players = starters + bench
+        patterns = np.arange(2 ** len(players))[:, None] >> np.arange(len(players)) & 1 == 1
+        counts = {position: np.full(len(patterns), sum(self.positions[i] == position for i in starters))
+                  for position in FORMATION_MINIMUMS}
+        on = np.zeros((len(patterns), len(bench)), dtype=bool)
+        for column, starter in enumerate(starters):
+            needed = ~patterns[:, column]
+            position = self.positions[starter]
+            for slot, substitute in enumerate(bench):
+                keeps_formation = (self.positions[substitute] == position
+                                   or counts[position] - 1 >= FORMATION_MINIMUMS[position])
+                comes_on = needed & ~on[:, slot] & patterns[:, len(starters) + slot] & keeps_formation
+                on[:, slot] |= comes_on
+                needed &= ~comes_on
+                if self.positions[substitute] != position:
+                    counts[position] = counts[position] - comes_on
+                    counts[self.positions[substitute]] = counts[self.positions[substitute]] + comes_on
+        return on
+
+    def lineup_points(self, xi: List[int], bench: List[int]) -> np.ndarray:
+        """points of the XI per draw after automatic substitutions, captaincy excluded
+
+        only a goalkeeper replaces a goalkeeper; outfield substitutions are
+        looked up by each draw's appearance pattern (see substitutions)
+        """
+        points, played = self.points, self.played
+        total = points[xi].sum(axis=0)
+
+        keeper = [i for i in xi if self.positions[i] == 1][0]
+        bench_keeper = [i for i in bench if self.positions[i] == 1][0]
+        total += np.where(played[keeper], 0, points[bench_keeper])
+
+        starters = [i for i in xi if self.positions[i] != 1]
+        outfield_bench = [i for i in bench if self.positions[i] != 1]
+        players = starters + outfield_bench
+        pattern = np.zeros(self.draws, dtype=np.int32)
+        for bit, player in enumerate(players):
+            pattern |= played[player].astype(np.int32) << bit
+        on = self.substitutions(starters, outfield_bench)
+        for slot, substitute in enumerate(outfield_bench):
+            total += np.where(on[pattern, slot], points[substitute], 0)
+        return total
+
+    def _best_vice(self, captain: int, candidates: List[int]) -> int:
+        """the candidate whose points add most on average when the captain doesn't play"""
+        others = [i for i in candidates if i != captain]
+        added = self.points[others] @ (~self.played[captain]).astype(np.float32)
+        return others[int(np.argmax(added))]
+
+    def captain_bonus(self, captain: int, vice: int) -> np.ndarray:
+        """extra points from the armband: the captain's, or the vice-captain's if the captain didn't play"""
+        return np.where(self.played[captain], self.points[captain], self.points[vice])
+
+    def summary(self, starting_xi: Optional[List[int]] = None, bench: Optional[List[int]] = None,
+                captain: Optional[int] = None, vice_captain: Optional[int] = None) -> Dict:
+        """squad points distribution, captaincy options, bench order values and player outcomes
+
+        starting_xi and bench are player ids (bench in substitution order);
+        without them the best XI by expected points is used. without a
+        captain the best pick by expected points is used for the distribution
+        """
+        if starting_xi is None or bench is None:
+            xi_rows, bench_rows = default_lineup(self.positions, self.means)
+        else:
+            xi_rows, bench_rows = self._rows(starting_xi), self._rows(bench)
+            if len(xi_rows) != 11 or sorted(xi_rows + bench_rows) != list(range(SQUAD_SIZE)):
+                raise ValueError("starting_xi and bench must split the squad into 11 starters and 4 substitutes")
+            formation = {position: sum(self.positions[i] == position for i in xi_rows) for position in POSITIONS}
+            if formation[1] != 1 or any(formation[p] < minimum for p, minimum in FORMATION_MINIMUMS.items()):
+                raise ValueError("starting_xi must have 1 goalkeeper, at least 3 defenders, 2 midfielders and 1 forward")
+
+        base = self.lineup_points(xi_rows, bench_rows)
+
+        # captaincy: each promising captain with the vice-captain who adds most when they miss out
+        candidates = sorted(xi_rows, key=lambda i: -self.points[i].mean())[:CAPTAIN_CANDIDATES]
+        options = []
+        for c in candidates:
+            v = self._best_vice(c, candidates)
+            total = base + self.captain_bonus(c, v)
+            options.append({'captain': int(self.ids[c]), 'vice_captain': int(self.ids[v]),
+                             'expected_points': float(total.mean()),
+                             'upside_points': float(quantiles(total, UPSIDE_QUANTILE))})
+        best_expected = max(options, key=lambda o: o['expected_points'])
+        best_upside = max(options, key=lambda o: o['upside_points'])
+
+        c, = self._rows([captain if captain is not None else best_expected['captain']])
+        if vice_captain is not None:
+            v, = self._rows([vice_captain])
+        else:
+            v = self._best_vice(c, candidates)
+        if c not in xi_rows or v not in xi_rows or c == v:
+            raise ValueError("captain and vice_captain must be two different starters")
+        total = base + self.captain_bonus(c, v)
+
+        # bench order: what each order of the outfield substitutes adds on average
+        keeper = [i for i in bench_rows if self.positions[i] == 1]
+        outfield = [i for i in bench_rows if self.positions[i] != 1]
+        xi_only = self.points[xi_rows].sum(axis=0).mean()
+        orders = sorted(({'bench': [int(self.ids[i]) for i in keeper + list(order)],
+                          'bench_points': float(self.lineup_points(xi_rows, keeper + list(order)).mean() - xi_only)}
+                         for order in permutations(outfield)), key=lambda o: -o['bench_points'])
+
+        levels = [0.05, 0.25, 0.5, 0.75, 0.95]
+        return {
+            'draws': self.draws,
+            'starting_xi': [int(self.ids[i]) for i in xi_rows],
+            'bench': [int(self.ids[i]) for i in bench_rows],
+            'captain': int(self.ids[c]),
+            'vice_captain': int(self.ids[v]),
+            'squad_points': {
+                'mean': float(total.mean()),
+                'std': float(total.std()),
+                'quantiles': dict(zip([str(q) for q in levels], quantiles(total, levels).tolist())),
+            },
+            'captaincy': {
+                'best_expected': best_expected,
+                'best_upside': best_upside,
+                'options': sorted(options, key=lambda o: -o['expected_points']),
+            },
+            'bench_orders': orders,
+            'players': self.player_outcomes(),
+        }
+
+    def player_outcomes(self) -> List[Dict]:
+        """per-player mean, spread, 10th/90th percentiles and chances of appearing and blanking (BLANK_POINTS or fewer)"""
+        low, high = quantiles(self.points, [0.1, 0.9])
+        return [{
+            'player_id': int(player_id),
+            'mean': float(mean),
+            'std': float(std),
+            'p10': float(p10),
+            'p90': float(p90),
+            'play_probability': float(play),
+            'blank_probability': float(blank),
+        } for player_id, mean, std, p10, p90, play, blank in zip(
+            self.ids, self.points.mean(axis=1), self.points.std(axis=1), low, high,
+            self.played.mean(axis=1), (self.points <= BLANK_POINTS).mean(axis=1))]
@@ -0,0 +1,169 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import logging
+from data_collector import HISTORICAL_SCHEMA, apply_schema
+
+# configure logging for data generation
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GAMEWEEKS_PER_SEASON = 38
+TEAMS = 20
+
+# share of the player pool per position (GK, DEF, MID, FWD)
+POSITION_SHARES = {1: 0.10, 2: 0.33, 3: 0.40, 4: 0.17}
+
+# fpl scoring per position
+GOAL_POINTS = {1: 10, 2: 6, 3: 5, 4: 4}
+CLEAN_SHEET_POINTS = {1: 4, 2: 4, 3: 1, 4: 0}
+
+# expected goals / assists per 90 minutes for a top player at each position
+XG_PER_90 = {1: 0.0, 2: 0.12, 3: 0.35, 4: 0.7}
+XA_PER_90 = {1: 0.02, 2: 0.12, 3: 0.3, 4: 0.25}
+
+
+def synthetic_history(seasons: int = 1, players: int = 700, gameweeks: int = GAMEWEEKS_PER_SEASON,
+                      seed: int = 0) -> pd.DataFrame:
+    """player-gameweek history with the columns and dtypes of data/fpl_historical_data_*
+
+    every player has a hidden quality that drives minutes, goal involvement,
+    price and ownership; points follow fpl scoring rules. seasons are laid
+    end to end with continuous gameweek numbers, the same way the stored
+    history grows. rows are ordered by gameweek, then player
+    """
+    rng = np.random.default_rng(seed)
+    n_gw = seasons * gameweeks
+    shape = (n_gw, players)
+
+    player_ids = np.arange(1, players + 1)
+    positions = rng.choice(list(POSITION_SHARES), size=players, p=list(POSITION_SHARES.values()))
+    teams = rng.integers(1, TEAMS + 1, size=players)
+    quality = rng.beta(2.0, 5.0, size=players)
+
+    # minutes: regulars play most weeks, fringe players come off the bench or not at all
+    plays = rng.random(shape) < 0.25 + 0.7 * quality
+    full = rng.random(shape) < 0.3 + 0.65 * quality
+    minutes = np.where(plays, np.where(full, rng.integers(60, 91, shape), rng.integers(1, 60, shape)), 0)
+    share = minutes / 90.0
+
+    xg_rate = np.vectorize(XG_PER_90.get)(positions) * quality * 2
+    xa_rate = np.vectorize(XA_PER_90.get)(positions) * quality * 2
+    expected_goals = rng.gamma(2.0, xg_rate / 2.0 + 1e-9, shape) * share
+    expected_assists = rng.gamma(2.0, xa_rate / 2.0 + 1e-9, shape) * share
+    goals = rng.poisson(expected_goals)
+    assists = rng.poisson(expected_assists)
+
+    # goals conceded are shared by a team's players in a gameweek
+    team_xgc = rng.gamma(4.0, 0.35, (n_gw, TEAMS + 1))
+    team_conceded = rng.poisson(team_xgc)
+    conceded = np.where(plays, team_conceded[:, teams], 0)
+    expected_conceded = np.where(plays, team_xgc[:, teams] * share, 0.0)
+    clean_sheets = (minutes >= 60) & (conceded == 0) & (positions != 4)
+
+    saves = np.where((positions == 1) & plays, rng.poisson(2.5, shape), 0)
+    yellow = plays & (rng.random(shape) < 0.08)
+    red = plays & (rng.random(shape) < 0.003)
+    own_goals = plays & (rng.random(shape) < 0.002)
+    penalties_missed = plays & (rng.random(shape) < 0.002)
+    penalties_saved = (positions == 1) & plays & (rng.random(shape) < 0.01)
+    bonus = np.where(plays, np.minimum(3, rng.poisson(0.6 * goals + 0.4 * assists + 0.1 * clean_sheets)), 0)
+
+    goal_points = np.vectorize(GOAL_POINTS.get)(positions)
+    clean_sheet_points = np.vectorize(CLEAN_SHEET_POINTS.get)(positions)
+    defends = positions <= 2
+    points = (
+        np.where(minutes >= 60, 2, np.where(plays, 1, 0))
+        + goals * goal_points + assists * 3 + clean_sheets * clean_sheet_points
+        - np.where(defends, conceded // 2, 0) + saves // 3 + penalties_saved * 5
+        + bonus - yellow - red * 3 - own_goals * 2 - penalties_missed * 2
+    )
+    bps = np.maximum(0, points * 3 + np.where(plays, rng.integers(0, 12, shape), 0))
+
+    influence = np.round(np.where(plays, points * 4.0 + rng.gamma(2.0, 3.0, shape), 0.0), 1)
+    creativity = np.round(np.where(plays, expected_assists * 60 + rng.gamma(1.5, 4.0, shape) * share, 0.0), 1)
+    threat = np.round(np.where(plays, expected_goals * 80 + rng.gamma(1.5, 4.0, shape) * share, 0.0), 1)
+    ict_index = np.round((influence + creativity + threat) / 10.0, 1)
+
+    # prices drift by 0.1 steps around a quality-driven start, never below 3.9
+    start_price = 4.0 + np.round(quality * 9.0 + (positions == 4) * 1.0 + (positions == 3) * 0.5, 1)
+    drift = np.cumsum(rng.choice([-0.1, 0.0, 0.1], size=shape, p=[0.1, 0.8, 0.1]), axis=0)
+    price = np.round(np.maximum(3.9, start_price + drift), 1)
+
+    ownership = np.clip(quality ** 2 * 60 * rng.lognormal(0.0, 0.3, shape), 0.1, 80.0)
+    selected_by_percent = np.round(ownership, 1)
+    transfers_in = rng.poisson(ownership * 15000)
+    transfers_out = rng.poisson(ownership * 14000)
+
+    # value columns from a five-gameweek trailing average and the running total
+    form = pd.DataFrame(points).rolling(5, min_periods=1).mean().to_numpy()
+    season_index = np.arange(n_gw) // gameweeks
+    season_points = pd.DataFrame(points).groupby(season_index).cumsum().to_numpy()
+    value_form = np.round(form / price, 1)
+    value_season = np.round(season_points / price, 1)
+
+    difficulty = rng.integers(2, 6, (n_gw, TEAMS + 1))
+    home = rng.random((n_gw, TEAMS + 1)) < 0.5
+
+    gameweek = np.repeat(np.arange(1, n_gw + 1), players)
+    columns = {
+        'player_id': np.tile(player_ids, n_gw),
+        'gameweek': gameweek,
+        'points': points,
+        'minutes': minutes,
+        'goals_scored': goals,
+        'assists': assists,
+        'clean_sheets': clean_sheets.astype(int),
+        'goals_conceded': conceded,
+        'own_goals': own_goals.astype(int),
+        'penalties_saved': penalties_saved.astype(int),
+        'penalties_missed': penalties_missed.astype(int),
+        'yellow_cards': yellow.astype(int),
+        'red_cards': red.astype(int),
+        'saves': saves,
+        'bonus': bonus,
+        'bps': bps,
+        'influence': influence,
+        'creativity': creativity,
+        'threat': threat,
+        'ict_index': ict_index,
+        'starts': (minutes >= 60).astype(int),
+        'expected_goals': np.round(expected_goals, 2),
+        'expected_assists': np.round(expected_assists, 2),
+        'expected_goal_involvements': np.round(expected_goals + expected_assists, 2),
+        'expected_goals_conceded': np.round(expected_conceded, 2),
+        'name': np.tile(np.array([f"Player {i}" for i in player_ids]), n_gw),
+        'position': np.tile(positions, n_gw),
+        'team': np.tile(teams, n_gw),
+        'price': price,
+        'selected_by_percent': selected_by_percent,
+        'transfers_in': transfers_in,
+        'transfers_out': transfers_out,
+        'value_form': value_form,
+        'value_season': value_season,
+        'fixture_difficulty': difficulty[:, teams],
+        'is_home': home[:, teams],
+    }
+    frame = pd.DataFrame({name: np.ravel(values) for name, values in columns.items()})
+    return apply_schema(frame[list(HISTORICAL_SCHEMA)])
+
+
+def main():
+    """write a synthetic history file (outside data/ so it is never picked up as collected data)"""
+    parser = argparse.ArgumentParser(description="Generate synthetic FPL history")
+    parser.add_argument("--seasons", type=int, default=1)
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="csv path (default: synthetic/fpl_historical_data_<seasons>x<players>.csv)")
+    args = parser.parse_args()
+    args.output = args.output or os.path.join("synthetic", f"fpl_historical_data_{args.seasons}x{args.players}.csv")
+
+    df = synthetic_history(args.seasons, args.players, seed=args.seed)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    df.to_csv(args.output, index=False)
+    logger.info(f"Wrote {len(df)} rows ({args.seasons} seasons, {args.players} players) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import pytest
+import requests
+from data_collector import FPLDataCollector, previous_season
+from mock_fpl_api import MockFPLData, MockFPLServer
+
+STORED_FILE = "fpl_historical_data_stored.csv"
+
+
+@pytest.fixture
+def server(history):
+    with MockFPLServer(MockFPLData(history)) as server:
+        yield server
+
+
+@pytest.fixture
+def collector(server, tmp_path, monkeypatch):
+    """a collector writing under a temporary data/, without retries so failures surface at once"""
+    monkeypatch.chdir(tmp_path)
+    return FPLDataCollector(storage_format='csv', base_url=server.base_url, max_retries=0)
+
+
+def test_failed_fetch_leaves_flat_file_untouched(history, server, collector):
+    """a failed gameweek leaves the stored file and capture records as they were; a later run recovers"""
+    last = int(history['gameweek'].max())
+    # no capture record, so the stored newest gameweek counts as provisional and is fetched again
+    path = collector.save_data(history[history['gameweek'] < last], STORED_FILE)
+    with open(path, 'rb') as f:
+        stored = f.read()
+
+    server.failing.add(f"/event/{last}/live/")
+    with pytest.raises((RuntimeError, requests.RequestException)):
+        collector.collect_incremental()
+    with open(path, 'rb') as f:
+        assert f.read() == stored
+    assert not collector.load_manifest()
+
+    server.failing.clear()
+    collected, _ = collector.collect_incremental()
+    assert sorted(collected['gameweek'].unique().tolist()) == sorted(history['gameweek'].unique().tolist())
+
+
+def test_failed_fetch_leaves_partitions_untouched(history, server, collector):
+    """the same for an existing partitioned dataset, starting from provisional partitions"""
+    last = int(history['gameweek'].max())
+    collector.save_data(history[history['gameweek'] < last], STORED_FILE)
+    collector.partition_data_file(STORED_FILE)
+    partitions = {p['path']: os.path.getmtime(p['path']) for p in collector.list_partitions()}
+
+    server.failing.add(f"/event/{last - 1}/live/")
+    with pytest.raises((RuntimeError, requests.RequestException)):
+        collector.collect_incremental()
+    assert {p['path']: os.path.getmtime(p['path']) for p in collector.list_partitions()} == partitions
+    assert not collector.load_manifest()
+
+    server.failing.clear()
+    collected, _ = collector.collect_incremental()
+    assert collected['gameweek'].nunique() == history['gameweek'].nunique()
+
+
+def test_season_rollover(history, server, collector):
+    """a flat file from last season is partitioned as that season and the new season collected from gameweek 1"""
+    server.data.set_frame(history[history['gameweek'] <= 2])
+    collector.save_data(history, STORED_FILE)
+    season = collector.current_season()
+
+    collected, _ = collector.collect_incremental()
+    assert sorted(collected['gameweek'].unique().tolist()) == [1, 2]
+    assert len(collector.load_dataset(seasons=[previous_season(season)])) == len(history)
+    assert collector.dataset_seasons() == [previous_season(season), season]
@@ -0,0 +1,40 @@
+import numpy as np
+from benchmarks import legacy_time_features
+from feature_engine import PlayerFeatureState, compute_time_features, time_feature_columns
+
+
+def assert_features_match(expected, actual, atol: float = 1e-9) -> None:
+    for col in time_feature_columns():
+        exp = expected[col].to_numpy(dtype=np.float64)
+        act = actual[col].to_numpy(dtype=np.float64)
+        assert np.array_equal(np.isnan(exp), np.isnan(act)), f"NaN pattern differs for {col}"
+        mask = ~np.isnan(exp)
+        np.testing.assert_allclose(act[mask], exp[mask], rtol=0, atol=atol, err_msg=col)
+
+
+def test_time_features_match_legacy(history):
+    """the vectorized engine gives the legacy groupby/rolling output, column by column"""
+    expected = legacy_time_features(history)
+    actual = compute_time_features(history, np.float64)
+
+    assert expected.index.equals(actual.index)
+    assert list(expected.columns) == list(actual.columns)
+    assert_features_match(expected, actual)
+
+
+def test_feature_state_matches_recompute(history):
+    """incremental state for the latest gameweek, including a replaced provisional gameweek, equals a full recompute"""
+    gameweek = int(history['gameweek'].max())
+    expected = compute_time_features(history, np.float64)
+    expected = expected[expected['gameweek'] == gameweek].reset_index(drop=True)
+
+    # apply a provisional copy of the last gameweek first so the replace path is exercised
+    state = PlayerFeatureState.from_history(history[history['gameweek'] < gameweek])
+    provisional = history[history['gameweek'] == gameweek].copy()
+    provisional['points'] = provisional['points'] + 3
+    state.update(provisional, gameweek)
+    state.sync(history)
+    actual = state.feature_frame(gameweek, np.float64)
+
+    assert expected['player_id'].equals(actual['player_id'])
+    assert_features_match(expected, actual)
@@ -0,0 +1,39 @@
+import tempfile
+import numpy as np
+import pandas as pd
+from benchmarks import model_inputs
+from forest_store import ForestArrays, export_forest
+from fpl_predictor import FPLPredictor
+
+
+def boundary_inputs(forest: ForestArrays, X: pd.DataFrame, samples: int = 2000, seed: int = 0) -> np.ndarray:
+    """rows whose split feature sits exactly on, and one ulp above, a folded threshold"""
+    rng = np.random.default_rng(seed)
+    internal = np.flatnonzero(np.asarray(forest.arrays['children'])[0::2] != np.arange(forest.meta['n_nodes']))
+    nodes = rng.choice(internal, size=min(samples, len(internal)), replace=False)
+    base = X.to_numpy(dtype=np.float64)[rng.integers(0, len(X), size=len(nodes))]
+    thresholds = np.asarray(forest.arrays['threshold'])[nodes]
+    features = np.asarray(forest.arrays['feature'])[nodes].astype(np.int64)
+
+    on, above = base.copy(), base.copy()
+    on[np.arange(len(nodes)), features] = thresholds
+    above[np.arange(len(nodes)), features] = np.nextafter(thresholds, np.inf)
+    return np.vstack([on, above])
+
+
+def test_compiled_forest_matches_sklearn(model_dir, history):
+    """compiled forest (scaler folded in) against scaler + sklearn predict
+
+    covers every history row plus rows placed exactly on folded thresholds,
+    where a wrong fold would send them down the other branch
+    """
+    predictor = FPLPredictor()
+    assert predictor.load_model(model_dir)
+    X = model_inputs(predictor, history)
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        export_forest(predictor.model, export_dir, scaler=predictor.scaler)
+        forest = ForestArrays.load(export_dir)
+        inputs = np.vstack([X.to_numpy(dtype=np.float64), boundary_inputs(forest, X)])
+        expected = predictor.model.predict(predictor.scaler.transform(pd.DataFrame(inputs, columns=X.columns)))
+        np.testing.assert_allclose(forest.predict(inputs), expected, rtol=0, atol=1e-9)
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from data_collector import apply_schema
+from fpl_predictor import FPLPredictor, MODEL_PARAMS
+
+
+def test_compact_dtypes_keep_predictions(shipped_history):
+    """training and predicting on the compact schema gives the default-dtype predictions
+
+    the forest casts its inputs to float32 either way, so only values that
+    round differently in float32 before scaling can move a sample across a
+    split. on the shipped csv the mean shift stays within 0.05 points, the
+    99th percentile within 0.15 and no player moves by half of the one-point
+    resolution fpl scores in
+    """
+    gameweek = int(shipped_history['gameweek'].max())
+    predictions = {}
+    for compact in (False, True):
+        predictor = FPLPredictor()
+        predictor.model_params = {**MODEL_PARAMS, 'n_estimators': 50}
+        if not compact:
+            predictor.feature_dtype = np.float64
+        frame = apply_schema(shipped_history) if compact else shipped_history
+        predictor.train_model(frame, 1)
+        predicted = predictor.predict_next_gameweek(frame, gameweek).sort_values('player_id')
+        predictions[compact] = predicted['predicted_points'].to_numpy(dtype=np.float64)
+
+    diff = np.abs(predictions[True] - predictions[False])
+    assert diff.mean() <= 0.05
+    assert np.percentile(diff, 99) <= 0.15
+    assert diff.max() <= 0.5
+
+
+def test_concurrent_predictions_share_state_safely(model_dir, history):
+    """threads predicting different gameweeks on one predictor each get the single-threaded result"""
+    gameweeks = [int(history['gameweek'].max()), int(history['gameweek'].max()) - 1]
+    expected = {}
+    for gameweek in gameweeks:
+        predictor = FPLPredictor()
+        predictor.load_model(model_dir)
+        expected[gameweek] = predictor.predict_next_gameweek(history, gameweek)
+
+    shared = FPLPredictor()
+    shared.load_model(model_dir)
+    # alternating gameweeks rebuild the rolling state, the most invasive path
+    jobs = [gameweeks[i % 2] for i in range(40)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda gameweek: shared.predict_next_gameweek(history, gameweek), jobs))
+    for gameweek, result in zip(jobs, results):
+        pd.testing.assert_frame_equal(result, expected[gameweek])
@@ -0,0 +1,19 @@
+from benchmarks import (_FramePredictor, assembly_inputs, legacy_enrich, legacy_player_lookup, legacy_records,
+                        legacy_select_team, legacy_top_players)
+from main import prediction_records, select_team_by_formation
+from prediction_frame import build_prediction_frame, player_lookup, rank_top_players
+
+
+def test_vectorized_responses_match_legacy():
+    """vectorized enrichment, ranking, records and selection give the legacy payloads"""
+    frame, bootstrap = assembly_inputs(700)
+    legacy = legacy_enrich(frame, legacy_player_lookup(bootstrap))
+    enriched = build_prediction_frame(_FramePredictor(frame), None, 0, player_lookup(bootstrap))
+    for column in ('name', 'team_name', 'current_position'):
+        assert legacy[column].tolist() == enriched[column].tolist(), column
+
+    assert legacy_top_players(legacy) == rank_top_players(enriched, 0)['top_players_by_position']
+    assert [p.model_dump() for p in legacy_records(legacy)] == prediction_records(enriched)
+
+    legacy_squad = [p.model_dump() for p in legacy_select_team(legacy, "3-4-3", 100.0)]
+    assert legacy_squad == prediction_records(select_team_by_formation(enriched, "3-4-3", 100.0))
@@ -0,0 +1,74 @@
+import itertools
+from typing import Dict
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks import squad_candidates
+from squad_optimizer import FORMATIONS, MAX_PER_CLUB, SQUAD_QUOTAS, SquadOptimizer
+
+
+def brute_force_squad(candidates: pd.DataFrame, budget: float, quotas: Dict[int, int],
+                      starting: Dict[int, int], max_per_club: int, bench_weight: float) -> float:
+    """best objective by enumerating every squad; only usable on tiny pools"""
+    positions = candidates['position'].to_numpy()
+    teams = candidates['team'].to_numpy()
+    costs = np.round(candidates['price'].to_numpy() * 10).astype(np.int64)
+    points = candidates['predicted_points'].to_numpy()
+    by_position = {p: np.flatnonzero(positions == p).tolist() for p in quotas}
+    best = None
+    for combo in itertools.product(*[itertools.combinations(by_position[p], quotas[p]) for p in quotas]):
+        squad = [i for group in combo for i in group]
+        if costs[squad].sum() > round(budget * 10) or np.bincount(teams[squad]).max() > max_per_club:
+            continue
+        value = 0.0
+        for position, group in zip(quotas, combo):
+            pts = np.sort(points[list(group)])[::-1]
+            count = starting[position]
+            value += pts[:count].sum() + bench_weight * pts[count:].sum()
+        best = value if best is None else max(best, value)
+    return best
+
+
+@pytest.mark.parametrize("trial", range(30))
+def test_matches_brute_force(trial):
+    """the optimizer's objective equals exhaustive search on small random pools"""
+    rng = np.random.default_rng([0, trial])
+    quotas = {1: 1, 2: 2, 3: 2, 4: 1}
+    formations = {'mini': {1: 1, 2: 1, 3: 1, 4: 1}}
+    n = 24
+    candidates = pd.DataFrame({
+        'player_id': np.arange(n),
+        'position': rng.integers(1, 5, n),
+        'team': rng.integers(1, 4, n),
+        'price': rng.integers(40, 80, n) / 10,
+        'predicted_points': rng.integers(0, 10, n).astype(float),
+    })
+    budget = float(rng.integers(30, 45))
+    optimizer = SquadOptimizer(candidates, budget, 'mini', quotas=quotas, max_per_club=2, formations=formations)
+    solution = optimizer.solve()
+    expected = brute_force_squad(candidates, budget, quotas, formations['mini'], 2, optimizer.bench_weight)
+    if expected is None:
+        assert solution is None
+    else:
+        assert solution['objective'] == pytest.approx(expected, abs=1e-9)
+
+
+def test_budget_beyond_dearest_squad_is_clamped(history):
+    """a huge budget sizes the tables by the dearest possible squad and picks the same squad"""
+    latest = history[history['gameweek'] == history['gameweek'].max()]
+    candidates = latest.assign(predicted_points=latest['points'].astype(np.float64))
+    huge = SquadOptimizer(candidates, 1e6)
+    dearest = huge.budget_units / 10
+    assert huge.budget_units < 10 ** 4
+    assert huge.solve()['starting_xi'] == SquadOptimizer(candidates, dearest).solve()['starting_xi']
+
+
+@pytest.mark.parametrize("formation", list(FORMATIONS))
+def test_full_pool_squads_are_legal(history, formation):
+    """every formation gives a squad within budget and club limits from a full player pool"""
+    candidates = squad_candidates(history)
+    solution = SquadOptimizer(candidates, 100.0, formation).solve()
+    chosen = candidates.set_index('player_id').loc[solution['starting_xi'] + solution['bench']]
+    assert len(chosen) == sum(SQUAD_QUOTAS.values())
+    assert chosen['team'].value_counts().max() <= MAX_PER_CLUB
+    assert round(chosen['price'].sum() * 10) <= 1000
@@ -0,0 +1,82 @@
+import itertools
+from typing import List
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks import simulation_squads
+from squad_simulator import (CONFIDENCE_MARGIN, FORMATION_MINIMUMS, SquadSimulator, default_lineup,
+                             outcome_confidence, outcome_parameters)
+
+
+def legacy_lineup_points(simulator: SquadSimulator, xi: List[int], bench: List[int], draws: int) -> np.ndarray:
+    """fpl automatic substitutions one draw at a time"""
+    positions = simulator.positions
+    totals = np.zeros(draws)
+    for d in range(draws):
+        played = simulator.played[:, d]
+        lineup = list(xi)
+        for starter in xi:
+            if played[starter]:
+                continue
+            for substitute in bench:
+                if substitute in lineup or not played[substitute]:
+                    continue
+                if (positions[starter] == 1) != (positions[substitute] == 1):
+                    continue
+                counts = {p: sum(positions[i] == p for i in lineup if i != starter) for p in FORMATION_MINIMUMS}
+                if positions[substitute] != 1:
+                    counts[positions[substitute]] += 1
+                if all(counts[p] >= minimum for p, minimum in FORMATION_MINIMUMS.items()):
+                    lineup[lineup.index(starter)] = substitute
+                    break
+        totals[d] = sum(float(simulator.points[i, d]) for i in lineup if played[i])
+    return totals
+
+
+@pytest.fixture(scope="module")
+def simulators():
+    return [SquadSimulator(players, draws=20000, seed=trial) for trial, players in enumerate(simulation_squads(6))]
+
+
+def test_substitutions_match_per_draw_loop(simulators):
+    """vectorized automatic substitutions equal a per-draw loop for every order of the outfield bench"""
+    for simulator in simulators:
+        xi, bench = default_lineup(simulator.positions, simulator.means)
+        for order in itertools.permutations(bench[1:]):
+            lineup = [bench[0]] + list(order)
+            expected = legacy_lineup_points(simulator, xi, lineup, 500)
+            np.testing.assert_allclose(simulator.lineup_points(xi, lineup)[:500], expected, atol=1e-3,
+                                       err_msg=f"bench {lineup}")
+
+
+def test_means_match_predictions(simulators):
+    """each player's simulated mean is within 5% of the prediction it was built from"""
+    for simulator in simulators:
+        predicted = np.maximum(simulator.means, 0.1)
+        error = np.abs(simulator.points.mean(axis=1) - predicted) / predicted
+        assert error.max() <= 0.05
+
+
+def test_teammates_are_correlated(simulators):
+    """players from the same club share the club's outcome"""
+    correlations = []
+    for simulator in simulators:
+        for i, j in itertools.combinations(range(len(simulator.positions)), 2):
+            both = simulator.played[i] & simulator.played[j]
+            if simulator.teams[i] == simulator.teams[j] and both.sum() > 100:
+                correlations.append(np.corrcoef(np.log(simulator.points[i][both]),
+                                                np.log(simulator.points[j][both]))[0, 1])
+    assert correlations and np.mean(correlations) > 0
+
+
+def test_confidence_matches_sampled_outcomes():
+    """the closed-form confidence equals the share of sampled outcomes within the margin of the prediction"""
+    players = pd.DataFrame({'predicted_points': [1.0, 4.0, 9.0], 'minutes_avg_5': [30.0, 85.0, 90.0],
+                            'points_std_5': [1.5, 3.0, 5.0]})
+    params = outcome_parameters(players)
+    rng = np.random.default_rng(0)
+    draws = 400000
+    played = rng.random((len(players), draws)) < params['play'][:, None]
+    points = np.where(played, rng.lognormal(params['mu'][:, None], params['sigma'][:, None], (len(players), draws)), 0)
+    sampled = (np.abs(points - players['predicted_points'].to_numpy()[:, None]) <= CONFIDENCE_MARGIN).mean(axis=1)
+    np.testing.assert_allclose(outcome_confidence(players), sampled, atol=0.005)
@@ -0,0 +1,44 @@
+from typing import List
+import numpy as np
+import pytest
+from benchmarks import planner_league
+from transfer_planner import TransferPlanner, per_gameweek_points
+
+
+def best_single_transfer(planner: TransferPlanner, squad: List[int], bank: float) -> float:
+    """exact best one-gameweek value with at most one transfer, by trying every legal swap"""
+    rows = planner._squad_rows(squad)
+    planner.points = planner.all_points
+    squads = [rows]
+    counts = np.bincount(planner.all_teams[rows], minlength=planner.all_teams.max() + 1)
+    for slot, out in enumerate(rows):
+        for row in np.flatnonzero(planner.all_positions == planner.all_positions[out]):
+            team = planner.all_teams[row]
+            if (row in rows or planner.all_costs[row] > round(bank * 10) + planner.all_costs[out]
+                    or counts[team] - (team == planner.all_teams[out]) >= 3):
+                continue
+            squad_rows = rows.copy()
+            squad_rows[slot] = row
+            squads.append(squad_rows)
+    return float(planner.lineup_points(np.stack(squads), 0)[:, 0].max())
+
+
+@pytest.mark.parametrize("trial", range(20))
+def test_single_transfer_matches_exhaustive(trial):
+    """the planner's one-gameweek, one-transfer plan matches exhaustive search despite its pruning"""
+    candidates, points, squad = planner_league(300, 2, seed=trial)
+    # the squad was picked on last week's points, so this week has something to fix
+    bank = [0.0, 0.5, 1.5, 3.0][trial % 4]
+    expected = best_single_transfer(TransferPlanner(candidates, points[:, :1], max_transfers=1), squad, bank)
+    actual = TransferPlanner(candidates, points[:, :1], max_transfers=1).plan(squad, bank)['expected_points']
+    assert actual == pytest.approx(expected, abs=1e-9)
+
+
+def test_per_gameweek_points_are_never_negative():
+    """a longer horizon predicting less than a shorter one gives that stretch zero points, not negative"""
+    cumulative = {1: np.array([5.0, 2.0, -0.5]), 3: np.array([4.0, 7.0, 1.0])}
+    points = per_gameweek_points(cumulative, 5)
+    assert (points >= 0).all()
+    np.testing.assert_allclose(points[0], [5.0, 0.0, 0.0, 0.0, 0.0])
+    np.testing.assert_allclose(points[1], [2.0, 2.5, 2.5, 2.5, 2.5])
+    np.testing.assert_allclose(points[2], [0.0, 0.5, 0.5, 0.5, 0.5])
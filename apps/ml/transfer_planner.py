@@ -0,0 +1,345 @@
+import pandas as pd
+import numpy as np
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+from squad_optimizer import POSITIONS, SQUAD_QUOTAS, MAX_PER_CLUB, PRICE_UNITS
+
+logger = logging.getLogger(__name__)
+
+# points deducted for every transfer beyond the free ones
+HIT_COST = 4
+
+# free transfers can be banked up to this many
+MAX_FREE_TRANSFERS = 5
+
+# squads kept per gameweek, and the wall-clock budget for a whole plan;
+# once the budget is spent the remaining gameweeks only roll transfers
+BEAM_WIDTH = 40
+TIME_BUDGET = 1.0
+
+# moves per squad that are scored exactly, after ranking by estimated gain
+MAX_SINGLE_MOVES = 120
+MAX_DOUBLE_MOVES = 30
+
+# replacements considered per squad slot: the best by remaining points that
+# are affordable now, the best a second sale could fund, and the best cheaper
+# ones (downgrades that fund an upgrade elsewhere)
+UPGRADES_PER_SLOT = 8
+DOWNGRADES_PER_SLOT = 4
+
+# a player dominated (no more points for no less money, same position) by at
+# least this many others never enters the candidate pool
+DOMINANCE_DEPTH = MAX_PER_CLUB + 1
+
+# squad slots per position: 2 GK, 5 DEF, 5 MID, 3 FWD in that order
+SLOTS: Dict[int, slice] = {}
+_start = 0
+for _position in POSITIONS:
+    SLOTS[_position] = slice(_start, _start + SQUAD_QUOTAS[_position])
+    _start += SQUAD_QUOTAS[_position]
+SQUAD_SIZE = _start
+
+
+def per_gameweek_points(cumulative: Dict[int, np.ndarray], gameweeks: int) -> np.ndarray:
+    """expected points in each of the next gameweeks from cumulative horizon predictions
+
+    cumulative maps a horizon h to predicted points over the next h gameweeks.
+    between trained horizons the total grows linearly; past the longest one
+    it keeps the last segment's rate. the models are trained separately, so a
+    longer horizon can predict less than a shorter one; totals are made
+    non-decreasing first, so no gameweek is worth negative points.
+    returns (players, gameweeks)
+    """
+    horizons = sorted(cumulative)
+    known_h = np.array([0] + horizons, dtype=np.float64)
+    known = np.column_stack([np.zeros(len(cumulative[horizons[0]]))]
+                            + [np.asarray(cumulative[h], dtype=np.float64) for h in horizons])
+    known = np.maximum.accumulate(known, axis=1)
+
+    steps = np.arange(gameweeks + 1, dtype=np.float64)
+    segment = np.clip(np.searchsorted(known_h, steps, side='left'), 1, len(known_h) - 1)
+    left_h, right_h = known_h[segment - 1], known_h[segment]
+    share = (steps - left_h) / (right_h - left_h)
+    totals = known[:, segment - 1] + (known[:, segment] - known[:, segment - 1]) * share
+    return np.diff(totals, axis=1)
+
+
+class TransferPlanner:
+    """transfer sequences for an existing squad over the next gameweeks
+
+    beam search over gameweeks: every kept squad is expanded by rolling the
+    transfer, the best single transfers and the best pairs (a downgrade can
+    fund an upgrade), each gameweek's transfers beyond the free ones costing
+    HIT_COST. successors are ranked by points banked so far plus what the
+    squad scores if held to the end, and the best BEAM_WIDTH distinct
+    (squad, bank, free transfers) states go on to the next gameweek.
+
+    a squad scores its best legal starting XI each gameweek with the
+    captain's points doubled. transfers are like for like, so squads are
+    kept as 15 slots in position order and thousands of them are scored in
+    one vectorized pass
+    """
+
+    def __init__(self, candidates: pd.DataFrame, points: np.ndarray, max_transfers: int = 2,
+                 beam_width: int = BEAM_WIDTH, time_budget: float = TIME_BUDGET, hit_cost: float = HIT_COST):
+        """candidates: player_id, position, team, price; points: (players, gameweeks) expected points"""
+        self.all_ids = candidates['player_id'].to_numpy(dtype=np.int64)
+        self.all_positions = candidates['position'].to_numpy(dtype=np.int64)
+        self.all_teams = candidates['team'].to_numpy(dtype=np.int64)
+        self.all_costs = np.round(candidates['price'].to_numpy(dtype=np.float64) * PRICE_UNITS).astype(np.int64)
+        self.all_points = np.asarray(points, dtype=np.float64)
+        self.gameweeks = self.all_points.shape[1]
+        self.max_transfers = max_transfers
+        self.beam_width = beam_width
+        self.time_budget = time_budget
+        self.hit_cost = hit_cost
+        self.states_explored = 0
+
+    # --- candidate pool ---------------------------------------------------------
+
+    def _pool(self, squad_rows: np.ndarray) -> np.ndarray:
+        """rows worth buying: fewer than DOMINANCE_DEPTH same-position players are both cheaper and better
+
+        the club limit can block up to MAX_PER_CLUB dominators, so one more
+        than that always leaves a better, affordable alternative. squad
+        members stay in the pool whatever their value
+        """
+        totals = self.all_points.sum(axis=1)
+        keep = [squad_rows]
+        for position in POSITIONS:
+            members = np.flatnonzero(self.all_positions == position)
+            cost, pts = self.all_costs[members], totals[members]
+            # dominates[q, p]: q costs no more and scores more (ties broken by row)
+            dominates = ((cost[:, None] <= cost[None, :])
+                         & ((pts[:, None] > pts[None, :])
+                            | ((pts[:, None] == pts[None, :]) & (members[:, None] < members[None, :]))))
+            keep.append(members[dominates.sum(axis=0) < DOMINANCE_DEPTH])
+        return np.unique(np.concatenate(keep))
+
+    # --- squad scoring ----------------------------------------------------------
+
+    def lineup_points(self, squads: np.ndarray, first_gameweek: int) -> np.ndarray:
+        """best starting XI plus captain for each squad, per gameweek from first_gameweek on
+
+        squads is (n, 15) pool rows in slot order; XI is the best goalkeeper,
+        the minimum 3 DEF / 2 MID / 1 FWD and the best 4 of the remaining
+        outfielders. the top scorer is always in the XI, so the captain adds
+        the squad's maximum
+        """
+        pts = self.points[squads][:, :, first_gameweek:]
+        ordered = {position: -np.sort(-pts[:, SLOTS[position]], axis=1) for position in POSITIONS}
+        starting = ordered[1][:, 0] + ordered[2][:, :3].sum(axis=1) + ordered[3][:, :2].sum(axis=1) + ordered[4][:, 0]
+        flexible = np.concatenate([ordered[2][:, 3:], ordered[3][:, 2:], ordered[4][:, 1:]], axis=1)
+        starting = starting + -np.sort(-flexible, axis=1)[:, :4].sum(axis=1)
+        return starting + pts.max(axis=1)
+
+    # --- move generation ----------------------------------------------------------
+
+    def _slot_moves(self, squad: np.ndarray, sell: np.ndarray, bank: int, gameweek: int) -> Dict[str, np.ndarray]:
+        """replacement candidates for every slot: upgrades and fund-freeing downgrades"""
+        remaining = self.remaining[:, gameweek]
+        owned = np.zeros(len(self.ids), dtype=bool)
+        owned[squad] = True
+        most_freed = int(sell.max())
+
+        slots, rows = [], []
+        for slot in range(SQUAD_SIZE):
+            out = squad[slot]
+            members = self.by_position[gameweek][self.positions[out]]
+            members = members[~owned[members]]
+            better = members[remaining[members] > remaining[out]]
+            affordable = self.costs[better] <= bank + sell[slot]
+            # upgrades the bank covers now, and those another sale could fund
+            upgrades = better[affordable][:UPGRADES_PER_SLOT]
+            funded = better[~affordable & (self.costs[better] <= bank + sell[slot] + most_freed)][:UPGRADES_PER_SLOT]
+            downgrades = members[self.costs[members] < sell[slot]][:DOWNGRADES_PER_SLOT]
+            chosen = np.unique(np.concatenate([upgrades, funded, downgrades]))
+            slots.append(np.full(len(chosen), slot))
+            rows.append(chosen)
+
+        slots = np.concatenate(slots)
+        rows = np.concatenate(rows)
+        return {
+            'slot': slots,
+            'row': rows,
+            'cost': self.costs[rows] - sell[slots],
+            'gain': remaining[rows] - remaining[squad[slots]],
+            'team_in': self.teams[rows],
+            'team_out': self.teams[squad[slots]],
+        }
+
+    def _moves(self, squad: np.ndarray, sell: np.ndarray, bank: int, gameweek: int) -> Tuple[np.ndarray, np.ndarray]:
+        """the most promising single and double transfers by estimated gain
+
+        returns (slots, rows), both (moves, 2): the slots sold and the rows
+        bought; a single transfer has -1 in its second column
+        """
+        moves = self._slot_moves(squad, sell, bank, gameweek)
+        slot, row = moves['slot'], moves['row']
+        club_counts = np.bincount(self.teams[squad], minlength=self.teams.max() + 1)
+        team_in, team_out = moves['team_in'], moves['team_out']
+
+        singles = np.flatnonzero((moves['cost'] <= bank) & (moves['gain'] > 0)
+                                 & (club_counts[team_in] - (team_in == team_out) < MAX_PER_CLUB))
+        singles = singles[np.argsort(-moves['gain'][singles], kind='stable')[:MAX_SINGLE_MOVES]]
+        slots = [np.column_stack([slot[singles], np.full(len(singles), -1)])]
+        rows = [np.column_stack([row[singles], np.full(len(singles), -1)])]
+
+        if self.max_transfers >= 2 and len(slot) > 1:
+            a, b = np.triu_indices(len(slot), k=1)
+            gain = moves['gain'][a] + moves['gain'][b]
+            pairs = np.flatnonzero((slot[a] != slot[b]) & (row[a] != row[b]) & (gain > 0)
+                                   & (moves['cost'][a] + moves['cost'][b] <= bank))
+            a, b, gain = a[pairs], b[pairs], gain[pairs]
+            same_club = team_in[a] == team_in[b]
+            # club count of each incoming team once both transfers are made
+            count_a = (club_counts[team_in[a]] + 1 + same_club
+                       - (team_out[a] == team_in[a]) - (team_out[b] == team_in[a]))
+            count_b = (club_counts[team_in[b]] + 1 + same_club
+                       - (team_out[a] == team_in[b]) - (team_out[b] == team_in[b]))
+            legal = np.flatnonzero((count_a <= MAX_PER_CLUB) & (count_b <= MAX_PER_CLUB))
+            if len(legal) > MAX_DOUBLE_MOVES:
+                legal = legal[np.argpartition(-gain[legal], MAX_DOUBLE_MOVES)[:MAX_DOUBLE_MOVES]]
+            slots.append(np.column_stack([slot[a[legal]], slot[b[legal]]]))
+            rows.append(np.column_stack([row[a[legal]], row[b[legal]]]))
+        return np.concatenate(slots), np.concatenate(rows)
+
+    # --- search -------------------------------------------------------------------
+
+    def plan(self, squad_ids: List[int], bank: float = 0.0, free_transfers: int = 1,
+             selling_prices: Optional[Dict[int, float]] = None) -> Dict:
+        """best transfer sequence over the planning horizon for a 15-man squad
+
+        selling_prices overrides the current price as the sale value of
+        squad players (fpl only returns half of any price rise)
+        """
+        started = time.perf_counter()
+        squad_rows = self._squad_rows(squad_ids)
+
+        pool = self._pool(squad_rows)
+        self.ids, self.positions = self.all_ids[pool], self.all_positions[pool]
+        self.teams, self.costs, self.points = self.all_teams[pool], self.all_costs[pool], self.all_points[pool]
+        # points from each gameweek to the end of the horizon
+        self.remaining = np.concatenate([np.cumsum(self.points[:, ::-1], axis=1)[:, ::-1],
+                                         np.zeros((len(pool), 1))], axis=1)
+        # per gameweek, each position's players best first by points still to come
+        self.by_position = []
+        for gameweek in range(self.gameweeks):
+            order = np.argsort(-self.remaining[:, gameweek], kind='stable')
+            self.by_position.append({position: order[self.positions[order] == position] for position in POSITIONS})
+
+        row_of = {int(row): i for i, row in enumerate(pool)}
+        squad = np.array([row_of[int(row)] for row in squad_rows], dtype=np.int64)
+        sell = self.costs[squad].copy()
+        for slot, player_id in enumerate(self.ids[squad]):
+            if selling_prices and int(player_id) in selling_prices:
+                sell[slot] = int(round(selling_prices[int(player_id)] * PRICE_UNITS))
+        free_transfers = int(min(max(free_transfers, 0), MAX_FREE_TRANSFERS))
+
+        hold = self.lineup_points(squad[None, :], 0)[0]
+        # the beam as parallel arrays: squads, their sale values, bank, free transfers and points banked
+        beam = {'squad': squad[None, :], 'sell': sell[None, :], 'bank': np.array([int(round(bank * PRICE_UNITS))]),
+                'free': np.array([free_transfers]), 'score': np.zeros(1)}
+        histories: List[List[Dict]] = [[]]
+        self.states_explored = 0
+        truncated = False
+
+        for gameweek in range(self.gameweeks):
+            if time.perf_counter() - started > self.time_budget:
+                truncated = True
+            parents, slots, rows = [], [], []
+            for parent in range(len(histories)):
+                # rolling the transfer is always an option
+                parent_slots, parent_rows = np.full((1, 2), -1), np.full((1, 2), -1)
+                if not truncated:
+                    move_slots, move_rows = self._moves(beam['squad'][parent], beam['sell'][parent],
+                                                        int(beam['bank'][parent]), gameweek)
+                    parent_slots = np.concatenate([parent_slots, move_slots])
+                    parent_rows = np.concatenate([parent_rows, move_rows])
+                parents.append(np.full(len(parent_slots), parent))
+                slots.append(parent_slots)
+                rows.append(parent_rows)
+            parents, slots, rows = np.concatenate(parents), np.concatenate(slots), np.concatenate(rows)
+
+            squads, sells, banks = beam['squad'][parents], beam['sell'][parents], beam['bank'][parents].copy()
+            for column in range(2):
+                made = np.flatnonzero(slots[:, column] >= 0)
+                slot, row = slots[made, column], rows[made, column]
+                banks[made] += sells[made, slot] - self.costs[row]
+                squads[made, slot] = row
+                sells[made, slot] = self.costs[row]
+
+            points = self.lineup_points(squads, gameweek)
+            self.states_explored += len(squads)
+            transfers = (slots >= 0).sum(axis=1)
+            free = beam['free'][parents]
+            hits = np.maximum(transfers - free, 0)
+            banked = beam['score'][parents] + points[:, 0] - hits * self.hit_cost
+            # unused free transfers carry over, one more each gameweek
+            next_free = np.minimum(np.maximum(free - transfers, 0) + 1, MAX_FREE_TRANSFERS)
+
+            kept, seen = [], set()
+            for i in np.argsort(-(banked + points[:, 1:].sum(axis=1)), kind='stable'):
+                key = (np.sort(squads[i]).tobytes(), int(banks[i]), int(next_free[i]))
+                if key in seen:
+                    continue
+                seen.add(key)
+                kept.append(i)
+                if len(kept) >= self.beam_width:
+                    break
+
+            kept = np.array(kept)
+            histories = [histories[parents[i]] + [{
+                'moves': [(int(beam['squad'][parents[i]][slot]), int(row))
+                          for slot, row in zip(slots[i], rows[i]) if slot >= 0],
+                'hits': int(hits[i]), 'free_transfers': int(free[i]), 'bank': int(banks[i]),
+                'points': float(points[i, 0]),
+            }] for i in kept]
+            beam = {'squad': squads[kept], 'sell': sells[kept], 'bank': banks[kept],
+                    'free': next_free[kept], 'score': banked[kept]}
+
+        return self._build_plan(histories[0], float(beam['score'][0]), hold, beam['squad'][0],
+                                int(beam['bank'][0]), int(beam['free'][0]), time.perf_counter() - started, truncated)
+
+    def _squad_rows(self, squad_ids: List[int]) -> np.ndarray:
+        """candidate rows of the squad in slot order; ValueError when it isn't a legal 15"""
+        if len(set(squad_ids)) != SQUAD_SIZE:
+            raise ValueError(f"A squad has {SQUAD_SIZE} distinct players, got {len(set(squad_ids))}")
+        row_of = {int(player_id): row for row, player_id in enumerate(self.all_ids)}
+        missing = [player_id for player_id in squad_ids if int(player_id) not in row_of]
+        if missing:
+            raise ValueError(f"No predictions for players: {missing}")
+        rows = np.array([row_of[int(player_id)] for player_id in squad_ids], dtype=np.int64)
+        rows = rows[np.argsort(self.all_positions[rows], kind='stable')]
+        counts = np.bincount(self.all_positions[rows], minlength=max(POSITIONS) + 1)
+        if any(counts[position] != SQUAD_QUOTAS[position] for position in POSITIONS):
+            raise ValueError("A squad has 2 goalkeepers, 5 defenders, 5 midfielders and 3 forwards")
+        return rows
+
+    def _build_plan(self, history: List[Dict], score: float, hold: np.ndarray, squad: np.ndarray,
+                    bank_units: int, free_transfers: int, elapsed: float, truncated: bool) -> Dict:
+        steps = []
+        for offset, step in enumerate(history):
+            steps.append({
+                'gameweek_offset': offset,
+                'transfers': [{'out': int(self.ids[out]), 'in': int(self.ids[row]),
+                               'price': float(self.costs[row]) / PRICE_UNITS} for out, row in step['moves']],
+                'free_transfers': step['free_transfers'],
+                'hits': step['hits'],
+                'hit_cost': step['hits'] * self.hit_cost,
+                'bank': step['bank'] / PRICE_UNITS,
+                'expected_points': step['points'],
+            })
+        return {
+            'gameweeks': steps,
+            'final_squad': [int(player_id) for player_id in self.ids[squad]],
+            'final_bank': bank_units / PRICE_UNITS,
+            'final_free_transfers': free_transfers,
+            'expected_points': float(score),
+            'hold_expected_points': float(hold.sum()),
+            'gain': float(score - hold.sum()),
+            'states_explored': self.states_explored,
+            'elapsed_seconds': elapsed,
+            'truncated': truncated,
+        }